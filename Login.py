@@ -1,29 +1,45 @@
+import profiling
+profiling.start_if_requested()  # --perfil: mede também as importações abaixo
+
+import argparse
 import tkinter as tk
 from tkinter import ttk, messagebox
 import sqlite3
-import hashlib
-import subprocess  # Import subprocess
 from datetime import datetime
+from db_worker import DatabaseWorker
+from migrations import prepare_database
+from services import MIN_PASSWORD_LENGTH, FileStorage, Services
+from profiling import profiled
 
 class CriancaEsperancaLogin:
-    def __init__(self):
-        self.root = tk.Tk()
+    def __init__(self, root=None, db=None, on_login=None, services=None):
+        # Com root/db a tela é montada na janela e conexão da aplicação
+        # (ver app.py); on_login(user_data) recebe o usuário autenticado
+        self.root = root or tk.Tk()
         self.root.title("Criança Esperança - Sistema de Acesso")
         self.root.geometry("400x600")
         self.root.resizable(False, False)
         self.root.configure(bg='#FFD93D')
+        self.on_login = on_login
+        self.services = services or Services(FileStorage(traced=True, cached=True))
         
         # Centralizar janela
         self.center_window()
         
         # Database
-        self.init_database()
+        if db is None:
+            self.init_database()
+        else:
+            self.db = db
         
         # Variáveis
         self.is_login_mode = True
+        self.user_data = None
+        self._message_job = None
         
         # Interface
         self.create_widgets()
+        profiling.mark_ready(self.root, "tela de acesso pronta")
     
     def center_window(self):
         self.root.update_idletasks()
@@ -31,45 +47,32 @@ class CriancaEsperancaLogin:
         y = (self.root.winfo_screenheight() // 2) - (600 // 2)
         self.root.geometry(f"400x600+{x}+{y}")
     
+    @profiled("init_database")
     def init_database(self):
-        """Inicializa banco SQLite"""
-        try:
-            self.conn = sqlite3.connect("crianca_esperanca.db")
-            cursor = self.conn.cursor()
-            
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS usuarios (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    username TEXT UNIQUE NOT NULL,
-                    password TEXT NOT NULL,
-                    nome_completo TEXT,
-                    email TEXT,
-                    data_criacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            self.conn.commit()
-            print("✅ Banco inicializado!")
-            
-        except sqlite3.Error as e:
-            messagebox.showerror("Erro", f"Erro no banco: {e}")
+        """Inicia a thread de banco e aplica migrações pendentes"""
+        self.db = DatabaseWorker(self.root, connect=self.services.storage.connect)
+        self.db.submit(prepare_database,
+                       callback=lambda _: print("✅ Banco inicializado!"),
+                       on_error=lambda e: messagebox.showerror("Erro", f"Erro no banco: {e}"))
     
+    @profiled("create_widgets")
     def create_widgets(self):
         # Container principal
-        main_frame = tk.Frame(self.root, bg='white', relief='raised', bd=2)
-        main_frame.pack(expand=True, fill='both', padx=20, pady=30)
+        self.main_frame = tk.Frame(self.root, bg='white', relief='raised', bd=2)
+        self.main_frame.pack(expand=True, fill='both', padx=20, pady=30)
         
         # Header
-        self.create_header(main_frame)
+        self.create_header(self.main_frame)
         
         # Formulário
-        self.create_form(main_frame)
+        self.create_form(self.main_frame)
         
         # Botões
-        self.create_buttons(main_frame)
+        self.create_buttons(self.main_frame)
         
         # Status
         self.status_label = tk.Label(
-            main_frame, text="", font=('Arial', 10), 
+            self.main_frame, text="", font=('Arial', 10), 
             fg='#666', bg='white'
         )
         self.status_label.pack(pady=10)
@@ -214,32 +217,29 @@ class CriancaEsperancaLogin:
     
     def login(self, username, password):
         """Processa login"""
-        try:
-            cursor = self.conn.cursor()
-            hashed_password = self.hash_password(password)
-            
-            cursor.execute('''
-                SELECT id, username, nome_completo FROM usuarios 
-                WHERE username = ? AND password = ?
-            ''', (username, hashed_password))
-            
-            user = cursor.fetchone()
-            
+        def on_result(user):
+            self.main_button.config(state='normal')
             if user:
-                user_id, username, nome_completo = user
+                self.user_data = user
                 self.show_message("Login realizado com sucesso! 🎉", "success")
-                self.show_welcome_screen(username, nome_completo or username)
+                self.show_welcome_screen(user['username'], user['nome'])
             else:
                 self.show_message("Usuário ou senha incorretos! 😔", "error")
-                
-        except sqlite3.Error as e:
+        
+        def on_error(e):
+            self.main_button.config(state='normal')
             self.show_message(f"Erro no banco: {e}", "error")
+        
+        self.main_button.config(state='disabled')
+        self.show_message("Verificando... ⏳", "info")
+        self.db.submit(lambda conn: self.services.users.authenticate(conn, username, password),
+                       callback=on_result, on_error=on_error)
     
     def register(self, username, password):
         """Processa cadastro"""
         try:
-            if len(password) < 4:
-                self.show_message("Senha deve ter pelo menos 4 caracteres! 🔒", "error")
+            if len(password) < MIN_PASSWORD_LENGTH:
+                self.show_message(f"Senha deve ter pelo menos {MIN_PASSWORD_LENGTH} caracteres! 🔒", "error")
                 return
             
             nome_completo = self.nome_entry.get().strip()
@@ -249,30 +249,28 @@ class CriancaEsperancaLogin:
                 self.show_message("Preencha seu nome completo! 📝", "error")
                 return
             
-            cursor = self.conn.cursor()
-            hashed_password = self.hash_password(password)
-            
-            cursor.execute('''
-                INSERT INTO usuarios (username, password, nome_completo, email)
-                VALUES (?, ?, ?, ?)
-            ''', (username, hashed_password, nome_completo, email))
+            def on_created(_):
+                self.main_button.config(state='normal')
+                
+                # Limpar e voltar ao login
+                self.clear_fields()
+                self.toggle_mode()
+                self.show_message("Conta criada com sucesso! 🎉", "success")
             
-            self.conn.commit()
-            self.show_message("Conta criada com sucesso! 🎉", "success")
+            def on_error(e):
+                self.main_button.config(state='normal')
+                if isinstance(e, sqlite3.IntegrityError):
+                    self.show_message("Nome de usuário já existe! 😅", "error")
+                else:
+                    self.show_message(f"Erro ao criar conta: {e}", "error")
             
-            # Limpar e voltar ao login
-            self.clear_fields()
-            self.toggle_mode()
+            self.main_button.config(state='disabled')
+            self.db.submit(lambda conn: self.services.users.create(conn, username, password, nome_completo, email),
+                           callback=on_created, on_error=on_error)
             
-        except sqlite3.IntegrityError:
-            self.show_message("Nome de usuário já existe! 😅", "error")
-        except sqlite3.Error as e:
+        except Exception as e:
             self.show_message(f"Erro ao criar conta: {e}", "error")
     
-    def hash_password(self, password):
-        """Hash da senha"""
-        return hashlib.sha256(password.encode()).hexdigest()
-    
     def show_message(self, message, msg_type):
         """Exibe mensagem colorida"""
         colors = {
@@ -287,8 +285,15 @@ class CriancaEsperancaLogin:
         )
         
         # Limpar após 3 segundos
-        self.root.after(3000, lambda: self.status_label.config(text=""))
+        if self._message_job:
+            self.root.after_cancel(self._message_job)
+        self._message_job = self.root.after(3000, self.clear_message)
+    
+    def clear_message(self):
+        self._message_job = None
+        self.status_label.config(text="")
     
+    @profiled("dialogo boas-vindas")
     def show_welcome_screen(self, username, nome_completo):
         """Tela de boas-vindas"""
         welcome_window = tk.Toplevel(self.root)
@@ -341,10 +346,17 @@ class CriancaEsperancaLogin:
                  command=lambda: self.continue_to_main(welcome_window)).pack(pady=20, padx=50, fill='x')
     
     def continue_to_main(self, welcome_window):
-        """Fecha todas as janelas e abre o main.py"""
-        welcome_window.destroy()  # Fecha a janela de boas-vindas
-        self.root.destroy()       # Fecha a janela principal de login
-        subprocess.Popen(["python", "main.py"])  # Abre o arquivo main.py
+        """Fecha as boas-vindas e entrega o usuário ao gerenciamento"""
+        welcome_window.destroy()
+        if self.on_login:
+            self.on_login(self.user_data)
+    
+    def destroy(self):
+        """Remove a tela de acesso (a janela e a conexão continuam abertas)"""
+        if self._message_job:
+            self.root.after_cancel(self._message_job)
+            self._message_job = None
+        self.main_frame.destroy()
     
     def run(self):
         """Executa a aplicação"""
@@ -354,10 +366,16 @@ class CriancaEsperancaLogin:
         except Exception as e:
             messagebox.showerror("Erro", f"Erro crítico: {e}")
         finally:
-            if hasattr(self, 'conn'):
-                self.conn.close()
+            if hasattr(self, 'db'):
+                self.db.close()
 
 # Executar aplicação
 if __name__ == "__main__":
-    app = CriancaEsperancaLogin()
+    parser = argparse.ArgumentParser(description="Sistema Criança Esperança")
+    profiling.add_argument(parser)
+    args = parser.parse_args()
+    
+    from app import CriancaEsperancaApp
+    profiling.enable_from_args(args)  # As importações da aplicação entram no perfil
+    app = CriancaEsperancaApp()
     app.run()
@@ -0,0 +1,310 @@
+"""Teste de carga da API local (api_server.py).
+
+Simula várias estações ao mesmo tempo. Cada cliente abre a sua conexão
+(keep-alive), faz login e sorteia operações no mesmo espírito do uso
+das telas: painel, listas paginadas e ordenadas, busca, abertura de
+registros e, numa fração dos pedidos, cadastros e alterações. Ao final
+são mostrados os pedidos por segundo e, para cada operação, os erros e
+p50/p95/p99 (ms).
+
+Com --db o próprio teste sobe o servidor num processo separado, gerando
+o banco com seed_data.py se ele ainda não existir.
+
+Uso: python api_loadtest.py --db benchmark_10k.db [--clientes 200] [--requisicoes 20000]
+     python api_loadtest.py --url http://servidor:8765 --usuario admin --senha ...
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from urllib.parse import quote, urlsplit
+
+import database
+
+from api_server import DEFAULT_PORT
+from benchmark import _search_term, percentile
+from seed_data import DEFAULT_SEED, FIRST_NAMES, LAST_NAMES, SEED_PASSWORD, parse_scale, seed
+
+TABLES = ('projetos', 'voluntarios', 'beneficiarios', 'atividades')
+SORTABLE = {
+    'projetos': ['nome', '-data_inicio', 'status,nome'],
+    'voluntarios': ['nome', 'area_interesse,-nome'],
+    'beneficiarios': ['nome', '-idade', 'situacao,nome'],
+    'atividades': ['-data_atividade', 'titulo', 'status,-data_atividade'],
+}
+ACTIVITY_STATUSES = ["Planejada", "Em Andamento", "Realizada", "Cancelada"]
+
+
+class HttpClient:
+    """Conexão HTTP/1.1 persistente com a API (um cliente = uma estação)"""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+        self.token = None
+
+    async def request(self, method, path, body=None):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        payload = json.dumps(body).encode() if body is not None else b''
+        headers = [f"{method} {path} HTTP/1.1", f"Host: {self.host}",
+                   f"Content-Length: {len(payload)}"]
+        if payload:
+            headers.append("Content-Type: application/json")
+        if self.token:
+            headers.append(f"Authorization: Bearer {self.token}")
+        self.writer.write(('\r\n'.join(headers) + '\r\n\r\n').encode('latin-1') + payload)
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            await self.close()
+            raise ConnectionError("Conexão encerrada pelo servidor")
+        status = int(status_line.split()[1])
+        length = 0
+        close = False
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            name = name.strip().lower()
+            if name == 'content-length':
+                length = int(value)
+            elif name == 'connection' and value.strip().lower() == 'close':
+                close = True
+        data = json.loads(await self.reader.readexactly(length)) if length else None
+        if close:
+            await self.close()
+        return status, data
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except ConnectionError:
+                pass
+            self.reader = self.writer = None
+
+
+class LoadTest:
+    """Sorteio das operações e coleta das latências"""
+
+    def __init__(self, host, port, username, password, requests, write_fraction, seed_value):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.remaining = requests
+        self.write_fraction = write_fraction
+        self.rng = random.Random(f"{seed_value}:carga")
+        self.latencies = {}     # operação -> [ms]
+        self.errors = {}        # operação -> quantidade
+        self.totals = {}
+        self.created = []       # ids de atividades criadas pelo teste
+
+    def record(self, operation, ms, ok):
+        self.latencies.setdefault(operation, []).append(ms)
+        if not ok:
+            self.errors[operation] = self.errors.get(operation, 0) + 1
+
+    async def call(self, client, operation, method, path, body=None):
+        started = time.perf_counter()
+        try:
+            status, data = await client.request(method, path, body)
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            await client.close()
+            status, data = 0, None
+        self.record(operation, (time.perf_counter() - started) * 1000, 200 <= status < 300)
+        return status, data
+
+    async def login(self, client):
+        status, data = await self.call(client, 'login', 'POST', '/api/login',
+                                       {'username': self.username, 'password': self.password})
+        if status != 200:
+            raise RuntimeError(f"Login recusado ({status}): {data}")
+        client.token = data['token']
+
+    def pick(self):
+        """Próxima operação: (nome, método, caminho, corpo)"""
+        rng = self.rng
+        table = rng.choice(TABLES)
+        if rng.random() < self.write_fraction:
+            if self.created and rng.random() < 0.5:
+                body = {'ids': [rng.choice(self.created)], 'coluna': 'status',
+                        'valor': rng.choice(ACTIVITY_STATUSES)}
+                return 'alterar_lote', 'PATCH', '/api/atividades/lote', body
+            body = {'titulo': f"Visita de {rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+                    'data_atividade': f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2026",
+                    'local': "Sede", 'participantes': str(rng.randint(1, 40)),
+                    'status': "Planejada"}
+            return 'criar', 'POST', '/api/atividades', body
+
+        choice = rng.random()
+        if choice < 0.15:
+            return 'painel', 'GET', '/api/painel', None
+        if choice < 0.40:
+            return 'listar', 'GET', f"/api/{table}?limite=50", None
+        if choice < 0.50:
+            order = rng.choice(SORTABLE[table])
+            return 'ordenar', 'GET', f"/api/{table}?limite=50&ordem={order}", None
+        if choice < 0.75:
+            term = quote(_search_term(rng))
+            return 'buscar', 'GET', f"/api/{table}/busca?q={term}&limite=50", None
+        if choice < 0.95 and self.totals.get(table):
+            return 'registro', 'GET', f"/api/{table}/{rng.randint(1, self.totals[table])}", None
+        return 'total', 'GET', f"/api/{table}/total", None
+
+    async def worker(self):
+        client = HttpClient(self.host, self.port)
+        try:
+            await self.login(client)
+            while self.remaining > 0:
+                self.remaining -= 1
+                operation, method, path, body = self.pick()
+                status, data = await self.call(client, operation, method, path, body)
+                if client.writer is None:
+                    await self.login(client)
+                    continue
+                if operation == 'criar' and status == 201:
+                    self.created.append(data['id'])
+                elif operation in ('listar', 'ordenar') and status == 200 and data['proximo'] \
+                        and self.rng.random() < 0.5:
+                    # Rolar para a página seguinte, como na tela
+                    separator = '&' if '?' in path else '?'
+                    await self.call(client, 'proxima_pagina', 'GET',
+                                    f"{path}{separator}cursor={data['proximo']}")
+        finally:
+            await client.close()
+
+    async def cleanup(self):
+        """Remove as atividades criadas pelo teste"""
+        if not self.created:
+            return
+        client = HttpClient(self.host, self.port)
+        try:
+            await self.login(client)
+            for start in range(0, len(self.created), 1000):
+                await client.request('DELETE', '/api/atividades/lote',
+                                     {'ids': self.created[start:start + 1000]})
+        finally:
+            await client.close()
+
+    async def run(self, clients):
+        client = HttpClient(self.host, self.port)
+        try:
+            await self.login(client)
+            for table in TABLES:
+                status, data = await client.request('GET', f"/api/{table}/total")
+                self.totals[table] = data['total'] if status == 200 else 0
+        finally:
+            await client.close()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(self.worker() for _ in range(clients)))
+        elapsed = time.perf_counter() - started
+        await self.cleanup()
+        return elapsed
+
+    def report(self, elapsed):
+        total = sum(len(samples) for samples in self.latencies.values())
+        errors = sum(self.errors.values())
+        lines = [f"📊 {total} pedido(s) em {elapsed:.1f} s = {total / elapsed:.0f} pedidos/s, "
+                 f"{errors} erro(s)"]
+        results = {}
+        for operation in sorted(self.latencies):
+            samples = sorted(self.latencies[operation])
+            result = {
+                'n': len(samples),
+                'erros': self.errors.get(operation, 0),
+                'p50': round(percentile(samples, 0.50), 2),
+                'p95': round(percentile(samples, 0.95), 2),
+                'p99': round(percentile(samples, 0.99), 2),
+                'max': round(samples[-1], 2),
+            }
+            results[operation] = result
+            lines.append(f"   {operation:15} n {result['n']:6}  erros {result['erros']:4}  "
+                         f"p50 {result['p50']:8.2f}  p95 {result['p95']:8.2f}  "
+                         f"p99 {result['p99']:8.2f}  máx {result['max']:8.2f} ms")
+        return lines, results, errors
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(path, port, readers):
+    """Sobe api_server.py num processo separado e espera a porta abrir"""
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'api_server.py')
+    process = subprocess.Popen([sys.executable, script, '--db', path, '--porta', str(port),
+                                '--leitores', str(readers)])
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("O servidor da API terminou ao iniciar")
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.2).close()
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("O servidor da API não abriu a porta a tempo")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Teste de carga da API do Criança Esperança")
+    parser.add_argument("--url", default=f"http://127.0.0.1:{DEFAULT_PORT}",
+                        help="API já em execução (ignorado com --db)")
+    parser.add_argument("--db", help="sobe o servidor com este banco (gerado se não existir)")
+    parser.add_argument("--escala", default="10k", help="escala do banco gerado com --db")
+    parser.add_argument("--leitores", type=int, default=8, help="leitores do servidor iniciado com --db")
+    parser.add_argument("--usuario", default="admin")
+    parser.add_argument("--senha", default=SEED_PASSWORD)
+    parser.add_argument("--clientes", type=int, default=200, help="conexões simultâneas")
+    parser.add_argument("--requisicoes", type=int, default=20000, help="pedidos no total")
+    parser.add_argument("--escritas", type=float, default=0.05, help="fração de pedidos de escrita")
+    parser.add_argument("--semente", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--salvar", help="grava o resultado em JSON")
+    args = parser.parse_args()
+
+    server = None
+    if args.db:
+        if not os.path.exists(args.db):
+            rows = parse_scale(args.escala)
+            print(f"🌱 Gerando {args.db} ({rows:,} linhas por tabela, semente {args.semente})...")
+            conn = database.connect(args.db, profile='benchmark')
+            seed(conn, rows, args.semente)
+            database.close(conn)
+        host, port = '127.0.0.1', free_port()
+        server = start_server(args.db, port, args.leitores)
+    else:
+        url = urlsplit(args.url)
+        host, port = url.hostname, url.port or DEFAULT_PORT
+
+    test = LoadTest(host, port, args.usuario, args.senha, args.requisicoes, args.escritas, args.semente)
+    try:
+        print(f"🚀 {args.clientes} cliente(s), {args.requisicoes} pedido(s) em http://{host}:{port}")
+        elapsed = asyncio.run(test.run(args.clientes))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    lines, results, errors = test.report(elapsed)
+    print('\n'.join(lines))
+    if args.salvar:
+        with open(args.salvar, 'w', encoding='utf-8') as handle:
+            json.dump({'clientes': args.clientes, 'segundos': round(elapsed, 2),
+                       'resultados': results}, handle, ensure_ascii=False, indent=2)
+        print(f"💾 Resultado gravado em {args.salvar}")
+    sys.exit(1 if errors else 0)
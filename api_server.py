@@ -0,0 +1,533 @@
+"""Serviço HTTP/JSON local sobre os cadastros, para várias estações.
+
+As mesmas operações das telas (create_crud_section, search_records e o
+painel) ficam disponíveis pela rede local, usando a camada de serviços.
+Só a biblioteca padrão é usada (asyncio); as respostas são sempre JSON.
+
+Todas as rotas, menos /api/login, exigem "Authorization: Bearer <token>":
+
+    POST   /api/login             {"username", "password"} -> {"token", "usuario"}
+    POST   /api/logout
+    GET    /api/painel            números do painel e últimas atividades
+    GET    /api/<tabela>          ?limite=50&cursor=...&ordem=nome,-idade
+    GET    /api/<tabela>/busca    ?q=texto&limite=&cursor=&ordem=
+    GET    /api/<tabela>/total
+    GET    /api/<tabela>/<id>
+    POST   /api/<tabela>          registro -> registro gravado
+    PUT    /api/<tabela>/<id>     registro completo; com "versao", só grava se
+                                  ninguém alterou o registro (409 se alterou)
+    DELETE /api/<tabela>/<id>
+    POST   /api/<tabela>/lote     {"registros": [...]} -> inseridos e rejeitados
+    PATCH  /api/<tabela>/lote     {"ids": [...], "coluna", "valor"}
+    DELETE /api/<tabela>/lote     {"ids": [...]}
+
+As listas são paginadas por chave: cada página traz "proximo" (cursor da
+página seguinte, ou null no fim), repassado em ?cursor=.
+
+O SQLite aceita um escritor por vez. As leituras usam um pool limitado
+de conexões somente leitura, uma por thread; as escritas passam todas
+por uma única thread, na ordem de chegada. No modo WAL as leituras
+seguem em paralelo com a escrita.
+
+Uso: python api_server.py [--db BANCO] [--host 0.0.0.0] [--porta 8765] [--leitores 8]
+"""
+import argparse
+import asyncio
+import base64
+import binascii
+import json
+import secrets
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+import database
+
+from bulk_import import RowError
+from migrations import prepare_database
+from services import ConflictError, FileStorage, Services, dashboard_stats, recent_activities
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+DEFAULT_READERS = 8
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+MAX_BATCH = 10_000              # Registros por pedido em lote
+MAX_BODY_BYTES = 8 * 1024 * 1024
+MAX_HEADERS = 100
+SESSION_SECONDS = 8 * 3600
+KEEPALIVE_SECONDS = 30
+
+
+class ApiError(Exception):
+    """Erro devolvido ao cliente com o status HTTP indicado"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class Request:
+    """Pedido HTTP já lido: método, caminho, parâmetros e corpo"""
+
+    def __init__(self, method, target, version, headers, body):
+        url = urlsplit(target)
+        self.method = method.upper()
+        self.path = url.path
+        self.query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        self.headers = headers
+        self.body = body
+        self.user = None
+        connection = headers.get('connection', '').lower()
+        if version == 'HTTP/1.0':
+            self.keep_alive = connection == 'keep-alive'
+        else:
+            self.keep_alive = connection != 'close'
+
+    def json(self):
+        if not self.body:
+            raise ApiError(400, "Corpo JSON ausente")
+        try:
+            return json.loads(self.body)
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            raise ApiError(400, f"JSON inválido: {e}")
+
+    def limit(self):
+        try:
+            limit = int(self.query.get('limite', PAGE_SIZE))
+        except ValueError:
+            raise ApiError(400, "limite deve ser um número")
+        return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+async def read_request(reader):
+    """Próximo pedido da conexão (None quando o cliente fecha)"""
+    line = await reader.readline()
+    if not line.strip():
+        return None
+    try:
+        method, target, version = line.decode('latin-1').split()
+    except ValueError:
+        raise ApiError(400, "Linha de pedido inválida")
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+        if len(headers) > MAX_HEADERS:
+            raise ApiError(431, "Cabeçalhos demais")
+
+    try:
+        length = int(headers.get('content-length') or 0)
+    except ValueError:
+        raise ApiError(400, "Content-Length inválido")
+    if length > MAX_BODY_BYTES:
+        raise ApiError(413, "Corpo grande demais")
+    body = await reader.readexactly(length) if length > 0 else b''
+    return Request(method, target, version, headers, body)
+
+
+def encode_response(status, body, keep_alive):
+    payload = json.dumps(body, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    head = (f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+            "Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(payload)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+            "\r\n")
+    return head.encode('latin-1') + payload
+
+
+class ConnectionPool:
+    """Conexões SQLite presas a threads: até N leitores e um único escritor.
+
+    Cada thread abre a sua conexão na primeira tarefa, porque o sqlite3
+    não compartilha conexões entre threads.
+    """
+
+    def __init__(self, services, readers=DEFAULT_READERS):
+        self.services = services
+        self._local = threading.local()
+        self.readers = ThreadPoolExecutor(readers, thread_name_prefix='api-leitura')
+        self.writer = ThreadPoolExecutor(1, thread_name_prefix='api-escrita')
+
+    def _connection(self, read_only):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self.services.connect(migrate_schema=False)
+            if read_only:
+                conn.execute("PRAGMA query_only = ON")
+            self._local.conn = conn
+        return conn
+
+    def _run(self, read_only, func, args):
+        return func(self._connection(read_only), *args)
+
+    async def read(self, func, *args):
+        """func(conn, *args) numa conexão de leitura"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.readers, self._run, True, func, args)
+
+    async def write(self, func, *args):
+        """func(conn, *args) na conexão do escritor, depois das escritas já na fila"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.writer, self._run, False, func, args)
+
+    def _close_writer(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            database.close(conn)
+            self._local.conn = None
+
+    def close(self):
+        # A conexão do escritor fecha na própria thread (checkpoint do WAL e
+        # PRAGMA optimize); as de leitura somem com as threads
+        self.writer.submit(self._close_writer).result()
+        self.writer.shutdown(wait=True)
+        self.readers.shutdown(wait=True)
+
+
+def dashboard(conn):
+    return {
+        'estatisticas': dashboard_stats(conn),
+        'atividades_recentes': [
+            {'titulo': titulo, 'data_atividade': data, 'status': status}
+            for titulo, data, status in recent_activities(conn)
+        ],
+    }
+
+
+def encode_cursor(order, row, columns):
+    """Cursor opaco com a chave da última linha de uma página"""
+    key = [row[0]] + list(row[1 + len(columns):])
+    text = json.dumps({'o': order, 'k': key}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(text.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, order, columns):
+    """Linha equivalente à do cursor, no formato que fetch_after espera"""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        key = data['k']
+        if data['o'] != order or not key:
+            raise ValueError
+    except (ValueError, KeyError, TypeError, binascii.Error):
+        raise ApiError(400, "cursor inválido (ou de outra ordenação)")
+    return (key[0],) + (None,) * len(columns) + tuple(key[1:])
+
+
+class ApiServer:
+    """Rotas da API sobre os repositórios de Services"""
+
+    def __init__(self, services, readers=DEFAULT_READERS):
+        self.services = services
+        self.pool = ConnectionPool(services, readers)
+        self.sessions = {}      # token -> (usuário, expira em)
+        self.server = None
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        await self.pool.write(prepare_database)
+        self.server = await asyncio.start_server(self.handle_client, host, port, backlog=1024)
+        return self.server
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        await asyncio.get_running_loop().run_in_executor(None, self.pool.close)
+
+    async def handle_client(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(read_request(reader), KEEPALIVE_SECONDS)
+                except ApiError as e:
+                    writer.write(encode_response(e.status, {'erro': e.message}, False))
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+                status, body = await self.dispatch(request)
+                writer.write(encode_response(status, body, request.keep_alive))
+                await writer.drain()
+                if not request.keep_alive:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, request):
+        try:
+            handler, args = self.route(request)
+            if handler != self.login:
+                request.user = self.authenticate(request)
+            return await handler(request, *args)
+        except ApiError as e:
+            return e.status, {'erro': e.message}
+        except RowError as e:
+            return 400, {'erro': str(e)}
+        except sqlite3.IntegrityError as e:
+            return 409, {'erro': f"Conflito: {e}"}
+        except sqlite3.OperationalError as e:
+            if 'locked' in str(e) or 'busy' in str(e):
+                return 503, {'erro': "Banco ocupado, tente novamente"}
+            print(f"❌ {request.method} {request.path}: {e}")
+            return 500, {'erro': "Erro no banco"}
+        except Exception as e:
+            print(f"❌ {request.method} {request.path}: {e!r}")
+            return 500, {'erro': "Erro interno"}
+
+    def route(self, request):
+        """(handler, argumentos) do pedido; 404/405 se não houver rota"""
+        parts = [part for part in request.path.split('/') if part]
+        if len(parts) < 2 or parts[0] != 'api':
+            raise ApiError(404, "Rota não encontrada")
+        name, rest = parts[1], parts[2:]
+
+        routes = None
+        if not rest and name == 'login':
+            routes, args = {'POST': self.login}, ()
+        elif not rest and name == 'logout':
+            routes, args = {'POST': self.logout}, ()
+        elif not rest and name == 'painel':
+            routes, args = {'GET': self.dashboard}, ()
+        elif name in self.services.tables:
+            repository = self.services.table(name)
+            if not rest:
+                routes = {'GET': self.list_records, 'POST': self.create_record}
+                args = (repository,)
+            elif len(rest) == 1 and rest[0] == 'busca':
+                routes, args = {'GET': self.search_records}, (repository,)
+            elif len(rest) == 1 and rest[0] == 'total':
+                routes, args = {'GET': self.count_records}, (repository,)
+            elif len(rest) == 1 and rest[0] == 'lote':
+                routes = {'POST': self.create_batch, 'PATCH': self.update_batch,
+                          'DELETE': self.delete_batch}
+                args = (repository,)
+            elif len(rest) == 1 and rest[0].isdigit():
+                routes = {'GET': self.get_record, 'PUT': self.update_record,
+                          'DELETE': self.delete_record}
+                args = (repository, int(rest[0]))
+        if routes is None:
+            raise ApiError(404, "Rota não encontrada")
+        if request.method not in routes:
+            raise ApiError(405, f"Método {request.method} não aceito em {request.path}")
+        return routes[request.method], args
+
+    # Autenticação
+
+    def authenticate(self, request):
+        scheme, _, token = request.headers.get('authorization', '').partition(' ')
+        session = self.sessions.get(token) if scheme.lower() == 'bearer' else None
+        if session is None:
+            raise ApiError(401, "Faça login (Authorization: Bearer <token>)")
+        user, expires = session
+        if time.monotonic() > expires:
+            del self.sessions[token]
+            raise ApiError(401, "Sessão expirada, faça login novamente")
+        return user
+
+    async def login(self, request):
+        data = request.json()
+        if not isinstance(data, dict):
+            raise ApiError(400, "O corpo deve ser um objeto JSON")
+        username = str(data.get('username') or '').strip()
+        password = str(data.get('password') or '')
+        if not username or not password:
+            raise ApiError(400, "Informe username e password")
+        user = await self.pool.read(self.services.users.authenticate, username, password)
+        if user is None:
+            raise ApiError(401, "Usuário ou senha incorretos")
+
+        now = time.monotonic()
+        for token, (_, expires) in list(self.sessions.items()):
+            if now > expires:
+                del self.sessions[token]
+        token = secrets.token_urlsafe(24)
+        self.sessions[token] = (user, now + SESSION_SECONDS)
+        return 200, {'token': token, 'usuario': user, 'expira_em_s': SESSION_SECONDS}
+
+    async def logout(self, request):
+        _, _, token = request.headers.get('authorization', '').partition(' ')
+        self.sessions.pop(token, None)
+        return 200, {'ok': True}
+
+    # Leituras
+
+    async def dashboard(self, request):
+        return 200, await self.pool.read(dashboard)
+
+    def record(self, repository, row, version=None):
+        record = dict(zip(['id'] + repository.columns, row))
+        if version is not None:
+            record['versao'] = version
+        return record
+
+    async def page(self, request, repository, source):
+        """Uma página da fonte a partir do cursor; o total só na primeira"""
+        order = request.query.get('ordem', '')
+        cursor = request.query.get('cursor')
+        limit = request.limit()
+        after = decode_cursor(cursor, order, repository.columns) if cursor else None
+
+        def fetch(conn):
+            if after is None:
+                rows = source.fetch_first(conn, limit + 1)
+                return rows, source.count(conn)
+            return source.fetch_after(conn, after, limit + 1), None
+
+        rows, total = await self.pool.read(fetch)
+        more = len(rows) > limit
+        rows = rows[:limit]
+        body = {
+            'registros': [self.record(repository, row[:1 + len(repository.columns)]) for row in rows],
+            'proximo': encode_cursor(order, rows[-1], repository.columns) if more else None,
+        }
+        if total is not None:
+            body['total'] = total
+        return 200, body
+
+    def order(self, request, repository):
+        columns = [column for column in request.query.get('ordem', '').split(',') if column]
+        return repository.order(columns)
+
+    async def list_records(self, request, repository):
+        return await self.page(request, repository, repository.source(self.order(request, repository)))
+
+    async def search_records(self, request, repository):
+        term = request.query.get('q', '')
+        source = repository.search_source(term, self.order(request, repository))
+        if source is None:
+            return 200, {'registros': [], 'proximo': None, 'total': 0}
+        return await self.page(request, repository, source)
+
+    async def count_records(self, request, repository):
+        return 200, {'total': await self.pool.read(repository.count)}
+
+    async def get_record(self, request, repository, record_id):
+        row, version = await self.pool.read(repository.fetch_versioned, record_id)
+        if row is None:
+            raise ApiError(404, f"Registro {record_id} não encontrado")
+        return 200, self.record(repository, row, version)
+
+    # Escritas (sempre pela thread do escritor)
+
+    def record_body(self, request):
+        data = request.json()
+        if not isinstance(data, dict):
+            raise ApiError(400, "O corpo deve ser um objeto JSON")
+        data.pop('id', None)
+        version = data.pop('versao', None)
+        if version is not None and (not isinstance(version, int) or isinstance(version, bool)):
+            raise ApiError(400, "'versao' deve ser um número inteiro")
+        return data, version
+
+    def ids_body(self, data):
+        ids = data.get('ids') if isinstance(data, dict) else None
+        if not isinstance(ids, list) or not ids or len(ids) > MAX_BATCH:
+            raise ApiError(400, f"Informe 'ids' (lista com 1 a {MAX_BATCH} ids)")
+        if not all(isinstance(record_id, int) and not isinstance(record_id, bool) for record_id in ids):
+            raise ApiError(400, "'ids' deve conter apenas números inteiros")
+        return ids
+
+    async def create_record(self, request, repository):
+        record, _ = self.record_body(request)
+
+        def write(conn):
+            return repository.fetch_versioned(conn, repository.insert(conn, record))
+
+        row, version = await self.pool.write(write)
+        return 201, self.record(repository, row, version)
+
+    async def update_record(self, request, repository, record_id):
+        record, version = self.record_body(request)
+
+        def write(conn):
+            if version is None and repository.fetch(conn, record_id) is None:
+                return None, None
+            repository.update(conn, record_id, record, version=version)
+            return repository.fetch_versioned(conn, record_id)
+
+        try:
+            row, current_version = await self.pool.write(write)
+        except ConflictError as e:
+            if e.current is None:
+                raise ApiError(404, str(e))
+            return 409, {'erro': str(e), 'atual': self.record(repository, e.current, e.version)}
+        if row is None:
+            raise ApiError(404, f"Registro {record_id} não encontrado")
+        return 200, self.record(repository, row, current_version)
+
+    async def delete_record(self, request, repository, record_id):
+        def write(conn):
+            if repository.fetch(conn, record_id) is None:
+                return False
+            repository.delete(conn, [record_id])
+            return True
+
+        if not await self.pool.write(write):
+            raise ApiError(404, f"Registro {record_id} não encontrado")
+        return 200, {'excluidos': 1}
+
+    async def create_batch(self, request, repository):
+        data = request.json()
+        records = data.get('registros') if isinstance(data, dict) else None
+        if not isinstance(records, list) or not records or len(records) > MAX_BATCH:
+            raise ApiError(400, f"Informe 'registros' (lista com 1 a {MAX_BATCH} registros)")
+        if not all(isinstance(record, dict) for record in records):
+            raise ApiError(400, "Cada registro deve ser um objeto JSON")
+        for record in records:
+            record.pop('id', None)
+        inserted, rejects = await self.pool.write(repository.insert_many, records)
+        return 200, {'inseridos': inserted,
+                     'rejeitados': [{'posicao': index, 'motivo': reason} for index, reason in rejects]}
+
+    async def update_batch(self, request, repository):
+        data = request.json()
+        ids = self.ids_body(data)
+        column = data.get('coluna')
+        if column not in repository.columns:
+            raise ApiError(400, f"'coluna' deve ser uma de: {', '.join(repository.columns)}")
+        value, updated = await self.pool.write(repository.update_field, column, data.get('valor'), ids)
+        return 200, {'alterados': updated, 'valor': value}
+
+    async def delete_batch(self, request, repository):
+        ids = self.ids_body(request.json())
+        deleted = await self.pool.write(repository.delete, ids)
+        return 200, {'excluidos': deleted}
+
+
+async def serve(path, host, port, readers, profile=None):
+    api = ApiServer(Services(FileStorage(path, profile)), readers)
+    server = await api.start(host, port)
+    print(f"🌐 API ouvindo em http://{host}:{port}/api ({readers} leitor(es), banco {path})")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await api.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="API HTTP/JSON local do Criança Esperança")
+    parser.add_argument("--db", default=database.DB_PATH, help="arquivo do banco")
+    parser.add_argument("--host", default=DEFAULT_HOST,
+                        help="endereço de escuta (0.0.0.0 para aceitar outras estações)")
+    parser.add_argument("--porta", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--leitores", type=int, default=DEFAULT_READERS,
+                        help="conexões de leitura (threads)")
+    parser.add_argument("--perfil-banco", choices=sorted(database.PROFILES),
+                        help="perfil de conexão (padrão: CRIANCA_DB_PROFILE ou desktop)")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args.db, args.host, args.porta, args.leitores, args.perfil_banco))
+    except KeyboardInterrupt:
+        print("👋 API encerrada")
@@ -0,0 +1,96 @@
+import tkinter as tk
+from tkinter import messagebox
+from db_worker import DatabaseWorker
+from Login import CriancaEsperancaLogin
+from main import CriancaEsperancaManager
+from migrations import prepare_database
+from services import FileStorage, Services
+from diagnostics_panel import DiagnosticsPanel
+from ui_watchdog import StallWatchdog
+from profiling import profiled
+
+
+class CriancaEsperancaApp:
+    """Aplicação completa num único processo.
+
+    Uma só janela Tk e uma só thread de banco são compartilhadas pela tela
+    de acesso e pelo gerenciamento; o login troca uma tela pela outra e
+    entrega o usuário autenticado, sem abrir outro interpretador.
+    """
+
+    def __init__(self):
+        self.root = tk.Tk()
+        self.login = None
+        self.manager = None
+        self.diagnostics = None
+
+        # Vigia do mainloop: liga antes de qualquer callback ser registrado
+        self.watchdog = StallWatchdog(self.root)
+        self.watchdog.start()
+
+        # Database
+        self.services = Services(FileStorage(traced=True, cached=True))
+        self.init_database()
+
+        # Painel de diagnóstico das consultas e da interface (atalho oculto)
+        self.root.bind_all('<Control-Shift-D>', self.show_diagnostics)
+
+        self.show_login()
+
+    @profiled("init_database")
+    def init_database(self):
+        """Inicia a thread de banco compartilhada e aplica migrações pendentes"""
+        self.db = DatabaseWorker(self.root, connect=self.services.storage.connect)
+        self.db.submit(prepare_database,
+                       callback=lambda _: print("✅ Banco inicializado!"),
+                       on_error=lambda e: messagebox.showerror("Erro", f"Erro no banco: {e}"))
+
+    def show_login(self):
+        """Mostra a tela de acesso (início ou após sair do gerenciamento)"""
+        if self.manager:
+            self.manager.destroy()
+            self.manager = None
+        self.login = CriancaEsperancaLogin(root=self.root, db=self.db,
+                                           on_login=self.show_manager, services=self.services)
+
+    def show_manager(self, user_data):
+        """Troca a tela de acesso pelo gerenciamento do usuário autenticado"""
+        self.login.destroy()
+        self.login = None
+        self.manager = CriancaEsperancaManager(user_data, root=self.root, db=self.db,
+                                               on_logout=self.show_login, services=self.services)
+
+    @profiled("dialogo diagnostico")
+    def show_diagnostics(self, event=None):
+        """Abre (ou traz para frente) o painel de diagnóstico"""
+        if self.diagnostics and self.diagnostics.window.winfo_exists():
+            self.diagnostics.window.lift()
+            return
+        self.diagnostics = DiagnosticsPanel(self.root, watchdog=self.watchdog)
+
+    def on_close(self):
+        """Fechar a janela encerra a aplicação (com confirmação se logado)"""
+        if self.manager and not messagebox.askyesno(
+                "Sair", "Tem certeza que deseja sair do sistema? 🚪"):
+            return
+        self.root.destroy()
+
+    def run(self):
+        """Executa a aplicação"""
+        try:
+            print("🎪 Sistema Criança Esperança iniciado!")
+            self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+            self.root.mainloop()
+        except Exception as e:
+            messagebox.showerror("Erro", f"Erro crítico: {e}")
+        finally:
+            self.watchdog.stop()
+            if self.manager:
+                self.manager.close_jobs()
+            self.db.close()
+
+
+# Executar aplicação
+if __name__ == "__main__":
+    app = CriancaEsperancaApp()
+    app.run()
@@ -0,0 +1,324 @@
+"""Medições dos caminhos críticos da aplicação, sem interface gráfica.
+
+Cada operação é o equivalente, na camada de serviços, do que a tela faz:
+painel (get_dashboard_stats), carga e rolagem das tabelas
+(load_table_data), busca enquanto digita (search_records), salvamento
+(save_record), login e a abertura do banco na inicialização. O banco de
+medição é gerado por seed_data.py, com semente fixa, se ainda não existir.
+
+Para cada operação são informados p50/p95/p99 (ms) e o pico de memória
+Python (tracemalloc). O resultado pode ser gravado como base em JSON e
+comparado com uma base anterior; regressões no p95 acima da tolerância
+fazem o programa sair com código 1.
+
+Uso: python benchmark.py [--escala 100k] [--salvar base.json] [--comparar base.json]
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import sqlite3
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import database
+
+from migrations import migrate
+from search_index import build_match_query
+from seed_data import DEFAULT_SEED, FIRST_NAMES, LAST_NAMES, SEED_PASSWORD, parse_scale, seed
+from services import FileStorage, Services, dashboard_stats, recent_activities
+from virtual_table import sort_key
+
+try:
+    import resource
+except ImportError:     # Windows
+    resource = None
+
+# Mesmos parâmetros das telas (main.py / virtual_table.py)
+WINDOW_ROWS = 12 + 100          # Linhas visíveis + pré-carga
+SEARCH_CACHE_LIMIT = 5000
+
+WARMUP = 5
+MEMORY_RUNS = 5
+MIN_REGRESSION_MS = 0.2         # Diferenças menores que isso são ruído
+
+
+def percentile(samples, fraction):
+    """Percentil pelo posto mais próximo (amostras já ordenadas)"""
+    if not samples:
+        return 0.0
+    index = max(0, math.ceil(fraction * len(samples)) - 1)
+    return samples[index]
+
+
+class BenchContext:
+    """Estado compartilhado pelas operações: conexão, repositórios e sorteio"""
+
+    def __init__(self, path, seed_value):
+        self.path = path
+        self.services = Services(FileStorage(path))
+        self.conn = self.services.connect()
+        self.rng = random.Random(f"{seed_value}:benchmark")
+        self.created = []       # (tabela, id) gravados pelas medições, apagados no fim
+        self.users = self.conn.execute("SELECT COUNT(*) FROM usuarios").fetchone()[0]
+
+    def close(self):
+        for table_name in {table for table, _ in self.created}:
+            ids = [record_id for table, record_id in self.created if table == table_name]
+            self.services.table(table_name).delete(self.conn, ids)
+        database.close(self.conn)
+
+
+def op_startup(ctx):
+    """Abrir o banco, conferir migrações e montar o painel"""
+    conn = database.connect(ctx.path)
+    try:
+        migrate(conn)
+        dashboard_stats(conn)
+        recent_activities(conn)
+    finally:
+        conn.close()
+
+
+def op_dashboard(ctx):
+    dashboard_stats(ctx.conn)
+    recent_activities(ctx.conn)
+
+
+def op_load_table(ctx):
+    """Abrir uma seção: contagem e primeira janela"""
+    repository = ctx.rng.choice(list(ctx.services.tables.values()))
+    source = repository.source()
+    source.count(ctx.conn)
+    source.fetch_first(ctx.conn, WINDOW_ROWS)
+
+
+def op_scroll(ctx):
+    """Arrastar a barra: posicionar numa posição qualquer e rolar uma página"""
+    repository = ctx.rng.choice(list(ctx.services.tables.values()))
+    source = repository.source()
+    total = source.count(ctx.conn)
+    position = ctx.rng.randrange(max(total, 1))
+    if position > total // 2:
+        rows = source.fetch_from_offset(ctx.conn, max(0, total - 1 - position), WINDOW_ROWS,
+                                        from_end=True)
+    else:
+        rows = source.fetch_from_offset(ctx.conn, position, WINDOW_ROWS)
+    if rows:
+        source.fetch_after(ctx.conn, rows[-1], 100)
+
+
+def op_sorted_load(ctx):
+    """Ordenar pelo cabeçalho: primeira janela e posição no meio"""
+    repository = ctx.rng.choice(list(ctx.services.tables.values()))
+    field = ctx.rng.choice([f for f in repository.fields if f[1] not in ('descricao', 'endereco')])
+    source = repository.source(order=[(sort_key(field), ctx.rng.random() < 0.5)])
+    total = source.count(ctx.conn)
+    source.fetch_first(ctx.conn, WINDOW_ROWS)
+    source.fetch_from_offset(ctx.conn, total // 2, WINDOW_ROWS)
+
+
+def _search_term(rng):
+    word = rng.choice(FIRST_NAMES + LAST_NAMES)
+    term = word[:rng.randint(2, len(word))]
+    if rng.random() < 0.3:
+        other = rng.choice(LAST_NAMES)
+        term += " " + other[:rng.randint(2, len(other))]
+    return term
+
+
+def op_search(ctx):
+    """Busca enquanto digita: lista por relevância ou paginação direta no FTS"""
+    repository = ctx.rng.choice(list(ctx.services.tables.values()))
+    term = _search_term(ctx.rng)
+    matches = repository.ranked_matches(ctx.conn, build_match_query(term), SEARCH_CACHE_LIMIT + 1)
+    if len(matches) > SEARCH_CACHE_LIMIT:
+        source = repository.search_source(term)
+        source.count(ctx.conn)
+        source.fetch_first(ctx.conn, WINDOW_ROWS)
+
+
+def op_save_record(ctx):
+    """Salvar um beneficiário novo e depois editá-lo, relendo a linha a cada vez"""
+    repository = ctx.services.table('beneficiarios')
+    record = {
+        'nome': f"{ctx.rng.choice(FIRST_NAMES)} {ctx.rng.choice(LAST_NAMES)}",
+        'idade': str(ctx.rng.randint(0, 17)),
+        'responsavel': f"{ctx.rng.choice(FIRST_NAMES)} {ctx.rng.choice(LAST_NAMES)}",
+        'situacao': "Ativo",
+    }
+    record_id = repository.insert(ctx.conn, record)
+    ctx.created.append(('beneficiarios', record_id))
+    repository.fetch(ctx.conn, record_id)
+    record['situacao'] = "Em acompanhamento"
+    repository.update(ctx.conn, record_id, record)
+    repository.fetch(ctx.conn, record_id)
+
+
+def op_login(ctx):
+    number = ctx.rng.randrange(ctx.users)
+    username = "admin" if number == 0 else f"usuario{number:05d}"
+    ctx.services.users.authenticate(ctx.conn, username, SEED_PASSWORD)
+
+
+# (nome, função, repetições relativas às pedidas)
+OPERATIONS = [
+    ('startup', op_startup, 0.25),
+    ('dashboard', op_dashboard, 1),
+    ('load_table', op_load_table, 1),
+    ('scroll', op_scroll, 1),
+    ('sorted_load', op_sorted_load, 1),
+    ('search', op_search, 1),
+    ('save_record', op_save_record, 0.5),
+    ('login', op_login, 1),
+]
+
+
+def measure(ctx, operation, runs):
+    """Latências (ms) e pico de memória Python (KiB) de uma operação"""
+    for _ in range(WARMUP):
+        operation(ctx)
+
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        operation(ctx)
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+
+    # Memória medida à parte: o tracemalloc distorce os tempos
+    tracemalloc.start()
+    for _ in range(MEMORY_RUNS):
+        operation(ctx)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        'runs': runs,
+        'mean': sum(samples) / len(samples),
+        'p50': percentile(samples, 0.50),
+        'p95': percentile(samples, 0.95),
+        'p99': percentile(samples, 0.99),
+        'max': samples[-1],
+        'peak_kib': peak / 1024,
+    }
+
+
+def run_benchmarks(path, runs, seed_value=DEFAULT_SEED, only=None, progress=None):
+    ctx = BenchContext(path, seed_value)
+    results = {}
+    try:
+        for name, operation, weight in OPERATIONS:
+            if only and name not in only:
+                continue
+            results[name] = measure(ctx, operation, max(10, int(runs * weight)))
+            if progress:
+                progress(name, results[name])
+    finally:
+        ctx.close()
+    return results
+
+
+def process_peak_mib():
+    """Pico de memória residente do processo, se o sistema informar"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KiB, macOS em bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def table_sizes(path):
+    conn = database.connect(path)
+    try:
+        return {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                for table in ('usuarios', 'projetos', 'voluntarios', 'beneficiarios', 'atividades')}
+    finally:
+        conn.close()
+
+
+def compare(results, baseline, tolerance):
+    """Linhas de comparação com a base; retorna (linhas, houve regressão)"""
+    lines = []
+    regressed = False
+    for name, current in results.items():
+        base = baseline.get('results', {}).get(name)
+        if base is None:
+            lines.append(f"   {name:12} (sem base)")
+            continue
+        change = (current['p95'] - base['p95']) / base['p95'] if base['p95'] else 0.0
+        slower = change > tolerance and current['p95'] - base['p95'] > MIN_REGRESSION_MS
+        regressed = regressed or slower
+        mark = "❌" if slower else ("🚀" if change < -tolerance else "✅")
+        lines.append(f"{mark} {name:12} p95 {base['p95']:8.2f} -> {current['p95']:8.2f} ms "
+                     f"({change:+.0%})  memória {base['peak_kib']:8.0f} -> {current['peak_kib']:8.0f} KiB")
+    return lines, regressed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Medições do Criança Esperança")
+    parser.add_argument("--escala", default="10k", help="10k, 100k, 1m ou número de linhas")
+    parser.add_argument("--semente", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--db", help="banco de medição (padrão: benchmark_<escala>.db)")
+    parser.add_argument("--repeticoes", type=int, default=200, help="execuções por operação")
+    parser.add_argument("--so", nargs='+', choices=[name for name, _, _ in OPERATIONS],
+                        help="mede só estas operações")
+    parser.add_argument("--salvar", help="grava o resultado como base (JSON)")
+    parser.add_argument("--comparar", help="compara com uma base gravada antes (JSON)")
+    parser.add_argument("--tolerancia", type=float, default=0.20,
+                        help="aumento de p95 aceito antes de acusar regressão (0.20 = 20%%)")
+    args = parser.parse_args()
+
+    rows = parse_scale(args.escala)
+    path = args.db or f"benchmark_{args.escala.lower()}.db"
+    if not os.path.exists(path):
+        print(f"🌱 Gerando {path} ({rows:,} linhas por tabela, semente {args.semente})...")
+        conn = database.connect(path, profile='benchmark')
+        seed(conn, rows, args.semente)
+        database.close(conn)
+
+    def show_result(name, result):
+        print(f"   {name:12} p50 {result['p50']:8.2f}  p95 {result['p95']:8.2f}  "
+              f"p99 {result['p99']:8.2f} ms   memória {result['peak_kib']:8.0f} KiB")
+
+    print(f"⏱️ Medindo {path} ({args.repeticoes} repetições)")
+    results = run_benchmarks(path, args.repeticoes, args.semente, args.so, progress=show_result)
+    max_rss = process_peak_mib()
+    if max_rss is not None:
+        print(f"   pico de memória do processo: {max_rss:.0f} MiB")
+
+    report = {
+        'meta': {
+            'data': datetime.now().isoformat(timespec='seconds'),
+            'banco': path,
+            'tabelas': table_sizes(path),
+            'semente': args.semente,
+            'repeticoes': args.repeticoes,
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'plataforma': platform.platform(),
+            'max_rss_mib': max_rss,
+        },
+        'results': results,
+    }
+
+    regressed = False
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as handle:
+            baseline = json.load(handle)
+        if baseline.get('meta', {}).get('tabelas') != report['meta']['tabelas']:
+            print("⚠️ A base foi medida com outro volume de dados")
+        print(f"📊 Comparação com {args.comparar} (tolerância {args.tolerancia:.0%})")
+        lines, regressed = compare(results, baseline, args.tolerancia)
+        print('\n'.join(lines))
+
+    if args.salvar:
+        with open(args.salvar, 'w', encoding='utf-8') as handle:
+            json.dump(report, handle, ensure_ascii=False, indent=2)
+        print(f"💾 Base gravada em {args.salvar}")
+
+    sys.exit(1 if regressed else 0)
@@ -0,0 +1,247 @@
+"""Exportação de tabelas em CSV, JSONL ou XLSX.
+
+As linhas vêm de uma fonte da tabela virtualizada (tabela inteira ou
+resultado de busca) e são lidas do cursor sob demanda, escritas em
+arquivos com buffer e nunca acumuladas em memória. O XLSX é montado
+direto no ZIP, sem bibliotecas externas, e passa para uma nova planilha
+ao atingir o limite de linhas do Excel.
+
+Uso: python bulk_export.py beneficiarios saida.csv [--busca TERMO] [--db BANCO]
+"""
+import argparse
+import csv
+import json
+import os
+import re
+import time
+import zipfile
+from xml.sax.saxutils import escape
+
+import database
+
+from migrations import migrate
+from search_index import FtsSource, build_match_query
+from virtual_table import KeysetSource
+
+EXPORT_FORMATS = ('csv', 'jsonl', 'xlsx')
+PROGRESS_EVERY = 5000           # Linhas entre avisos de progresso
+WRITE_BUFFER = 1024 * 1024      # bytes
+XLSX_MAX_ROWS = 1048576         # Limite de linhas por planilha do Excel
+
+# Caracteres de controle não são permitidos em XML
+_XML_INVALID = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+class ExportResult:
+    """Andamento e resultado de uma exportação"""
+
+    def __init__(self, total=0):
+        self.exported = 0
+        self.total = total
+        self.cancelled = False
+
+    @property
+    def fraction(self):
+        if not self.total:
+            return 0.0
+        return min(1.0, self.exported / self.total)
+
+
+def export_format(path):
+    extension = os.path.splitext(path)[1].lower().lstrip('.')
+    if extension == 'ndjson':
+        return 'jsonl'
+    if extension not in EXPORT_FORMATS:
+        raise ValueError(f"Formato não suportado: .{extension} (use .csv, .jsonl ou .xlsx)")
+    return extension
+
+
+class CsvWriter:
+    """CSV com ';' e BOM, como o Excel em português espera"""
+
+    def __init__(self, path, header):
+        self.handle = open(path, 'w', encoding='utf-8-sig', newline='', buffering=WRITE_BUFFER)
+        self.writer = csv.writer(self.handle, delimiter=';')
+        self.writer.writerow(header)
+
+    def write(self, values):
+        self.writer.writerow(values)
+
+    def close(self):
+        self.handle.close()
+
+
+class JsonlWriter:
+    """Um objeto JSON por linha, com os nomes das colunas do banco"""
+
+    def __init__(self, path, keys):
+        self.handle = open(path, 'w', encoding='utf-8', buffering=WRITE_BUFFER)
+        self.keys = keys
+
+    def write(self, values):
+        self.handle.write(json.dumps(dict(zip(self.keys, values)), ensure_ascii=False))
+        self.handle.write('\n')
+
+    def close(self):
+        self.handle.close()
+
+
+class XlsxWriter:
+    """Planilha XLSX mínima gravada em fluxo (strings inline, sem estilos)"""
+
+    NAMESPACE = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+    RELATIONSHIPS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+
+    def __init__(self, path, header):
+        self.zip = zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED)
+        self.header = header
+        self.sheets = 0
+        self.sheet = None
+        self.rows_in_sheet = 0
+        self.pending = []
+        self._new_sheet()
+
+    @staticmethod
+    def _cell(value):
+        if value is None:
+            return '<c/>'
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return f'<c><v>{value}</v></c>'
+        text = escape(_XML_INVALID.sub('', str(value)))
+        return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+    def _new_sheet(self):
+        if self.sheet is not None:
+            self._end_sheet()
+        self.sheets += 1
+        self.sheet = self.zip.open(f'xl/worksheets/sheet{self.sheets}.xml', 'w', force_zip64=True)
+        self.sheet.write(('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                          f'<worksheet xmlns="{self.NAMESPACE}"><sheetData>').encode())
+        self.rows_in_sheet = 0
+        self.write(self.header)
+
+    def _flush(self):
+        if self.pending:
+            self.sheet.write(''.join(self.pending).encode())
+            self.pending = []
+
+    def _end_sheet(self):
+        self._flush()
+        self.sheet.write(b'</sheetData></worksheet>')
+        self.sheet.close()
+
+    def write(self, values):
+        if self.rows_in_sheet >= XLSX_MAX_ROWS:
+            self._new_sheet()
+        self.rows_in_sheet += 1
+        cells = ''.join(self._cell(value) for value in values)
+        self.pending.append(f'<row r="{self.rows_in_sheet}">{cells}</row>')
+        if len(self.pending) >= 1000:
+            self._flush()
+
+    def close(self):
+        self._end_sheet()
+        sheets = range(1, self.sheets + 1)
+
+        self.zip.writestr('[Content_Types].xml', (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            + ''.join(f'<Override PartName="/xl/worksheets/sheet{n}.xml" '
+                      'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+                      for n in sheets)
+            + '</Types>'))
+        self.zip.writestr('_rels/.rels', (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" Target="xl/workbook.xml" '
+            f'Type="{self.RELATIONSHIPS}/officeDocument"/>'
+            '</Relationships>'))
+        self.zip.writestr('xl/workbook.xml', (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            f'<workbook xmlns="{self.NAMESPACE}" xmlns:r="{self.RELATIONSHIPS}"><sheets>'
+            + ''.join(f'<sheet name="Planilha{n}" sheetId="{n}" r:id="rId{n}"/>' for n in sheets)
+            + '</sheets></workbook>'))
+        self.zip.writestr('xl/_rels/workbook.xml.rels', (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            + ''.join(f'<Relationship Id="rId{n}" Target="worksheets/sheet{n}.xml" '
+                      f'Type="{self.RELATIONSHIPS}/worksheet"/>' for n in sheets)
+            + '</Relationships>'))
+        self.zip.close()
+
+
+def open_writer(path, fields):
+    """Escritor do formato indicado pela extensão do arquivo"""
+    file_format = export_format(path)
+    if file_format == 'jsonl':
+        return JsonlWriter(path, ['id'] + [field[1] for field in fields])
+    header = ['ID'] + [field[0] for field in fields]
+    if file_format == 'xlsx':
+        return XlsxWriter(path, header)
+    return CsvWriter(path, header)
+
+
+def export_source(conn, source, fields, path, progress=None, cancel_event=None):
+    """Exporta todas as linhas da fonte para o arquivo (thread do banco).
+
+    progress(result) é chamado a cada PROGRESS_EVERY linhas. Se a
+    exportação for cancelada o arquivo incompleto é apagado.
+    """
+    result = ExportResult(source.count(conn))
+    width = 1 + len(fields)    # id + campos; chaves de ordenação ficam de fora
+
+    writer = open_writer(path, fields)
+    try:
+        for row in source.iter_rows(conn):
+            writer.write(row[:width])
+            result.exported += 1
+            if result.exported % PROGRESS_EVERY == 0:
+                if progress:
+                    progress(result)
+                if cancel_event is not None and cancel_event.is_set():
+                    result.cancelled = True
+                    break
+    finally:
+        writer.close()
+
+    if result.cancelled:
+        os.remove(path)
+    elif progress:
+        progress(result)
+    return result
+
+
+if __name__ == "__main__":
+    from services import TABLE_FIELDS
+
+    parser = argparse.ArgumentParser(description="Exportação de tabelas (CSV/JSONL/XLSX)")
+    parser.add_argument("tabela", choices=sorted(TABLE_FIELDS))
+    parser.add_argument("arquivo", help="arquivo .csv, .jsonl ou .xlsx")
+    parser.add_argument("--busca", help="exporta só o resultado desta busca")
+    parser.add_argument("--db", default=database.DB_PATH, help="arquivo do banco")
+    args = parser.parse_args()
+
+    fields = TABLE_FIELDS[args.tabela]
+    columns = [field[1] for field in fields]
+    match = build_match_query(args.busca) if args.busca else None
+    if match:
+        source = FtsSource(args.tabela, columns, match)
+    else:
+        source = KeysetSource(args.tabela, columns)
+
+    def show_progress(result):
+        print(f"\r⏳ {result.fraction:6.1%}  {result.exported} linha(s)", end='', flush=True)
+
+    conn = database.connect(args.db)
+    migrate(conn)
+    started = time.perf_counter()
+    result = export_source(conn, source, fields, args.arquivo, progress=show_progress)
+    elapsed = time.perf_counter() - started
+    database.close(conn)
+
+    print()
+    print(f"✅ {result.exported} registro(s) exportado(s) em {elapsed:.1f}s para {args.arquivo}")
@@ -0,0 +1,400 @@
+"""Importação em lote de voluntários e beneficiários (CSV ou JSONL).
+
+O arquivo é lido linha a linha, as colunas são associadas aos campos da
+seção (pelo nome da coluna no banco ou pelo rótulo da tela), os valores
+são validados e convertidos, e as linhas válidas entram com executemany
+em lotes de CHUNK_SIZE linhas, cada lote na sua própria transação
+(bulk_load); a leitura do arquivo acontece fora das transações.
+Linhas inválidas são contadas e descritas em ImportResult.rejects, sem
+interromper a importação.
+
+Uso: python bulk_import.py voluntarios arquivo.csv [--db BANCO]
+"""
+import argparse
+import csv
+import json
+import os
+import time
+from contextlib import contextmanager
+
+import database
+
+import change_log
+import counters
+import dates
+import reports
+import search_index
+from migrations import BULK_LOAD_TABLE, insert_triggers, migrate
+from search_cache import normalize_text
+
+IMPORT_TABLES = ('voluntarios', 'beneficiarios')
+REQUIRED_COLUMNS = ('nome', 'titulo')
+CHUNK_SIZE = 5000
+MAX_REJECT_DETAILS = 1000   # Além disso as rejeições só são contadas
+
+
+class RowError(ValueError):
+    """Linha do arquivo com valor inválido"""
+
+
+class ImportResult:
+    """Andamento e resultado de uma importação"""
+
+    def __init__(self, total_bytes=0):
+        self.imported = 0
+        self.rejected = 0
+        self.rejects = []           # (linha, motivo)
+        self.ignored_columns = []
+        self.bytes_read = 0
+        self.total_bytes = total_bytes
+        self.cancelled = False
+
+    @property
+    def fraction(self):
+        if not self.total_bytes:
+            return 0.0
+        return min(1.0, self.bytes_read / self.total_bytes)
+
+    def reject(self, line, reason):
+        self.rejected += 1
+        if len(self.rejects) < MAX_REJECT_DETAILS:
+            self.rejects.append((line, reason))
+
+
+def _field_key(name):
+    return normalize_text(name.replace('_', ' ')).strip()
+
+
+def map_columns(header, fields):
+    """Associa colunas do arquivo aos campos: {coluna do arquivo: campo}"""
+    known = {}
+    for field in fields:
+        known[_field_key(field[1])] = field
+        known[_field_key(field[0])] = field
+
+    mapping = {}
+    ignored = []
+    for name in header:
+        field = known.get(_field_key(name or ''))
+        if field is None or field in mapping.values():
+            ignored.append(name)
+        else:
+            mapping[name] = field
+    return mapping, ignored
+
+
+def coerce_value(field, value):
+    """Converte um valor do arquivo para o tipo do campo"""
+    label, field_type = field[0], field[2]
+    if value is None:
+        return None
+    if field_type == 'number' and isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value
+
+    text = str(value).strip()
+    if not text:
+        return None
+
+    if field_type == 'number':
+        number = text.replace(' ', '')
+        if ',' in number:
+            # Formato brasileiro: 1.234,56
+            number = number.replace('.', '').replace(',', '.')
+        try:
+            result = float(number)
+        except ValueError:
+            raise RowError(f"{label}: número inválido '{text}'")
+        return int(result) if result.is_integer() else result
+
+    if field_type == 'date':
+        # Gravada em ISO (AAAA-MM-DD), que ordena e filtra pelo índice
+        try:
+            return dates.parse_date(text)
+        except ValueError:
+            raise RowError(f"{label}: data inválida '{text}' (use DD/MM/AAAA)")
+
+    if field_type == 'combo':
+        options = field[4] if len(field) > 4 else []
+        if text not in options:
+            raise RowError(f"{label}: '{text}' não é uma opção válida")
+
+    return text
+
+
+def _text_value(value):
+    if value is None:
+        return None
+    return str(value).strip() or None
+
+
+def record_converter(header, mapping, fields):
+    """Função que converte os valores de uma linha na tupla de campos.
+
+    Montada uma vez por cabeçalho: cada campo já sabe de qual posição da
+    linha vem e qual conversão aplicar.
+    """
+    positions = {field[1]: header.index(name) for name, field in mapping.items()}
+    steps = []
+    for field in fields:
+        coerce = None if field[2] == 'text' else coerce_value
+        steps.append((positions.get(field[1]), coerce, field, field[1] in REQUIRED_COLUMNS))
+    width = len(header)
+
+    def convert(values):
+        if len(values) < width:
+            values = list(values) + [None] * (width - len(values))
+        result = []
+        for position, coerce, field, required in steps:
+            value = values[position] if position is not None else None
+            value = coerce(field, value) if coerce else _text_value(value)
+            if value is None and required:
+                raise RowError(f"{field[0]}: campo obrigatório vazio")
+            result.append(value)
+        return tuple(result)
+
+    return convert
+
+
+def read_csv(handle):
+    """Linhas (número, cabeçalho, valores) de um CSV separado por vírgula ou ponto e vírgula"""
+    sample = handle.readline()
+    handle.seek(0)
+    delimiter = ';' if sample.count(';') > sample.count(',') else ','
+    reader = csv.reader(handle, delimiter=delimiter)
+    header = tuple(next(reader, ()))
+    for values in reader:
+        if values:
+            yield reader.line_num, header, values
+
+
+def read_jsonl(handle):
+    """Linhas (número, cabeçalho, valores) de um arquivo JSON Lines"""
+    for line_number, line in enumerate(handle, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield line_number, None, RowError(f"JSON inválido: {e}")
+            continue
+        if not isinstance(record, dict):
+            yield line_number, None, RowError("linha JSON não é um objeto")
+            continue
+        yield line_number, tuple(record), list(record.values())
+
+
+def file_format(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension in ('.jsonl', '.ndjson'):
+        return 'jsonl'
+    if extension == '.csv':
+        return 'csv'
+    raise ValueError(f"Formato não suportado: {extension or path} (use .csv ou .jsonl)")
+
+
+def _maintained_triggers(conn, table_name):
+    """Triggers AFTER INSERT da tabela que a carga em lote substitui pela manutenção em conjunto"""
+    names = insert_triggers(table_name)
+    placeholders = ', '.join('?' for _ in names)
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT name FROM sqlite_master WHERE type = 'trigger' AND name IN ({placeholders})",
+                   names)
+    return {name for name, in cursor.fetchall()}
+
+
+@contextmanager
+def _staging_table(conn, table_name, columns):
+    """Tabela temporária (só desta conexão) onde cada lote chega antes de ir para a tabela"""
+    name = f"carga_{table_name}"
+    conn.execute(f"CREATE TEMP TABLE {name} ({', '.join(columns)})")
+    try:
+        yield f"temp.{name}"
+    finally:
+        conn.execute(f"DROP TABLE temp.{name}")
+
+
+def _load_chunk(conn, table_name, columns, staging, batch, maintained, reload_mark=False):
+    """Grava um lote na sua própria transação, sem os triggers por linha.
+
+    A linha da tabela em carga_em_lote desliga os triggers AFTER INSERT
+    só dentro desta transação (migrations.gate_insert_triggers): quem
+    grava entre um lote e outro segue com os triggers normais. O lote
+    passa pela tabela temporária e entra com um único INSERT ... SELECT:
+    numa tabela com triggers cada instrução abre o seu diário, e uma por
+    linha custava tanto quanto os próprios triggers. Antes do commit o
+    índice de busca, os contadores e os resumos recebem de uma vez as
+    linhas do lote. Um erro desfaz apenas este lote.
+    """
+    cols = ', '.join(columns)
+    placeholders = ', '.join('?' for _ in columns)
+    with database.immediate(conn):
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table_name}")
+        last_id = cursor.fetchone()[0]
+
+        cursor.executemany(f"INSERT INTO {staging} VALUES ({placeholders})", batch)
+        cursor.execute(f"INSERT INTO {BULK_LOAD_TABLE} (tabela) VALUES (?)", (table_name,))
+        cursor.execute(f"INSERT INTO {table_name} ({cols}) SELECT {cols} FROM {staging}")
+        cursor.execute(f"DELETE FROM {BULK_LOAD_TABLE} WHERE tabela = ?", (table_name,))
+        cursor.execute(f"DELETE FROM {staging}")
+
+        if search_index.insert_trigger(table_name) in maintained:
+            search_index.index_new_rows(conn, table_name, last_id)
+        if counters.insert_trigger(table_name) in maintained:
+            counters.count_new_rows(conn, table_name, last_id)
+        if reports.insert_trigger(table_name) in maintained:
+            reports.add_new_rows(conn, table_name, last_id)
+        if reload_mark and change_log.insert_trigger(table_name) in maintained:
+            change_log.log_reload(conn, table_name)
+
+
+@contextmanager
+def bulk_load(conn, table_name, columns):
+    """Carga em vários lotes: produz insert(lote), um commit por lote.
+
+    Cada lote é uma lista de tuplas na ordem de columns. Nenhuma
+    transação fica aberta entre os lotes (a leitura e a conversão do
+    próximo lote acontecem fora dela), então outras conexões gravam no
+    intervalo. O registro de alterações ganha uma única marca de recarga
+    ao fim da carga, também se ela for cancelada ou falhar depois de
+    algum lote gravado.
+    """
+    maintained = _maintained_triggers(conn, table_name)
+    loaded = False
+
+    with _staging_table(conn, table_name, columns) as staging:
+        def insert(batch):
+            nonlocal loaded
+            _load_chunk(conn, table_name, columns, staging, batch, maintained)
+            loaded = True
+
+        try:
+            yield insert
+        finally:
+            if loaded and change_log.insert_trigger(table_name) in maintained:
+                with database.immediate(conn):
+                    change_log.log_reload(conn, table_name)
+
+
+def insert_chunk(conn, table_name, columns, batch):
+    """Grava um único lote como carga em lote, com a marca de recarga na mesma transação"""
+    maintained = _maintained_triggers(conn, table_name)
+    with _staging_table(conn, table_name, columns) as staging:
+        _load_chunk(conn, table_name, columns, staging, batch, maintained, reload_mark=True)
+
+
+def import_rows(conn, rows, table_name, fields, result, chunk_size=CHUNK_SIZE,
+                progress=None, cancel_event=None, position=None):
+    """Valida e insere as linhas (número, cabeçalho, valores) em lotes.
+
+    progress(result) é chamado após cada lote, na thread que importa.
+    Cada lote é gravado ao ser inserido: os lotes anteriores ficam se a
+    importação for cancelada, e um erro de banco desfaz só o lote em que
+    aconteceu.
+    """
+    if table_name not in IMPORT_TABLES:
+        raise ValueError(f"Importação não disponível para a tabela {table_name}")
+
+    columns = [field[1] for field in fields]
+    converters = {}   # JSONL pode trazer chaves diferentes em cada linha
+    batch = []
+    with bulk_load(conn, table_name, columns) as insert:
+        for line, header, values in rows:
+            if isinstance(values, RowError):
+                result.reject(line, str(values))
+                continue
+
+            convert = converters.get(header)
+            if convert is None:
+                mapping, ignored = map_columns(header, fields)
+                convert = converters[header] = record_converter(header, mapping, fields)
+                result.ignored_columns.extend(c for c in ignored if c not in result.ignored_columns)
+
+            try:
+                batch.append(convert(values))
+            except RowError as e:
+                result.reject(line, str(e))
+                continue
+
+            if len(batch) >= chunk_size:
+                insert(batch)
+                result.imported += len(batch)
+                batch = []
+                if position:
+                    result.bytes_read = position()
+                if progress:
+                    progress(result)
+                if cancel_event is not None and cancel_event.is_set():
+                    # Os lotes já gravados ficam
+                    result.cancelled = True
+                    break
+
+        if batch and not result.cancelled:
+            insert(batch)
+            result.imported += len(batch)
+
+    # Uma carga grande é também o momento de aparar o registro de alterações
+    change_log.prune(conn)
+    if result.cancelled:
+        return result
+    result.bytes_read = result.total_bytes
+    if progress:
+        progress(result)
+    return result
+
+
+def import_file(conn, path, table_name, fields, chunk_size=CHUNK_SIZE,
+                progress=None, cancel_event=None):
+    """Importa um arquivo CSV/JSONL para a tabela (thread do banco)"""
+    reader = read_jsonl if file_format(path) == 'jsonl' else read_csv
+    result = ImportResult(os.path.getsize(path))
+
+    with open(path, 'r', encoding='utf-8-sig', newline='', buffering=1024 * 1024) as handle:
+        # A posição do buffer binário avança por blocos; basta para o progresso
+        return import_rows(conn, reader(handle), table_name, fields, result,
+                           chunk_size=chunk_size, progress=progress,
+                           cancel_event=cancel_event, position=handle.buffer.tell)
+
+
+def write_rejects(result, path):
+    """Grava as linhas rejeitadas (linha, motivo) num CSV"""
+    with open(path, 'w', encoding='utf-8', newline='') as handle:
+        writer = csv.writer(handle, delimiter=';')
+        writer.writerow(['linha', 'motivo'])
+        writer.writerows(result.rejects)
+
+
+def rejects_path(path):
+    return os.path.splitext(path)[0] + '.rejeitados.csv'
+
+
+if __name__ == "__main__":
+    from services import TABLE_FIELDS
+
+    parser = argparse.ArgumentParser(description="Importação em lote (CSV/JSONL)")
+    parser.add_argument("tabela", choices=IMPORT_TABLES)
+    parser.add_argument("arquivo", help="arquivo .csv ou .jsonl")
+    parser.add_argument("--db", default=database.DB_PATH, help="arquivo do banco")
+    parser.add_argument("--lote", type=int, default=CHUNK_SIZE, help="linhas por lote (cada lote é uma transação)")
+    args = parser.parse_args()
+
+    def show_progress(result):
+        print(f"\r⏳ {result.fraction:6.1%}  {result.imported} importada(s), "
+              f"{result.rejected} rejeitada(s)", end='', flush=True)
+
+    conn = database.connect(args.db)
+    migrate(conn)
+    started = time.perf_counter()
+    result = import_file(conn, args.arquivo, args.tabela, TABLE_FIELDS[args.tabela],
+                         chunk_size=args.lote, progress=show_progress)
+    elapsed = time.perf_counter() - started
+    database.close(conn)
+
+    print()
+    print(f"✅ {result.imported} registro(s) importado(s) em {elapsed:.1f}s "
+          f"({result.imported / max(elapsed, 1e-9):,.0f} linhas/s)")
+    if result.ignored_columns:
+        print(f"⚠️ Colunas ignoradas: {', '.join(map(str, result.ignored_columns))}")
+    if result.rejected:
+        write_rejects(result, rejects_path(args.arquivo))
+        print(f"❌ {result.rejected} linha(s) rejeitada(s) — detalhes em {rejects_path(args.arquivo)}")
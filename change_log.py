@@ -0,0 +1,145 @@
+"""Registro de alterações dos cadastros, para atualizar as telas por diferença.
+
+Triggers gravam em 'alteracoes' cada inclusão (I), alteração (U) e
+exclusão (D) de um registro, com o momento da mudança. A exclusão fica
+como lápide: só o id e a operação. A coluna seq é crescente; quem já
+leu até seq N pede só o que veio depois e aplica essas mudanças, sem
+reler a tabela.
+
+Cargas em lote (bulk_import) não registram linha a linha: gravam uma
+única marca R ("recarregar"), que faz as telas relerem a janela atual.
+"""
+import argparse
+
+import database
+
+# Tabelas de cadastro acompanhadas
+LOGGED_TABLES = ('projetos', 'voluntarios', 'beneficiarios', 'atividades')
+
+MAX_DELTA = 500             # Mais mudanças que isso: relê a janela inteira
+KEEP_CHANGES = 200_000      # Entradas mantidas por prune()
+
+
+def insert_trigger(table_name):
+    """Nome do trigger que registra cada linha inserida"""
+    return f"{table_name}_alteracoes_ai"
+
+
+def _log(table_name, record, operation):
+    return (f"INSERT INTO alteracoes (tabela, registro, operacao) "
+            f"VALUES ('{table_name}', {record}, '{operation}');")
+
+
+def create_change_log(conn):
+    """Cria a tabela de alterações e os triggers que a alimentam"""
+    cursor = conn.cursor()
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS alteracoes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            tabela TEXT NOT NULL,
+            registro INTEGER,
+            operacao TEXT NOT NULL,
+            momento TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_alteracoes_tabela_seq ON alteracoes (tabela, seq)")
+
+    for table_name in LOGGED_TABLES:
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {insert_trigger(table_name)}
+            AFTER INSERT ON {table_name} BEGIN
+                {_log(table_name, 'new.id', 'I')}
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {table_name}_alteracoes_au
+            AFTER UPDATE ON {table_name} BEGIN
+                {_log(table_name, 'new.id', 'U')}
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {table_name}_alteracoes_ad
+            AFTER DELETE ON {table_name} BEGIN
+                {_log(table_name, 'old.id', 'D')}
+            END
+        ''')
+
+
+def log_reload(conn, table_name):
+    """Marca R: muitas linhas mudaram de uma vez (importação em lote)"""
+    conn.execute("INSERT INTO alteracoes (tabela, registro, operacao) VALUES (?, NULL, 'R')",
+                 (table_name,))
+
+
+def last_seq(conn):
+    """Marca d'água atual: seq da última alteração registrada (0 se nenhuma)"""
+    cursor = conn.cursor()
+    cursor.execute("SELECT IFNULL(MAX(seq), 0) FROM alteracoes")
+    return cursor.fetchone()[0]
+
+
+def changes_since(conn, table_name, since, until, limit=MAX_DELTA):
+    """Ids alterados e excluídos da tabela com since < seq <= until.
+
+    Retorna (alterados, excluídos), cada id só com a última operação, ou
+    None quando é preciso reler tudo: mudanças demais, uma carga em lote
+    ou entradas que já foram descartadas por prune().
+    """
+    cursor = conn.cursor()
+    cursor.execute("SELECT MIN(seq) FROM alteracoes")
+    oldest = cursor.fetchone()[0]
+    if oldest is not None and since < oldest - 1:
+        return None
+
+    cursor.execute('''
+        SELECT registro, operacao FROM alteracoes
+        WHERE tabela = ? AND seq > ? AND seq <= ?
+        ORDER BY seq
+        LIMIT ?
+    ''', (table_name, since, until, limit + 1))
+    rows = cursor.fetchall()
+    if len(rows) > limit:
+        return None
+
+    last = {}
+    for record_id, operation in rows:
+        if operation == 'R':
+            return None
+        last[record_id] = operation
+    changed = [record_id for record_id, operation in last.items() if operation != 'D']
+    deleted = [record_id for record_id, operation in last.items() if operation == 'D']
+    return changed, deleted
+
+
+def prune(conn, keep=KEEP_CHANGES):
+    """Descarta as entradas mais antigas, mantendo as últimas 'keep'.
+
+    Chamado na abertura, por migrations.prepare_database (tarefa inicial
+    da thread de banco das telas, escritor da API e Services.connect), e
+    ao fim de cada importação; só grava quando há o que descartar.
+    Retorna quantas entradas saíram.
+    """
+    # MIN e MAX em consultas separadas: cada uma é uma busca na ponta da chave
+    oldest = conn.execute("SELECT MIN(seq) FROM alteracoes").fetchone()[0]
+    if oldest is None or oldest > last_seq(conn) - keep:
+        return 0
+    with database.immediate(conn):
+        cursor = conn.execute("DELETE FROM alteracoes WHERE seq <= (SELECT MAX(seq) FROM alteracoes) - ?",
+                              (keep,))
+    return cursor.rowcount
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Registro de alterações do Criança Esperança")
+    parser.add_argument("--db", default=database.DB_PATH, help="arquivo do banco")
+    parser.add_argument("--manter", type=int, default=KEEP_CHANGES,
+                        help="entradas mantidas ao limpar o registro")
+    args = parser.parse_args()
+
+    conn = database.connect(args.db)
+    before = last_seq(conn)
+    removed = prune(conn, args.manter)
+    remaining = conn.execute("SELECT COUNT(*) FROM alteracoes").fetchone()[0]
+    print(f"🧹 Registro de alterações: {removed} entrada(s) descartada(s), "
+          f"{remaining} mantida(s) (última seq {before})")
+    database.close(conn)
@@ -0,0 +1,107 @@
+"""Confere a edição concorrente: vários processos salvando ao mesmo tempo.
+
+Cada processo repete o ciclo da tela de edição sobre poucos registros
+disputados: lê o registro com a versão (fetch_versioned), soma 1 ao
+orçamento e grava com update(..., version=...). Num conflito relê e
+tenta de novo, como faria o usuário que escolhe "abrir a versão atual".
+Ao final, a soma dos orçamentos tem de ser exatamente o número de
+salvamentos: qualquer diferença é uma alteração perdida. Sai com código
+1 se houver alteração perdida ou erro de banco ocupado.
+
+Uso: python check_concurrent_writes.py [--processos 10] [--salvamentos 300] [--registros 5]
+"""
+import argparse
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+import time
+
+import database
+
+from services import ConflictError, FileStorage, Services
+
+
+def worker(path, record_ids, saves, number, results):
+    services = Services(FileStorage(path))
+    conn = services.connect(migrate_schema=False)
+    repository = services.table('projetos')
+    conflicts = busy = 0
+    for save in range(saves):
+        record_id = record_ids[(number + save) % len(record_ids)]
+        while True:
+            try:
+                row, version = repository.fetch_versioned(conn, record_id)
+                record = dict(zip(repository.columns, row[1:]))
+                record['orcamento'] = (record['orcamento'] or 0) + 1
+                repository.update(conn, record_id, record, version=version)
+                break
+            except ConflictError:
+                conflicts += 1
+            except sqlite3.OperationalError as e:
+                if not database.is_busy(e):
+                    raise
+                busy += 1
+    database.close(conn)
+    results.put((conflicts, busy))
+
+
+def run(path, processes, saves, records):
+    services = Services(FileStorage(path))
+    conn = services.connect()
+    repository = services.table('projetos')
+    record_ids = [repository.insert(conn, {'nome': f"Disputado {n}", 'orcamento': 0})
+                  for n in range(records)]
+    database.close(conn)
+
+    results = multiprocessing.Queue()
+    workers = [multiprocessing.Process(target=worker, args=(path, record_ids, saves, n, results))
+               for n in range(processes)]
+    started = time.perf_counter()
+    for process in workers:
+        process.start()
+    totals = [results.get() for _ in workers]
+    for process in workers:
+        process.join()
+    elapsed = time.perf_counter() - started
+
+    conn = services.connect(migrate_schema=False)
+    placeholders = ', '.join('?' for _ in record_ids)
+    total, versions = conn.execute(
+        f"SELECT SUM(orcamento), SUM(versao - 1) FROM projetos WHERE id IN ({placeholders})",
+        record_ids).fetchone()
+    database.close(conn)
+    return {
+        'expected': processes * saves,
+        'total': int(total),
+        'versions': versions,
+        'conflicts': sum(conflicts for conflicts, _ in totals),
+        'busy': sum(busy for _, busy in totals),
+        'seconds': elapsed,
+        'failed': any(process.exitcode for process in workers),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Confere salvamentos concorrentes sem alterações perdidas")
+    parser.add_argument("--processos", type=int, default=10)
+    parser.add_argument("--salvamentos", type=int, default=300, help="salvamentos por processo")
+    parser.add_argument("--registros", type=int, default=5, help="registros disputados")
+    parser.add_argument("--db", help="banco a usar (padrão: um banco temporário novo)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        path = args.db or os.path.join(folder, "concorrencia.db")
+        result = run(path, args.processos, args.salvamentos, args.registros)
+
+    lost = result['expected'] - result['total']
+    print(f"⏱️ {result['expected']} salvamento(s) em {result['seconds']:.1f} s "
+          f"({result['expected'] / result['seconds']:.0f}/s) por {args.processos} processo(s)")
+    print(f"   conflitos resolvidos relendo: {result['conflicts']}   "
+          f"banco ocupado após as tentativas: {result['busy']}")
+    if lost or result['versions'] != result['expected'] or result['failed']:
+        print(f"❌ {lost} alteração(ões) perdida(s) (soma {result['total']}, "
+              f"versões {result['versions']}, esperado {result['expected']})")
+    else:
+        print("✅ Nenhuma alteração perdida")
+    raise SystemExit(1 if lost or result['busy'] or result['failed'] else 0)
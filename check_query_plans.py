@@ -0,0 +1,223 @@
+"""Verificação de planos de consulta (EXPLAIN QUERY PLAN).
+
+Executa todos os caminhos de consulta da aplicação contra um banco
+temporário já migrado, captura cada instrução realmente emitida e falha
+se alguma delas fizer varredura completa de tabela (inclusive percorrendo
+um índice inteiro) ou ordenar a tabela inteira numa B-tree temporária.
+
+Uso: python check_query_plans.py [--verbose]
+(código de saída 1 em caso de regressão)
+"""
+import argparse
+import re
+import sys
+
+import database
+
+from bulk_import import IMPORT_TABLES, ImportResult, import_rows
+from change_log import changes_since, last_seq
+from counters import read_counters
+from dates import period_range
+from migrations import ISO_DATE_SORT_INDEXES, SORT_INDEXES, migrate
+from reports import REPORTS, run_report
+from search_cache import IdListSource
+from search_index import build_match_query
+from services import ConflictError, Services, dashboard_stats, recent_activities
+from virtual_table import KeysetSource, sort_key
+
+FULL_SCAN = re.compile(r"^SCAN (\w+)( USING (COVERING )?INDEX \w+)?$")
+TEMP_SORT = "USE TEMP B-TREE"
+
+# Exceções conhecidas: (regex da instrução, regex do plano, motivo)
+ALLOWED = [
+    (r"FROM contadores$", r"^SCAN contadores$",
+     "contadores: poucas linhas, lidas inteiras de propósito"),
+    (r"FROM \w+ ORDER BY id (ASC|DESC) LIMIT \d+$", r"^SCAN \w+$",
+     "primeira página em ordem de rowid, interrompida pelo LIMIT"),
+    (r"FROM \w+ ORDER BY id (ASC|DESC)$", r"^SCAN \w+$",
+     "exportação: lê a tabela inteira em ordem de rowid, de propósito"),
+    (r"ORDER BY .+ LIMIT \d+$", r"^SCAN \w+ USING INDEX idx_\w+$",
+     "primeira página na ordem de um índice, interrompida pelo LIMIT"),
+    (r"FROM \w+ ORDER BY .+, id (ASC|DESC)$", r"^SCAN \w+ USING INDEX idx_\w+_ord_\w+$",
+     "exportação ordenada: lê a tabela inteira na ordem do índice, de propósito"),
+    (r"LIMIT 1 OFFSET \d+", r"^SCAN \w+( USING INDEX idx_\w+)?$",
+     "posicionamento da barra de rolagem: percorre só até o OFFSET"),
+    (r"FROM sqlite_master", r"^SCAN sqlite_master$",
+     "catálogo do esquema: poucas linhas"),
+    (r"ORDER BY", r"USE TEMP B-TREE FOR RIGHT PART OF ORDER BY",
+     "ordenação por várias colunas: o índice da primeira, empates ordenados à parte"),
+    (r"LIMIT 1 OFFSET \d+", r"USE TEMP B-TREE FOR ORDER BY",
+     "posicionamento da barra com ordenação por várias colunas"),
+    (r"MATCH", TEMP_SORT,
+     "ordena apenas o resultado do MATCH, não a tabela"),
+]
+
+
+def sample_values(fields, text):
+    values = []
+    for field in fields:
+        if field[2] == 'number':
+            values.append(1)
+        elif field[2] == 'combo':
+            values.append(field[4][0])
+        elif field[2] == 'date':
+            values.append('01/01/2025')
+        else:
+            values.append(text)
+    return values
+
+
+def exercise_source(conn, source):
+    source.count(conn)
+    rows = source.fetch_first(conn, 10)
+    if rows:
+        source.fetch_after(conn, rows[0], 10)
+        source.fetch_before(conn, rows[-1], 10)
+    source.fetch_from_offset(conn, 1, 10)
+    source.fetch_from_offset(conn, 1, 10, from_end=True)
+    list(source.iter_rows(conn))
+
+
+def sorted_sources(table_name, fields):
+    """Fontes ordenadas pelas colunas que têm índice de ordenação"""
+    columns = [field[1] for field in fields]
+    indexed = {expression for _, table, expression in SORT_INDEXES + ISO_DATE_SORT_INDEXES
+               if table == table_name}
+    keys = [sort_key(field) for field in fields if sort_key(field) in indexed]
+    for key in keys:
+        for descending in (False, True):
+            yield KeysetSource(table_name, columns, order=[(key, descending)])
+    if len(keys) > 1:
+        yield KeysetSource(table_name, columns, order=[(keys[0], False), (keys[1], True)])
+
+
+def exercise(conn):
+    """Percorre os caminhos de consulta da camada de dados (services.py)"""
+    services = Services()
+    dashboard_stats(conn)
+    recent_activities(conn)
+    read_counters(conn)
+
+    for table_name, repository in services.tables.items():
+        fields = repository.fields
+        columns = repository.columns
+        repository.count(conn)
+        since = last_seq(conn)
+
+        record_id = repository.insert(conn, sample_values(fields, "Maria"))
+        other_id = repository.insert(conn, sample_values(fields, "João"))
+        repository.fetch(conn, record_id)
+        repository.update(conn, record_id, sample_values(fields, "Mariana"))
+        _, version = repository.fetch_versioned(conn, record_id)
+        repository.update(conn, record_id, sample_values(fields, "Mariane"), version=version)
+        try:
+            repository.update(conn, record_id, sample_values(fields, "Mariano"), version=version)
+        except ConflictError:
+            pass
+
+        match = build_match_query("mar")
+        repository.ranked_matches(conn, match, 10)
+        exercise_source(conn, repository.source())
+        exercise_source(conn, repository.search_source("mar"))
+        exercise_source(conn, IdListSource(table_name, columns, [record_id, other_id]))
+        for source in sorted_sources(table_name, fields):
+            exercise_source(conn, source)
+        for order in [source.order for source in sorted_sources(table_name, fields[:1])]:
+            exercise_source(conn, repository.search_source("mar", order=order))
+
+        # Filtro por período nas colunas de data (faixa do índice de ordenação)
+        for field in fields:
+            if field[2] == 'date':
+                period = (field[1], *period_range('mes'))
+                exercise_source(conn, repository.source(period=period))
+                exercise_source(conn, repository.source(repository.order(['-' + field[1]]), period=period))
+                exercise_source(conn, repository.search_source("mar", period=period))
+
+        # Ordenação pedida por nome de coluna (api_server.py)
+        exercise_source(conn, repository.source(repository.order([columns[0], '-' + columns[-1]])))
+
+        repository.update_field(conn, columns[0], "Lote", [record_id, other_id])
+        repository.delete(conn, [other_id])
+        # Atualização por diferença (registro de alterações)
+        changed, _ = changes_since(conn, table_name, since, last_seq(conn))
+        repository.fetch_many(conn, changed)
+        repository.insert_many(conn, [sample_values(fields, "Lote"), sample_values(fields, "Lote 2")])
+        changes_since(conn, table_name, since, last_seq(conn))
+
+        if table_name in IMPORT_TABLES:
+            header = tuple(columns)
+            rows = [(2, header, sample_values(fields, "Importado"))]
+            import_rows(conn, rows, table_name, fields, ImportResult())
+
+    for name in REPORTS:
+        run_report(conn, name)
+
+    services.users.create(conn, "admin", "senha", "Administrador", "admin@exemplo.org")
+    services.users.authenticate(conn, "admin", "senha")
+
+
+def capture_statements(conn):
+    statements = []
+    conn.set_trace_callback(statements.append)
+    try:
+        exercise(conn)
+    finally:
+        conn.set_trace_callback(None)
+
+    unique = []
+    for sql in statements:
+        sql = ' '.join(sql.split())
+        # Instruções internas de triggers aparecem como comentários
+        if sql.startswith('--') or not re.match(r"(SELECT|UPDATE|DELETE|WITH)\b", sql, re.I):
+            continue
+        # Tabela temporária de um lote da carga em lote: lida e esvaziada
+        # inteira de propósito, e já removida quando os planos são vistos
+        if re.search(r"\btemp\.carga_\w+", sql):
+            continue
+        if sql not in unique:
+            unique.append(sql)
+    return unique
+
+
+def plan_problems(conn, sql):
+    cursor = conn.cursor()
+    cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+    problems = []
+    for row in cursor.fetchall():
+        detail = row[-1]
+        if not (FULL_SCAN.match(detail) or TEMP_SORT in detail):
+            continue
+        if any(re.search(sql_pattern, sql) and re.search(plan_pattern, detail)
+               for sql_pattern, plan_pattern, _ in ALLOWED):
+            continue
+        problems.append(detail)
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verifica os planos de consulta da aplicação")
+    parser.add_argument("--verbose", action="store_true", help="lista também as consultas aprovadas")
+    args = parser.parse_args()
+
+    # Com cache de resultados, para exercitar também a conferência de alterações
+    conn = database.connect(":memory:", profile='benchmark', cached=True)
+    migrate(conn)
+
+    failures = 0
+    statements = capture_statements(conn)
+    for sql in statements:
+        problems = plan_problems(conn, sql)
+        if problems:
+            failures += 1
+            print(f"❌ {sql}")
+            for detail in problems:
+                print(f"     {detail}")
+        elif args.verbose:
+            print(f"✅ {sql}")
+
+    print(f"{len(statements)} consulta(s) verificada(s), {failures} com varredura completa")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+import argparse
+
+import database
+
+# Tabelas contadas e a coluna de status detalhada (se houver)
+COUNTED_TABLES = {
+    'projetos': 'status',
+    'voluntarios': None,
+    'beneficiarios': None,
+    'atividades': 'status',
+}
+
+TOTAL_KEY = '*'
+
+
+def status_key(expression):
+    """Expressão SQL da chave de contagem por status"""
+    return f"'status:' || COALESCE({expression}, '')"
+
+
+def _bump(table_name, key_expression, delta):
+    return (f"INSERT INTO contadores (tabela, chave, total) "
+            f"VALUES ('{table_name}', {key_expression}, {delta}) "
+            f"ON CONFLICT (tabela, chave) DO UPDATE SET total = total + ({delta});")
+
+
+def insert_trigger(table_name):
+    """Nome do trigger que conta cada linha inserida"""
+    return f"{table_name}_contadores_ai"
+
+
+def create_counters(conn):
+    """Cria a tabela de contadores e os triggers que a mantêm.
+
+    Na primeira criação os contadores são calculados a partir das tabelas.
+    """
+    cursor = conn.cursor()
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'contadores'")
+    exists = cursor.fetchone() is not None
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS contadores (
+            tabela TEXT NOT NULL,
+            chave TEXT NOT NULL,
+            total INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (tabela, chave)
+        ) WITHOUT ROWID
+    ''')
+
+    total = f"'{TOTAL_KEY}'"
+    for table_name, status_column in COUNTED_TABLES.items():
+        on_insert = [_bump(table_name, total, 1)]
+        on_delete = [_bump(table_name, total, -1)]
+        if status_column:
+            on_insert.append(_bump(table_name, status_key(f"new.{status_column}"), 1))
+            on_delete.append(_bump(table_name, status_key(f"old.{status_column}"), -1))
+
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS {table_name}_contadores_au
+                AFTER UPDATE OF {status_column} ON {table_name}
+                WHEN old.{status_column} IS NOT new.{status_column} BEGIN
+                    {_bump(table_name, status_key(f"old.{status_column}"), -1)}
+                    {_bump(table_name, status_key(f"new.{status_column}"), 1)}
+                END
+            ''')
+
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {insert_trigger(table_name)}
+            AFTER INSERT ON {table_name} BEGIN
+                {' '.join(on_insert)}
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {table_name}_contadores_ad
+            AFTER DELETE ON {table_name} BEGIN
+                {' '.join(on_delete)}
+            END
+        ''')
+
+    if not exists:
+        rebuild_counters(conn, commit=False)
+
+
+def count_new_rows(conn, table_name, after_id):
+    """Soma aos contadores as linhas com id > after_id (importação em lote)"""
+    keys = [f"'{TOTAL_KEY}'"]
+    status_column = COUNTED_TABLES[table_name]
+    if status_column:
+        keys.append(status_key(status_column))
+    for key in keys:
+        conn.execute(f'''
+            INSERT INTO contadores (tabela, chave, total)
+            SELECT '{table_name}', {key}, COUNT(*) FROM {table_name}
+            WHERE id > ? GROUP BY 2
+            ON CONFLICT (tabela, chave) DO UPDATE SET total = total + excluded.total
+        ''', (after_id,))
+
+
+def rebuild_counters(conn, commit=True):
+    """Recalcula todos os contadores (recuperação de divergências)"""
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM contadores")
+    for table_name, status_column in COUNTED_TABLES.items():
+        cursor.execute(f'''
+            INSERT INTO contadores (tabela, chave, total)
+            SELECT '{table_name}', '{TOTAL_KEY}', COUNT(*) FROM {table_name}
+        ''')
+        if status_column:
+            cursor.execute(f'''
+                INSERT INTO contadores (tabela, chave, total)
+                SELECT '{table_name}', {status_key(status_column)}, COUNT(*)
+                FROM {table_name} GROUP BY 2
+            ''')
+    if commit:
+        conn.commit()
+
+
+def read_counters(conn):
+    """Todos os contadores numa única consulta: {(tabela, chave): total}"""
+    cursor = conn.cursor()
+    cursor.execute("SELECT tabela, chave, total FROM contadores")
+    return {(tabela, chave): total for tabela, chave, total in cursor.fetchall()}
+
+
+def table_count(conn, table_name):
+    """Total de registros da tabela em O(1)"""
+    cursor = conn.cursor()
+    cursor.execute("SELECT total FROM contadores WHERE tabela = ? AND chave = ?",
+                   (table_name, TOTAL_KEY))
+    row = cursor.fetchone()
+    return row[0] if row else 0
+
+
+def status_count(counters, table_name, status):
+    return counters.get((table_name, f"status:{status}"), 0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Contadores do Criança Esperança")
+    parser.add_argument("--db", default=database.DB_PATH, help="arquivo do banco")
+    parser.add_argument("--rebuild", action="store_true", help="recalcula todos os contadores")
+    args = parser.parse_args()
+
+    conn = database.connect(args.db)
+    if args.rebuild:
+        rebuild_counters(conn)
+        print("✅ Contadores recalculados!")
+    for (tabela, chave), total in sorted(read_counters(conn).items()):
+        print(f"{tabela:15} {chave:25} {total}")
+    database.close(conn)
@@ -0,0 +1,155 @@
+import functools
+import os
+import random
+import sqlite3
+import time
+from contextlib import contextmanager
+
+DB_PATH = "crianca_esperanca.db"
+
+# Perfis de conexão. O perfil padrão pode ser trocado pela variável de
+# ambiente CRIANCA_DB_PROFILE (ex.: 'rede' quando o banco fica numa pasta
+# compartilhada).
+PROFILES = {
+    # Banco local no disco da máquina
+    'desktop': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -65536,          # KiB (64 MiB)
+        'mmap_size': 268435456,        # 256 MiB
+        'temp_store': 'MEMORY',
+        'busy_timeout': 5000,          # ms
+        'cached_statements': 256,
+    },
+    # Pasta de rede (SMB/NFS): WAL e mmap exigem memória compartilhada
+    # entre processos, o que não funciona em sistemas de arquivos remotos
+    'rede': {
+        'journal_mode': 'DELETE',
+        'synchronous': 'FULL',
+        'cache_size': -16384,
+        'mmap_size': 0,
+        'temp_store': 'MEMORY',
+        'busy_timeout': 30000,
+        'cached_statements': 256,
+    },
+    # Medições e cargas sintéticas: sem fsync, cache e mmap generosos
+    'benchmark': {
+        'journal_mode': 'WAL',
+        'synchronous': 'OFF',
+        'cache_size': -262144,
+        'mmap_size': 1073741824,
+        'temp_store': 'MEMORY',
+        'busy_timeout': 5000,
+        'cached_statements': 512,
+    },
+}
+
+DEFAULT_PROFILE = 'desktop'
+
+# Depois do busy_timeout do perfil, novas tentativas com espera crescente
+BUSY_RETRIES = 5
+BUSY_DELAY = 0.05               # s; dobra a cada tentativa (com variação aleatória)
+SQLITE_BUSY = 5
+SQLITE_LOCKED = 6
+
+
+class Connection(sqlite3.Connection):
+    """Conexão que aceita atributos (o cache de resultados, por exemplo)"""
+
+
+def get_profile(name=None):
+    name = name or os.environ.get('CRIANCA_DB_PROFILE') or DEFAULT_PROFILE
+    if name not in PROFILES:
+        raise ValueError(f"Perfil de banco desconhecido: {name}")
+    return PROFILES[name]
+
+
+def connect(path=None, profile=None, traced=False, cached=False, **kwargs):
+    """Abre uma conexão SQLite já configurada com o perfil escolhido.
+
+    Com traced=True as instruções são medidas (ver sql_trace.py); com
+    cached=True as leituras repetidas saem de um cache (query_cache.py).
+    """
+    settings = get_profile(profile)
+    if traced:
+        from sql_trace import TracedConnection
+        kwargs.setdefault('factory', TracedConnection)
+    elif cached:
+        kwargs.setdefault('factory', Connection)
+    conn = sqlite3.connect(
+        path or DB_PATH,
+        timeout=settings['busy_timeout'] / 1000,
+        cached_statements=settings['cached_statements'],
+        **kwargs
+    )
+    conn.execute(f"PRAGMA journal_mode = {settings['journal_mode']}")
+    conn.execute(f"PRAGMA synchronous = {settings['synchronous']}")
+    conn.execute(f"PRAGMA cache_size = {settings['cache_size']}")
+    conn.execute(f"PRAGMA mmap_size = {settings['mmap_size']}")
+    conn.execute(f"PRAGMA temp_store = {settings['temp_store']}")
+    conn.execute(f"PRAGMA busy_timeout = {settings['busy_timeout']}")
+    if cached:
+        from query_cache import QueryCache
+        conn.query_cache = QueryCache()
+    return conn
+
+
+def close(conn):
+    """Fecha a conexão deixando o SQLite atualizar estatísticas se preciso"""
+    try:
+        conn.execute("PRAGMA optimize")
+    except sqlite3.Error:
+        pass
+    conn.close()
+
+
+def is_busy(error):
+    """O erro é de banco ocupado/travado por outra conexão?"""
+    if not isinstance(error, sqlite3.OperationalError):
+        return False
+    code = getattr(error, 'sqlite_errorcode', None)
+    if code is not None:
+        return code & 0xff in (SQLITE_BUSY, SQLITE_LOCKED)
+    message = str(error)
+    return 'locked' in message or 'busy' in message
+
+
+def retry_on_busy(method):
+    """Repete method(self, conn, ...) se o banco continuar ocupado.
+
+    A transação interrompida é desfeita antes de cada nova tentativa, que
+    espera BUSY_DELAY, 2*BUSY_DELAY, ... (com variação, para que vários
+    processos não voltem todos ao mesmo tempo).
+    """
+    @functools.wraps(method)
+    def wrapper(self, conn, *args, **kwargs):
+        delay = BUSY_DELAY
+        for attempt in range(BUSY_RETRIES + 1):
+            try:
+                return method(self, conn, *args, **kwargs)
+            except sqlite3.OperationalError as e:
+                if not is_busy(e) or attempt == BUSY_RETRIES:
+                    raise
+                if conn.in_transaction:
+                    conn.rollback()
+                time.sleep(delay * random.uniform(0.5, 1.5))
+                delay *= 2
+    return wrapper
+
+
+@contextmanager
+def immediate(conn):
+    """Transação de escrita que reserva o banco logo no início.
+
+    Com BEGIN IMMEDIATE a espera pelo escritor anterior acontece aqui
+    (coberta pelo busy_timeout), e não no meio da transação.
+    """
+    if conn.in_transaction:
+        conn.commit()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
@@ -0,0 +1,57 @@
+"""Datas dos cadastros: gravadas em ISO (AAAA-MM-DD), mostradas como DD/MM/AAAA.
+
+O texto ISO ordena como a data, então o índice da coluna serve para
+ordenar e para filtrar períodos (BETWEEN) sem nenhuma conversão no SQL.
+"""
+from datetime import date, datetime, timedelta
+
+STORAGE_FORMAT = '%Y-%m-%d'
+DISPLAY_FORMAT = '%d/%m/%Y'
+PLACEHOLDER = "DD/MM/AAAA"
+
+# Períodos do filtro das telas: (chave, rótulo)
+PERIODS = [
+    ('semana', "esta semana"),
+    ('mes', "este mês"),
+    ('proximos_30', "próximos 30 dias"),
+    ('ultimos_30', "últimos 30 dias"),
+]
+
+
+def parse_date(text):
+    """Data digitada (DD/MM/AAAA ou AAAA-MM-DD) em ISO; ValueError se inválida"""
+    text = text.strip()
+    for date_format in (DISPLAY_FORMAT, STORAGE_FORMAT):
+        try:
+            return datetime.strptime(text, date_format).strftime(STORAGE_FORMAT)
+        except ValueError:
+            pass
+    raise ValueError(f"data inválida '{text}'")
+
+
+def format_date(value):
+    """ISO -> DD/MM/AAAA; outros valores (vazios, legados) ficam como estão"""
+    if not value:
+        return value
+    try:
+        return datetime.strptime(value, STORAGE_FORMAT).strftime(DISPLAY_FORMAT)
+    except (TypeError, ValueError):
+        return value
+
+
+def period_range(period, today=None):
+    """(início, fim) em ISO, inclusivos, de um período de PERIODS"""
+    today = today or date.today()
+    if period == 'semana':
+        start = today - timedelta(days=today.weekday())
+        end = start + timedelta(days=6)
+    elif period == 'mes':
+        start = today.replace(day=1)
+        end = (start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+    elif period == 'proximos_30':
+        start, end = today, today + timedelta(days=30)
+    elif period == 'ultimos_30':
+        start, end = today - timedelta(days=30), today
+    else:
+        raise ValueError(f"Período desconhecido: {period}")
+    return start.isoformat(), end.isoformat()
@@ -0,0 +1,145 @@
+import queue
+import threading
+
+import database
+
+
+class DbRequest:
+    """Pedido enfileirado para a thread de banco"""
+
+    def __init__(self, func, callback=None, on_error=None, group=None):
+        self.func = func
+        self.callback = callback
+        self.on_error = on_error
+        self.group = group
+        self.cancelled = False
+        self.result = None
+        self.error = None
+
+
+class DatabaseWorker:
+    """Executa todo o trabalho de banco numa thread própria.
+
+    A conexão SQLite é criada e usada apenas dentro da thread do worker.
+    Cada pedido é uma função func(conn); o resultado volta para a thread
+    do Tk através de root.after, onde callback(resultado) ou
+    on_error(excecao) são chamados. Pedidos de um mesmo grupo podem ser
+    cancelados juntos (ex.: ao trocar de seção).
+    """
+
+    POLL_INTERVAL = 15  # ms
+
+    def __init__(self, root, db_path=None, profile=None, connect=None):
+        self.root = root
+        self.db_path = db_path
+        self.connect = connect or (lambda: database.connect(db_path, profile))
+        self.requests = queue.Queue()
+        self.done = queue.Queue()
+        self.pending = set()
+        self.current = None
+        self.conn = None
+        self._lock = threading.Lock()
+        self._poll_job = None
+
+        self.thread = threading.Thread(target=self._run, name="db-worker", daemon=True)
+        self.thread.start()
+
+    def submit(self, func, callback=None, on_error=None, group=None):
+        """Enfileira func(conn); deve ser chamado na thread do Tk"""
+        request = DbRequest(func, callback, on_error, group)
+        with self._lock:
+            self.pending.add(request)
+        self.requests.put(request)
+        self._schedule_poll()
+        return request
+
+    def cancel(self, group):
+        """Cancela pedidos pendentes do grupo e interrompe o que estiver rodando"""
+        with self._lock:
+            for request in self.pending:
+                if request.group == group:
+                    request.cancelled = True
+            # Sob a trava o pedido em execução não muda: a interrupção não
+            # alcança o próximo da fila (ex.: um salvamento)
+            current = self.current
+            if current is not None and current.group == group and self.conn is not None:
+                self.conn.interrupt()
+
+    def close(self):
+        """Encerra a thread e fecha a conexão"""
+        with self._lock:
+            for request in self.pending:
+                request.cancelled = True
+        self.requests.put(None)
+        self.thread.join(timeout=5)
+        if self._poll_job is not None:
+            try:
+                self.root.after_cancel(self._poll_job)
+            except Exception:
+                pass
+            self._poll_job = None
+
+    def _run(self):
+        try:
+            self.conn = self.connect()
+        except Exception as e:
+            # Sem conexão: todos os pedidos recebem o erro de abertura
+            while True:
+                request = self.requests.get()
+                if request is None:
+                    return
+                request.error = e
+                self.done.put(request)
+
+        try:
+            while True:
+                request = self.requests.get()
+                if request is None:
+                    break
+                with self._lock:
+                    # Conferido sob a trava: cancel() não perde a corrida
+                    skip = request.cancelled
+                    if not skip:
+                        self.current = request
+                if skip:
+                    self.done.put(request)
+                    continue
+                try:
+                    request.result = request.func(self.conn)
+                except Exception as e:
+                    if self.conn.in_transaction:
+                        self.conn.rollback()
+                    request.error = e
+                finally:
+                    with self._lock:
+                        self.current = None
+                self.done.put(request)
+        finally:
+            database.close(self.conn)
+
+    def _schedule_poll(self):
+        if self._poll_job is None:
+            self._poll_job = self.root.after(self.POLL_INTERVAL, self._poll)
+
+    def _poll(self):
+        """Entrega na thread do Tk os resultados prontos"""
+        self._poll_job = None
+        while True:
+            try:
+                request = self.done.get_nowait()
+            except queue.Empty:
+                break
+            with self._lock:
+                self.pending.discard(request)
+            if request.cancelled:
+                continue
+            if request.error is not None:
+                if request.on_error:
+                    request.on_error(request.error)
+                else:
+                    print(f"❌ Erro no banco: {request.error}")
+            elif request.callback:
+                request.callback(request.result)
+
+        if self.pending:
+            self._schedule_poll()
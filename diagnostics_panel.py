@@ -0,0 +1,234 @@
+import json
+import tkinter as tk
+from tkinter import ttk, messagebox, filedialog
+
+import query_cache
+import sql_trace
+import ui_watchdog
+
+REFRESH_MS = 1000
+
+
+class DiagnosticsPanel:
+    """Painel oculto (Ctrl+Shift+D) com as estatísticas das consultas SQL
+    e, se houver vigia, dos callbacks e travamentos da interface"""
+
+    COLUMNS = [
+        ("Consulta", "statement", 520),
+        ("Execuções", "count", 80),
+        ("Total (ms)", "total_ms", 90),
+        ("Média (ms)", "mean_ms", 90),
+        ("p95 (ms)", "p95_ms", 80),
+        ("Máx. (ms)", "max_ms", 90),
+        ("Linhas", "rows", 80),
+        ("Lentas", "slow", 70),
+    ]
+
+    HANDLER_COLUMNS = [
+        ("Callback", "handler", 420),
+        ("Chamadas", "count", 80),
+        ("Total (ms)", "total_ms", 90),
+        ("Média (ms)", "mean_ms", 90),
+        ("p95 (ms)", "p95_ms", 80),
+        ("Máx. (ms)", "max_ms", 90),
+    ]
+
+    STALL_COLUMNS = [
+        ("Início", "started", 200),
+        ("Duração (ms)", "duration_ms", 100),
+        ("Callback", "handler", 420),
+    ]
+
+    def __init__(self, root, registry=None, watchdog=None):
+        self.root = root
+        self.registry = registry or sql_trace.registry
+        self.watchdog = watchdog
+        self._refresh_job = None
+
+        self.window = tk.Toplevel(root)
+        self.window.title("🩺 Diagnóstico")
+        self.window.geometry("1100x600")
+        self.window.configure(bg='white')
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+
+        notebook = ttk.Notebook(self.window)
+        notebook.pack(fill='both', expand=True, padx=15, pady=(15, 5))
+        queries_tab = tk.Frame(notebook, bg='white')
+        notebook.add(queries_tab, text="🗄️ Consultas SQL")
+
+        header = tk.Frame(queries_tab, bg='white')
+        header.pack(fill='x', pady=(10, 5))
+        self.summary_label = tk.Label(header, font=('Arial', 10), fg='#333', bg='white', anchor='w')
+        self.summary_label.pack(side='left', fill='x', expand=True)
+        self.cache_label = tk.Label(queries_tab, font=('Arial', 10), fg='#333', bg='white', anchor='w')
+        self.cache_label.pack(fill='x', pady=(0, 5))
+
+        self.tree = self.create_tree(queries_tab, self.COLUMNS, 'statement')
+        self.tree.bind('<<TreeviewSelect>>', self.show_histogram)
+
+        self.histogram_label = tk.Label(queries_tab, font=('Courier', 9), fg='#666', bg='white',
+                                        anchor='w', justify='left')
+        self.histogram_label.pack(fill='x', pady=5)
+
+        if self.watchdog:
+            self.create_interface_tab(notebook)
+
+        btn_frame = tk.Frame(self.window, bg='white')
+        btn_frame.pack(fill='x', padx=15, pady=(0, 15))
+        tk.Button(btn_frame, text="💾 Exportar JSON", bg='#4D96FF', fg='white',
+                  font=('Arial', 10, 'bold'), cursor='hand2', padx=15,
+                  command=self.export_json).pack(side='left', padx=5)
+        tk.Button(btn_frame, text="🧹 Zerar", bg='#FF6B9D', fg='white',
+                  font=('Arial', 10, 'bold'), cursor='hand2', padx=15,
+                  command=self.reset).pack(side='left', padx=5)
+
+        self.stats = {}
+        self._iids = {}     # Instrução -> iid estável entre atualizações
+        self.handlers = {}
+        self.stalls = []
+        self.refresh()
+
+    def create_tree(self, parent, columns, text_column, height=None):
+        """Treeview com barra de rolagem; a coluna de texto fica à esquerda"""
+        frame = tk.Frame(parent, bg='white')
+        frame.pack(fill='both', expand=True)
+        tree = ttk.Treeview(frame, columns=[c[1] for c in columns], show='headings',
+                            height=height or 10)
+        for label, column, width in columns:
+            tree.heading(column, text=label)
+            anchor = 'w' if column in (text_column, 'started') else 'e'
+            tree.column(column, width=width, minwidth=60, anchor=anchor)
+        scrollbar = ttk.Scrollbar(frame, orient='vertical', command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        tree.pack(side='left', fill='both', expand=True)
+        scrollbar.pack(side='right', fill='y')
+        return tree
+
+    def create_interface_tab(self, notebook):
+        """Aba com a duração dos callbacks do Tk e os travamentos do mainloop"""
+        tab = tk.Frame(notebook, bg='white')
+        notebook.add(tab, text="🖥️ Interface")
+
+        self.ui_summary_label = tk.Label(tab, font=('Arial', 10), fg='#333', bg='white', anchor='w')
+        self.ui_summary_label.pack(fill='x', pady=(10, 5))
+        self.handler_tree = self.create_tree(tab, self.HANDLER_COLUMNS, 'handler', height=8)
+
+        tk.Label(tab, text="⏱️ Travamentos recentes", font=('Arial', 10, 'bold'),
+                 fg='#333', bg='white', anchor='w').pack(fill='x', pady=(10, 5))
+        self.stall_tree = self.create_tree(tab, self.STALL_COLUMNS, 'handler', height=5)
+        self.stall_tree.bind('<<TreeviewSelect>>', self.show_stack)
+
+        self.stack_text = tk.Text(tab, height=8, font=('Courier', 9), fg='#666', bg='#FAFAFA',
+                                  relief='flat', state='disabled', wrap='none')
+        self.stack_text.pack(fill='x', pady=5)
+
+    def refresh(self):
+        """Atualiza a lista (a cada segundo enquanto o painel estiver aberto)"""
+        self._refresh_job = None
+        snapshot = self.registry.snapshot()
+        selected = self.tree.selection()
+
+        self.tree.delete(*self.tree.get_children())
+        self.stats = {}
+        for stats in snapshot:
+            iid = self._iids.setdefault(stats['statement'], str(len(self._iids)))
+            self.stats[iid] = stats
+            self.tree.insert('', 'end', iid=iid,
+                             values=[stats[column] for _, column, _ in self.COLUMNS])
+        if selected and self.tree.exists(selected[0]):
+            self.tree.selection_set(selected[0])
+
+        executions = sum(s['count'] for s in snapshot)
+        slow = sum(s['slow'] for s in snapshot)
+        self.summary_label.config(
+            text=f"{len(snapshot)} consulta(s) distinta(s) • {executions} execução(ões) • "
+                 f"{slow} lenta(s) (≥ {self.registry.slow_ms:g} ms, "
+                 f"registradas em {self.registry.slow_log_path})")
+        cache = query_cache.snapshot()
+        self.cache_label.config(
+            text=f"💾 Cache de resultados: {cache['hits']} acerto(s) • {cache['misses']} falta(s) "
+                 f"({cache['hit_rate']:.0%}) • {cache['entries']} resultado(s), "
+                 f"{cache['bytes'] / 1024:.0f} KiB • {cache['evictions']} expulso(s) • "
+                 f"{cache['invalidations']} invalidação(ões)")
+        if self.watchdog:
+            self.refresh_interface()
+        self._refresh_job = self.window.after(REFRESH_MS, self.refresh)
+
+    def refresh_interface(self):
+        handlers = ui_watchdog.handler_snapshot()
+        self.handler_tree.delete(*self.handler_tree.get_children())
+        for stats in handlers:
+            self.handler_tree.insert('', 'end',
+                                     values=[stats[column] for _, column, _ in self.HANDLER_COLUMNS])
+
+        stalls = self.watchdog.recent_stalls()
+        if stalls != self.stalls:
+            # Só redesenha quando muda, para não perder a pilha selecionada
+            selected = self.stall_tree.selection()
+            self.stall_tree.delete(*self.stall_tree.get_children())
+            for stall in stalls:
+                duration = stall['duration_ms'] if stall['duration_ms'] is not None else "em andamento"
+                self.stall_tree.insert('', 'end', iid=stall['started'],
+                                       values=[stall['started'], duration,
+                                               stall['handler'] or "(fora de callback)"])
+            self.stalls = stalls
+            if selected and self.stall_tree.exists(selected[0]):
+                self.stall_tree.selection_set(selected[0])
+
+        self.ui_summary_label.config(
+            text=f"{len(handlers)} callback(s) • {len(stalls)} travamento(s) "
+                 f"(≥ {self.watchdog.threshold_ms:g} ms, registrados em {self.watchdog.log_path})")
+
+    def show_stack(self, event=None):
+        selection = self.stall_tree.selection()
+        stall = next((s for s in self.stalls if selection and s['started'] == selection[0]), None)
+        self.stack_text.config(state='normal')
+        self.stack_text.delete('1.0', 'end')
+        if stall:
+            self.stack_text.insert('1.0', stall['stack'] or "(pilha indisponível)")
+        self.stack_text.config(state='disabled')
+
+    def show_histogram(self, event=None):
+        selection = self.tree.selection()
+        stats = self.stats.get(selection[0]) if selection else None
+        if not stats:
+            self.histogram_label.config(text="")
+            return
+        peak = max(stats['histogram'].values())
+        lines = [f"{label:>8} ms {'█' * max(1, round(30 * count / peak))} {count}"
+                 for label, count in stats['histogram'].items()]
+        self.histogram_label.config(text='\n'.join(lines))
+
+    def export_json(self):
+        path = filedialog.asksaveasfilename(
+            parent=self.window, title="Exportar diagnóstico", initialfile="consultas.json",
+            defaultextension=".json", filetypes=[("JSON", "*.json")])
+        if not path:
+            return
+        try:
+            data = self.registry.to_json()
+            data['cache'] = query_cache.snapshot()
+            if self.watchdog:
+                data['interface'] = self.watchdog.to_json()
+            with open(path, 'w', encoding='utf-8') as handle:
+                json.dump(data, handle, ensure_ascii=False, indent=2)
+            messagebox.showinfo("Diagnóstico", f"Estatísticas gravadas em:\n{path}", parent=self.window)
+        except OSError as e:
+            messagebox.showerror("Erro", f"Erro ao gravar: {e}", parent=self.window)
+
+    def reset(self):
+        self.registry.reset()
+        query_cache.reset_stats()
+        if self.watchdog:
+            ui_watchdog.handler_stats.clear()
+        self._iids.clear()
+        self.histogram_label.config(text="")
+        if self._refresh_job:
+            self.window.after_cancel(self._refresh_job)
+        self.refresh()
+
+    def close(self):
+        if self._refresh_job:
+            self.window.after_cancel(self._refresh_job)
+            self._refresh_job = None
+        self.window.destroy()
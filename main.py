@@ -1,30 +1,65 @@
+import profiling
+profiling.start_if_requested()  # --perfil: mede também as importações abaixo
+
+import argparse
 import tkinter as tk
-from tkinter import ttk, messagebox
-import sqlite3
+from tkinter import ttk, messagebox, filedialog
+import threading
 from datetime import datetime
+from dates import PERIODS, PLACEHOLDER, format_date, period_range
+from db_worker import DatabaseWorker
+from virtual_table import VirtualTable
+from change_log import changes_since, last_seq
+from reports import REPORTS, export_csv, run_report
+from search_index import build_match_query
+from search_cache import IdListSource, SearchCache, SearchResult
+from migrations import prepare_database
+from bulk_import import IMPORT_TABLES, RowError, import_file, rejects_path, write_rejects
+from bulk_export import export_source
+from services import (ConflictError, FileStorage, Services, TABLE_FIELDS, dashboard_stats,
+                      recent_activities)
+from profiling import profiled
+
+SEARCH_DEBOUNCE_MS = 250      # Espera após a última tecla antes de buscar
+SEARCH_MIN_CHARS = 2          # Busca automática só a partir deste tamanho
+SEARCH_CACHE_LIMIT = 5000     # Resultados maiores são paginados direto do FTS
+ALL_PERIODS = "Todos os períodos"
 
 class CriancaEsperancaManager:
-    def __init__(self, user_data):
+    def __init__(self, user_data, root=None, db=None, on_logout=None, services=None):
         self.user_data = user_data  # Dados do usuário logado
-        self.root = tk.Tk()
+        # Com root/db o gerenciamento ocupa a janela e a conexão da
+        # aplicação (ver app.py); on_logout() é chamado ao sair
+        self.root = root or tk.Tk()
         self.root.title("Criança Esperança - Sistema de Gerenciamento")
         self.root.geometry("1200x800")
+        self.root.resizable(True, True)
         self.root.configure(bg='#FFD93D')
+        self.on_logout = on_logout
+        self.services = services or Services(FileStorage(traced=True, cached=True))
         
         # Centralizar janela
         self.center_window()
         
         # Database
-        self.init_database()
+        if db is None:
+            self.init_database()
+        else:
+            self.db = db
         
         # Variáveis
         self.current_section = "dashboard"
+        self.section_views = {}  # Seções já montadas (ficam ocultas ao trocar)
+        self.search_cache = SearchCache()
+        self._search_job = None
+        self.jobs = {}  # Tarefas longas em conexão própria -> evento de cancelamento
         
         # Interface
         self.create_main_interface()
         
         # Carregar dashboard inicial
-        self.show_dashboard()
+        self.show_section("dashboard")
+        profiling.mark_ready(self.root, "gerenciamento pronto")
     
     def center_window(self):
         self.root.update_idletasks()
@@ -32,76 +67,15 @@ class CriancaEsperancaManager:
         y = (self.root.winfo_screenheight() // 2) - (800 // 2)
         self.root.geometry(f"1200x800+{x}+{y}")
     
+    @profiled("init_database")
     def init_database(self):
-        """Inicializa tabelas do sistema de gerenciamento"""
-        try:
-            self.conn = sqlite3.connect("crianca_esperanca.db")
-            cursor = self.conn.cursor()
-            
-            # Tabela de projetos
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS projetos (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    nome TEXT NOT NULL,
-                    descricao TEXT,
-                    data_inicio DATE,
-                    data_fim DATE,
-                    status TEXT DEFAULT 'Ativo',
-                    responsavel TEXT,
-                    orcamento REAL DEFAULT 0,
-                    data_criacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # Tabela de voluntários
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS voluntarios (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    nome TEXT NOT NULL,
-                    email TEXT,
-                    telefone TEXT,
-                    area_interesse TEXT,
-                    disponibilidade TEXT,
-                    data_cadastro TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # Tabela de beneficiários
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS beneficiarios (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    nome TEXT NOT NULL,
-                    idade INTEGER,
-                    responsavel TEXT,
-                    telefone_responsavel TEXT,
-                    endereco TEXT,
-                    situacao TEXT,
-                    data_cadastro TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # Tabela de atividades
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS atividades (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    titulo TEXT NOT NULL,
-                    descricao TEXT,
-                    projeto_id INTEGER,
-                    data_atividade DATE,
-                    local TEXT,
-                    participantes INTEGER DEFAULT 0,
-                    status TEXT DEFAULT 'Planejada',
-                    data_criacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (projeto_id) REFERENCES projetos (id)
-                )
-            ''')
-            
-            self.conn.commit()
-            print("✅ Banco de gerenciamento inicializado!")
-            
-        except sqlite3.Error as e:
-            messagebox.showerror("Erro", f"Erro no banco: {e}")
+        """Inicia a thread de banco e aplica migrações pendentes"""
+        self.db = DatabaseWorker(self.root, connect=self.services.storage.connect)
+        self.db.submit(prepare_database,
+                       callback=lambda _: print("✅ Banco de gerenciamento inicializado!"),
+                       on_error=lambda e: messagebox.showerror("Erro", f"Erro no banco: {e}"))
     
+    @profiled("create_main_interface")
     def create_main_interface(self):
         # Frame principal
         self.main_frame = tk.Frame(self.root, bg='white')
@@ -181,10 +155,14 @@ class CriancaEsperancaManager:
                  relief='flat', pady=10,
                  command=self.logout).pack(side='bottom', fill='x', padx=10, pady=10)
     
+    @profiled("show_section {1}")
     def show_section(self, section):
         """Mostra seção selecionada com destaque visual"""
         self.current_section = section
         
+        # Descartar consultas da seção anterior ainda pendentes
+        self.cancel_pending()
+        
         # Resetar cores dos botões
         for btn_section, btn in self.menu_buttons.items():
             if btn_section == section:
@@ -192,26 +170,121 @@ class CriancaEsperancaManager:
             else:
                 btn.configure(bg='white', fg='#4D96FF')
         
-        # Limpar conteúdo atual
-        for widget in self.content_frame.winfo_children():
-            widget.destroy()
-        
-        # Mostrar seção correspondente
+        # Esconder a seção anterior (os widgets são mantidos)
+        for view in self.section_views.values():
+            view['frame'].pack_forget()
+        
+        # Montar a seção na primeira visita; nas seguintes só os dados mudam
+        view = self.section_views.get(section)
+        if view is None:
+            view = self.build_section(section)
+            self.section_views[section] = view
+            self.set_current_view(view)
+        else:
+            self.set_current_view(view)
+            self.refresh_section(view)
+        view['frame'].pack(fill='both', expand=True)
+    
+    def set_current_view(self, view):
+        """Aponta os atalhos usados pela busca para a seção visível"""
+        if 'table' in view:
+            self.current_table = view['table']
+            self.current_tree = view['table'].tree
+            self.search_var = view['search_var']
+            self.selection_label = view['selection_label']
+    
+    def build_section(self, section):
+        """Cria os widgets da seção uma única vez"""
+        frame = tk.Frame(self.content_frame, bg='white')
         if section == "dashboard":
-            self.show_dashboard()
+            view = self.show_dashboard(frame)
         elif section == "projetos":
-            self.show_projetos()
+            view = self.show_projetos(frame)
         elif section == "voluntarios":
-            self.show_voluntarios()
+            view = self.show_voluntarios(frame)
         elif section == "beneficiarios":
-            self.show_beneficiarios()
+            view = self.show_beneficiarios(frame)
         elif section == "atividades":
-            self.show_atividades()
+            view = self.show_atividades(frame)
+        view['frame'] = frame
+        return view
+    
+    def refresh_section(self, view):
+        """Atualiza apenas os dados de uma seção já montada"""
+        if 'table' not in view:
+            self.refresh_dashboard(view)
+        else:
+            self.refresh_changes(view)
     
-    def show_dashboard(self):
+    def reload_section(self, view):
+        """Relê o contador e a janela atual da seção (ou refaz a busca)"""
+        self.refresh_record_count(view)
+        if SearchCache.key(view['search_var'].get()):
+            # Refaz a busca (o cache pode ter sido invalidado por escritas)
+            self.search_records(view['table_name'], view['fields'])
+        else:
+            view['table'].refresh()
+    
+    def refresh_changes(self, view):
+        """Aplica só o que mudou na tabela desde a última leitura.
+        
+        A marca d'água (change_seq) é lida junto com as linhas; aqui são
+        lidas apenas as alterações posteriores a ela e os registros
+        tocados. Com ordenação ou busca ativa, ou com mudanças demais, a
+        janela é relida como antes.
+        """
+        table = view['table']
+        table_name = view['table_name']
+        since = table.change_seq
+        if since is None:
+            self.reload_section(view)
+            return
+        
+        repository = self.services.table(table_name)
+        plain = (not table.sort_order and not SearchCache.key(view['search_var'].get())
+                 and self.current_period(table_name) is None)
+        
+        def query(conn):
+            seq = last_seq(conn)
+            if seq == since:
+                return seq, None
+            changes = changes_since(conn, table_name, since, seq)
+            if changes is None or not plain:
+                return seq, changes
+            changed, deleted = changes
+            return seq, (repository.fetch_many(conn, changed), deleted, repository.count(conn))
+        
+        def apply(result):
+            seq, changes = result
+            if table.change_seq != since or seq == since:
+                # Já recarregada nesse meio-tempo, ou nada mudou no banco
+                return
+            if changes is not None and not changes[0] and not changes[1]:
+                # Mudanças só em outras tabelas
+                table.change_seq = seq
+                return
+            self.search_cache.invalidate(table_name)
+            if changes is None or not plain:
+                self.reload_section(view)
+                return
+            rows, deleted, total = changes
+            table.apply_changes(seq, rows, deleted, total)
+            view['count_label'].config(text=f"{total} registro(s) encontrado(s)")
+        
+        self.db.submit(query, callback=apply, on_error=table.on_error, group='section')
+    
+    def cancel_pending(self):
+        """Cancela buscas agendadas e consultas da seção em andamento"""
+        self.db.cancel('section')
+        self.db.cancel('search')
+        if self._search_job:
+            self.root.after_cancel(self._search_job)
+            self._search_job = None
+    
+    def show_dashboard(self, parent):
         """Dashboard principal com melhorias visuais"""
         # Título
-        title_frame = tk.Frame(self.content_frame, bg='white')
+        title_frame = tk.Frame(parent, bg='white')
         title_frame.pack(fill='x', padx=20, pady=20)
         
         tk.Label(title_frame, text="📊 DASHBOARD", 
@@ -223,21 +296,19 @@ class CriancaEsperancaManager:
                 fg='#666', bg='white').pack(anchor='w')
         
         # Cards de estatísticas
-        stats_frame = tk.Frame(self.content_frame, bg='white')
+        stats_frame = tk.Frame(parent, bg='white')
         stats_frame.pack(fill='x', padx=20, pady=20)
         
-        # Obter estatísticas
-        stats = self.get_dashboard_stats()
-        
-        # Criar cards com hover effect
+        # Criar cards com hover effect (valores chegam da thread do banco)
         cards_data = [
-            ("🎯 Projetos Ativos", stats['projetos'], "#4D96FF"),
-            ("👥 Voluntários", stats['voluntarios'], "#6BCF7F"),
-            ("👶 Beneficiários", stats['beneficiarios'], "#FF6B9D"),
-            ("📅 Atividades", stats['atividades'], "#FFD93D")
+            ("🎯 Projetos Ativos", 'projetos', "#4D96FF"),
+            ("👥 Voluntários", 'voluntarios', "#6BCF7F"),
+            ("👶 Beneficiários", 'beneficiarios', "#FF6B9D"),
+            ("📅 Atividades", 'atividades', "#FFD93D")
         ]
         
-        for i, (title, value, color) in enumerate(cards_data):
+        value_labels = {}
+        for i, (title, key, color) in enumerate(cards_data):
             card = tk.Frame(stats_frame, bg=color, relief='raised', bd=2, cursor='hand2')
             card.pack(side='left', fill='both', expand=True, padx=5)
             
@@ -251,16 +322,44 @@ class CriancaEsperancaManager:
             card.bind("<Enter>", on_enter)
             card.bind("<Leave>", on_leave)
             
-            tk.Label(card, text=str(value), 
-                    font=('Arial', 24, 'bold'),
-                    bg=color, fg='white').pack(pady=10)
+            value_labels[key] = tk.Label(card, text="…", 
+                                         font=('Arial', 24, 'bold'),
+                                         bg=color, fg='white')
+            value_labels[key].pack(pady=10)
             
             tk.Label(card, text=title, 
                     font=('Arial', 10, 'bold'),
                     bg=color, fg='white').pack(pady=(0, 10))
         
+        # Relatórios (lidos dos resumos mantidos pelos triggers)
+        report_frame = tk.Frame(parent, bg='white')
+        report_frame.pack(fill='x', padx=20, pady=(0, 10))
+        
+        report_header = tk.Frame(report_frame, bg='white')
+        report_header.pack(fill='x', pady=(0, 10))
+        tk.Label(report_header, text="📈 Relatórios", 
+                font=('Arial', 14, 'bold'),
+                fg='#333', bg='white').pack(side='left')
+        
+        titles = [report.title for report in REPORTS.values()]
+        report_var = tk.StringVar(value=titles[0])
+        report_combo = ttk.Combobox(report_header, textvariable=report_var, values=titles,
+                                    state='readonly', width=45)
+        report_combo.pack(side='left', padx=10)
+        
+        tk.Button(report_header, text="📤 CSV", 
+                 font=('Arial', 9, 'bold'),
+                 bg='#FFD93D', fg='black', cursor='hand2',
+                 command=lambda: self.export_report(view)).pack(side='left')
+        
+        report_tree = ttk.Treeview(report_frame, show='headings', height=6, style="Custom.Treeview")
+        report_tree.tag_configure('evenrow', background='#f8f9fa')
+        report_tree.tag_configure('oddrow', background='white')
+        report_tree.pack(fill='x')
+        report_combo.bind('<<ComboboxSelected>>', lambda e: self.load_report(view))
+        
         # Atividades recentes com melhoria visual
-        recent_frame = tk.Frame(self.content_frame, bg='white')
+        recent_frame = tk.Frame(parent, bg='white')
         recent_frame.pack(fill='both', expand=True, padx=20, pady=20)
         
         tk.Label(recent_frame, text="📋 Atividades Recentes", 
@@ -268,154 +367,169 @@ class CriancaEsperancaManager:
                 fg='#333', bg='white').pack(anchor='w', pady=(0, 10))
         
         # Lista de atividades recentes
-        self.create_recent_activities_list(recent_frame)
+        view = {
+            'value_labels': value_labels,
+            'report_var': report_var,
+            'report_tree': report_tree,
+            'recent_list': self.create_recent_activities_list(recent_frame)
+        }
+        self.refresh_dashboard(view)
+        return view
     
-    def get_dashboard_stats(self):
-        """Obtém estatísticas para o dashboard"""
-        try:
-            cursor = self.conn.cursor()
-            
-            # Contar projetos ativos
-            cursor.execute("SELECT COUNT(*) FROM projetos WHERE status = 'Ativo'")
-            projetos = cursor.fetchone()[0]
-            
-            # Contar voluntários
-            cursor.execute("SELECT COUNT(*) FROM voluntarios")
-            voluntarios = cursor.fetchone()[0]
-            
-            # Contar beneficiários
-            cursor.execute("SELECT COUNT(*) FROM beneficiarios")
-            beneficiarios = cursor.fetchone()[0]
-            
-            # Contar atividades
-            cursor.execute("SELECT COUNT(*) FROM atividades")
-            atividades = cursor.fetchone()[0]
-            
-            return {
-                'projetos': projetos,
-                'voluntarios': voluntarios,
-                'beneficiarios': beneficiarios,
-                'atividades': atividades
-            }
-            
-        except sqlite3.Error:
-            return {'projetos': 0, 'voluntarios': 0, 'beneficiarios': 0, 'atividades': 0}
+    def refresh_dashboard(self, view):
+        """Busca estatísticas e atividades recentes do dashboard (se algo mudou)"""
+        since = view.get('change_seq')
+        list_frame = view['recent_list']
+        report_name = self.selected_report(view)
+        
+        def query(conn):
+            seq = last_seq(conn)
+            if seq == since:
+                return seq, None, None, None
+            return seq, dashboard_stats(conn), recent_activities(conn), run_report(conn, report_name)
+        
+        def apply(result):
+            seq, stats, activities, report = result
+            view['change_seq'] = seq
+            if stats is None:
+                return
+            self.update_stat_cards(view['value_labels'], stats)
+            self.fill_report(view['report_tree'], report_name, *report)
+            self.fill_recent_activities(list_frame, activities)
+        
+        def show_error(e):
+            self.update_stat_cards(view['value_labels'], dict.fromkeys(view['value_labels'], 0))
+            self.clear_frame(list_frame)
+            tk.Label(list_frame, text=f"Erro ao carregar atividades: {e}", 
+                    fg='red', bg='#f8f9fa').pack(pady=50)
+        
+        self.db.submit(query, callback=apply, on_error=show_error, group='section')
+    
+    @staticmethod
+    def selected_report(view):
+        """Nome (chave do catálogo) do relatório escolhido no painel"""
+        title = view['report_var'].get()
+        return next(name for name, report in REPORTS.items() if report.title == title)
+    
+    def load_report(self, view):
+        """Lê o relatório escolhido (milissegundos: só as linhas dos resumos)"""
+        name = self.selected_report(view)
+        self.db.submit(lambda conn: run_report(conn, name),
+                       callback=lambda report: self.fill_report(view['report_tree'], name, *report),
+                       on_error=lambda e: messagebox.showerror("Erro", f"Erro ao carregar relatório: {e}"),
+                       group='section')
+    
+    def fill_report(self, tree, name, header, rows):
+        """Mostra o relatório na tabela do painel (grupos à esquerda, números à direita)"""
+        groups = len(REPORTS[name].groups)
+        columns = [f"c{i}" for i in range(len(header))]
+        tree.delete(*tree.get_children())
+        tree.configure(columns=columns)
+        for i, (column, label) in enumerate(zip(columns, header)):
+            tree.heading(column, text=label)
+            tree.column(column, width=220 if i < groups else 120, anchor='w' if i < groups else 'e')
+        for i, row in enumerate(rows):
+            tree.insert('', 'end', values=row, tags=('evenrow' if i % 2 == 0 else 'oddrow',))
+    
+    def export_report(self, view):
+        """Grava o relatório escolhido em CSV"""
+        name = self.selected_report(view)
+        path = filedialog.asksaveasfilename(
+            parent=self.root, title="Exportar relatório", initialfile=f"{name}.csv",
+            defaultextension=".csv", filetypes=[("CSV", "*.csv")])
+        if not path:
+            return
+        self.db.submit(lambda conn: export_csv(conn, name, path),
+                       callback=lambda count: messagebox.showinfo(
+                           "Relatório", f"{count} linha(s) exportada(s) para:\n{path} 📤"),
+                       on_error=lambda e: messagebox.showerror("Erro", f"Erro ao exportar: {e}"))
+    
+    def update_stat_cards(self, value_labels, stats):
+        """Preenche os cards com as estatísticas recebidas"""
+        for key, label in value_labels.items():
+            label.config(text=str(stats[key]))
     
     def create_recent_activities_list(self, parent):
         """Cria lista de atividades recentes com melhorias visuais"""
         list_frame = tk.Frame(parent, bg='#f8f9fa', relief='solid', bd=1)
         list_frame.pack(fill='both', expand=True)
-        
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute('''
-                SELECT titulo, data_atividade, status 
-                FROM atividades 
-                ORDER BY data_criacao DESC 
-                LIMIT 5
-            ''')
+        return list_frame
+    
+    @staticmethod
+    def clear_frame(frame):
+        for widget in frame.winfo_children():
+            widget.destroy()
+    
+    def fill_recent_activities(self, list_frame, activities):
+        """Monta os itens da lista de atividades recentes"""
+        self.clear_frame(list_frame)
+        if not activities:
+            empty_frame = tk.Frame(list_frame, bg='#f8f9fa')
+            empty_frame.pack(expand=True, fill='both')
             
-            activities = cursor.fetchall()
+            tk.Label(empty_frame, text="📝", font=('Arial', 40), 
+                    fg='#ccc', bg='#f8f9fa').pack(pady=(50, 10))
             
-            if not activities:
-                empty_frame = tk.Frame(list_frame, bg='#f8f9fa')
-                empty_frame.pack(expand=True, fill='both')
+            tk.Label(empty_frame, text="Nenhuma atividade cadastrada ainda", 
+                    font=('Arial', 12),
+                    fg='#666', bg='#f8f9fa').pack()
+        else:
+            for i, (titulo, data_atividade, status) in enumerate(activities):
+                item_frame = tk.Frame(list_frame, bg='white', relief='flat', bd=1)
+                item_frame.pack(fill='x', padx=10, pady=5)
                 
-                tk.Label(empty_frame, text="📝", font=('Arial', 40), 
-                        fg='#ccc', bg='#f8f9fa').pack(pady=(50, 10))
+                # Efeito hover nas atividades
+                def on_enter_item(event, frame=item_frame):
+                    frame.configure(bg='#f0f8ff', relief='solid')
                 
-                tk.Label(empty_frame, text="Nenhuma atividade cadastrada ainda", 
-                        font=('Arial', 12),
-                        fg='#666', bg='#f8f9fa').pack()
-            else:
-                for i, (titulo, data_atividade, status) in enumerate(activities):
-                    item_frame = tk.Frame(list_frame, bg='white', relief='flat', bd=1)
-                    item_frame.pack(fill='x', padx=10, pady=5)
-                    
-                    # Efeito hover nas atividades
-                    def on_enter_item(event, frame=item_frame):
-                        frame.configure(bg='#f0f8ff', relief='solid')
-                    
-                    def on_leave_item(event, frame=item_frame):
-                        frame.configure(bg='white', relief='flat')
-                    
-                    item_frame.bind("<Enter>", on_enter_item)
-                    item_frame.bind("<Leave>", on_leave_item)
-                    
-                    # Status color indicator
-                    status_colors = {
-                        'Planejada': '#FFD93D',
-                        'Em Andamento': '#4D96FF',
-                        'Realizada': '#6BCF7F',
-                        'Cancelada': '#FF6B9D'
-                    }
-                    
-                    status_frame = tk.Frame(item_frame, bg=status_colors.get(status, '#ccc'), width=5)
-                    status_frame.pack(side='left', fill='y')
-                    
-                    content_frame = tk.Frame(item_frame, bg='white')
-                    content_frame.pack(side='left', fill='both', expand=True, padx=10, pady=8)
-                    
-                    tk.Label(content_frame, text=f"📅 {titulo}", 
-                            font=('Arial', 11, 'bold'),
-                            fg='#333', bg='white').pack(anchor='w')
-                    
-                    tk.Label(content_frame, text=f"Data: {data_atividade or 'Não definida'} • Status: {status}", 
-                            font=('Arial', 9),
-                            fg='#666', bg='white').pack(anchor='w')
-                    
-        except sqlite3.Error as e:
-            tk.Label(list_frame, text=f"Erro ao carregar atividades: {e}", 
-                    fg='red', bg='#f8f9fa').pack(pady=50)
+                def on_leave_item(event, frame=item_frame):
+                    frame.configure(bg='white', relief='flat')
+                
+                item_frame.bind("<Enter>", on_enter_item)
+                item_frame.bind("<Leave>", on_leave_item)
+                
+                # Status color indicator
+                status_colors = {
+                    'Planejada': '#FFD93D',
+                    'Em Andamento': '#4D96FF',
+                    'Realizada': '#6BCF7F',
+                    'Cancelada': '#FF6B9D'
+                }
+                
+                status_frame = tk.Frame(item_frame, bg=status_colors.get(status, '#ccc'), width=5)
+                status_frame.pack(side='left', fill='y')
+                
+                content_frame = tk.Frame(item_frame, bg='white')
+                content_frame.pack(side='left', fill='both', expand=True, padx=10, pady=8)
+                
+                tk.Label(content_frame, text=f"📅 {titulo}", 
+                        font=('Arial', 11, 'bold'),
+                        fg='#333', bg='white').pack(anchor='w')
+                
+                tk.Label(content_frame, text=f"Data: {format_date(data_atividade) or 'Não definida'} • Status: {status}", 
+                        font=('Arial', 9),
+                        fg='#666', bg='white').pack(anchor='w')
     
-    def show_projetos(self):
+    def show_projetos(self, parent):
         """Seção de gerenciamento de projetos"""
-        self.create_crud_section("Projetos", "projetos", [
-            ("Nome", "nome", "text", 150),
-            ("Descrição", "descricao", "text", 200),
-            ("Data Início", "data_inicio", "date", 100),
-            ("Data Fim", "data_fim", "date", 100),
-            ("Status", "status", "combo", 80, ["Ativo", "Pausado", "Concluído"]),
-            ("Responsável", "responsavel", "text", 120),
-            ("Orçamento", "orcamento", "number", 100)
-        ])
-    
-    def show_voluntarios(self):
+        return self.create_crud_section(parent, "Projetos", "projetos", TABLE_FIELDS['projetos'])
+    
+    def show_voluntarios(self, parent):
         """Seção de gerenciamento de voluntários"""
-        self.create_crud_section("Voluntários", "voluntarios", [
-            ("Nome", "nome", "text", 150),
-            ("Email", "email", "text", 200),
-            ("Telefone", "telefone", "text", 120),
-            ("Área de Interesse", "area_interesse", "text", 150),
-            ("Disponibilidade", "disponibilidade", "text", 150)
-        ])
-    
-    def show_beneficiarios(self):
+        return self.create_crud_section(parent, "Voluntários", "voluntarios", TABLE_FIELDS['voluntarios'])
+    
+    def show_beneficiarios(self, parent):
         """Seção de gerenciamento de beneficiários"""
-        self.create_crud_section("Beneficiários", "beneficiarios", [
-            ("Nome", "nome", "text", 150),
-            ("Idade", "idade", "number", 80),
-            ("Responsável", "responsavel", "text", 150),
-            ("Telefone Responsável", "telefone_responsavel", "text", 140),
-            ("Endereço", "endereco", "text", 200),
-            ("Situação", "situacao", "text", 120)
-        ])
-    
-    def show_atividades(self):
+        return self.create_crud_section(parent, "Beneficiários", "beneficiarios", TABLE_FIELDS['beneficiarios'])
+    
+    def show_atividades(self, parent):
         """Seção de gerenciamento de atividades"""
-        self.create_crud_section("Atividades", "atividades", [
-            ("Título", "titulo", "text", 150),
-            ("Descrição", "descricao", "text", 200),
-            ("Data da Atividade", "data_atividade", "date", 120),
-            ("Local", "local", "text", 150),
-            ("Participantes", "participantes", "number", 100),
-            ("Status", "status", "combo", 120, ["Planejada", "Em Andamento", "Realizada", "Cancelada"])
-        ])
-    
-    def create_crud_section(self, title, table_name, fields):
+        return self.create_crud_section(parent, "Atividades", "atividades", TABLE_FIELDS['atividades'])
+    
+    def create_crud_section(self, parent, title, table_name, fields):
         """Cria seção CRUD genérica com melhorias"""
         # Título com barra de pesquisa
-        header_frame = tk.Frame(self.content_frame, bg='white')
+        header_frame = tk.Frame(parent, bg='white')
         header_frame.pack(fill='x', padx=20, pady=20)
         
         title_frame = tk.Frame(header_frame, bg='white')
@@ -426,10 +540,10 @@ class CriancaEsperancaManager:
                 fg='#FF6B9D', bg='white').pack(anchor='w')
         
         # Contador de registros
-        count = self.get_record_count(table_name)
-        tk.Label(title_frame, text=f"{count} registro(s) encontrado(s)", 
-                font=('Arial', 10),
-                fg='#666', bg='white').pack(anchor='w')
+        count_label = tk.Label(title_frame, text="Contando registros...", 
+                              font=('Arial', 10),
+                              fg='#666', bg='white')
+        count_label.pack(anchor='w')
         
         # Botões de ação no topo
         btn_top_frame = tk.Frame(header_frame, bg='white')
@@ -440,165 +554,385 @@ class CriancaEsperancaManager:
                  bg='#6BCF7F', fg='white', cursor='hand2',
                  command=lambda: self.open_add_dialog(table_name, fields)).pack(side='right', padx=5)
         
+        tk.Button(btn_top_frame, text="📤 Exportar", 
+                 font=('Arial', 10, 'bold'),
+                 bg='#FFD93D', fg='black', cursor='hand2',
+                 command=lambda: self.export_records(table_name, fields)).pack(side='right', padx=5)
+        
+        if table_name in IMPORT_TABLES:
+            tk.Button(btn_top_frame, text="📥 Importar", 
+                     font=('Arial', 10, 'bold'),
+                     bg='#4D96FF', fg='white', cursor='hand2',
+                     command=lambda: self.import_records(table_name, fields)).pack(side='right', padx=5)
+        
         # Barra de pesquisa simples
-        search_frame = tk.Frame(self.content_frame, bg='white')
+        search_frame = tk.Frame(parent, bg='white')
         search_frame.pack(fill='x', padx=20, pady=(0, 10))
         
         tk.Label(search_frame, text="🔍 Pesquisar:", 
                 font=('Arial', 10, 'bold'),
                 bg='white', fg='#333').pack(side='left')
         
-        self.search_var = tk.StringVar()
-        search_entry = tk.Entry(search_frame, textvariable=self.search_var,
+        search_var = tk.StringVar()
+        search_entry = tk.Entry(search_frame, textvariable=search_var,
                                font=('Arial', 10), width=30)
         search_entry.pack(side='left', padx=(5, 10))
+        search_entry.bind('<Return>', lambda e: self.search_records(table_name, fields))
+        
+        # Busca enquanto digita
+        search_var.trace_add('write', lambda *args: self.on_search_change(table_name, fields))
         
         tk.Button(search_frame, text="Buscar",
                  font=('Arial', 9), bg='#4D96FF', fg='white',
                  command=lambda: self.search_records(table_name, fields)).pack(side='left')
         
-        # Frame para tabela com scrollbar
-        table_frame = tk.Frame(self.content_frame, bg='white')
-        table_frame.pack(fill='both', expand=True, padx=20, pady=(0, 10))
+        # Filtro por período nas colunas de data (faixa do índice de ordenação)
+        period_var = tk.StringVar(value=ALL_PERIODS)
+        periods = {}
+        for field in fields:
+            if field[2] == 'date':
+                for key, label in PERIODS:
+                    periods[f"{field[0]}: {label}"] = (field[1], key)
+        if periods:
+            tk.Label(search_frame, text="📅 Período:", 
+                    font=('Arial', 10, 'bold'),
+                    bg='white', fg='#333').pack(side='left', padx=(20, 5))
+            period_combo = ttk.Combobox(search_frame, textvariable=period_var, state='readonly',
+                                        values=[ALL_PERIODS] + list(periods), width=32)
+            period_combo.pack(side='left')
+            period_combo.bind('<<ComboboxSelected>>',
+                              lambda e: self.sort_records(table_name, fields))
         
         # Criar tabela com estilo melhorado
         style = ttk.Style()
         style.configure("Custom.Treeview", rowheight=25)
         style.configure("Custom.Treeview.Heading", font=('Arial', 10, 'bold'))
         
-        columns = [field[1] for field in fields]
-        self.current_tree = ttk.Treeview(table_frame, columns=columns, show='headings', 
-                                        height=12, style="Custom.Treeview")
-        
-        # Configurar colunas com larguras específicas
-        for field in fields:
-            field_name = field[1]
-            field_label = field[0]
-            field_width = field[3] if len(field) > 3 else 120
-            
-            self.current_tree.heading(field_name, text=field_label)
-            self.current_tree.column(field_name, width=field_width, minwidth=80)
-        
-        # Frame para scrollbars
-        scrollbar_v = ttk.Scrollbar(table_frame, orient='vertical', command=self.current_tree.yview)
-        scrollbar_h = ttk.Scrollbar(table_frame, orient='horizontal', command=self.current_tree.xview)
-        
-        self.current_tree.configure(yscrollcommand=scrollbar_v.set, xscrollcommand=scrollbar_h.set)
-        
-        # Posicionar elementos
-        self.current_tree.grid(row=0, column=0, sticky='nsew')
-        scrollbar_v.grid(row=0, column=1, sticky='ns')
-        scrollbar_h.grid(row=1, column=0, sticky='ew')
-        
-        # Configurar redimensionamento
-        table_frame.grid_rowconfigure(0, weight=1)
-        table_frame.grid_columnconfigure(0, weight=1)
-        
-        # Carregar dados
-        self.load_table_data(self.current_tree, table_name, fields)
+        # Tabela virtualizada: só a janela visível é carregada do banco
+        table = VirtualTable(
+            parent, fields, self.db, group='section',
+            on_error=lambda e: messagebox.showerror("Erro", f"Erro ao carregar dados: {e}"),
+            style="Custom.Treeview",
+            on_sort=lambda t: self.sort_records(table_name, fields),
+            change_mark=last_seq)
+        table.frame.pack(fill='both', expand=True, padx=20, pady=(0, 10))
         
         # Botões de ação com melhor organização
-        btn_frame = tk.Frame(self.content_frame, bg='white')
+        btn_frame = tk.Frame(parent, bg='white')
         btn_frame.pack(fill='x', padx=20, pady=(0, 20))
         
         tk.Button(btn_frame, text="✏️ Editar", 
                  bg='#4D96FF', fg='white', font=('Arial', 10, 'bold'),
                  cursor='hand2', padx=15, pady=5,
-                 command=lambda: self.edit_selected(self.current_tree, table_name, fields)).pack(side='left', padx=5)
+                 command=lambda: self.edit_selected(table, table_name, fields)).pack(side='left', padx=5)
         
         tk.Button(btn_frame, text="🗑️ Excluir", 
                  bg='#FF6B9D', fg='white', font=('Arial', 10, 'bold'),
                  cursor='hand2', padx=15, pady=5,
-                 command=lambda: self.delete_selected(self.current_tree, table_name)).pack(side='left', padx=5)
+                 command=lambda: self.delete_selected(table, table_name)).pack(side='left', padx=5)
+        
+        tk.Button(btn_frame, text="🔁 Alterar em lote", 
+                 bg='#6BCF7F', fg='white', font=('Arial', 10, 'bold'),
+                 cursor='hand2', padx=15, pady=5,
+                 command=lambda: self.open_batch_dialog(table, table_name, fields)).pack(side='left', padx=5)
         
         tk.Button(btn_frame, text="🔄 Atualizar", 
                  bg='#FFD93D', fg='black', font=('Arial', 10, 'bold'),
                  cursor='hand2', padx=15, pady=5,
-                 command=lambda: self.load_table_data(self.current_tree, table_name, fields)).pack(side='left', padx=5)
+                 command=lambda: self.refresh_changes(view)).pack(side='left', padx=5)
         
         # Informações de seleção
-        self.selection_label = tk.Label(btn_frame, text="Nenhum item selecionado", 
-                                       font=('Arial', 9), fg='#666', bg='white')
-        self.selection_label.pack(side='right', padx=10)
+        selection_label = tk.Label(btn_frame, text="Nenhum item selecionado", 
+                                  font=('Arial', 9), fg='#666', bg='white')
+        selection_label.pack(side='right', padx=10)
         
         # Bind para atualizar seleção
-        self.current_tree.bind('<<TreeviewSelect>>', self.on_selection_change)
+        table.tree.bind('<<TreeviewSelect>>', self.on_selection_change, add='+')
+        
+        view = {
+            'table_name': table_name,
+            'fields': fields,
+            'table': table,
+            'count_label': count_label,
+            'search_var': search_var,
+            'period_var': period_var,
+            'periods': periods,
+            'selection_label': selection_label
+        }
+        
+        # Carregar dados
+        self.refresh_record_count(view)
+        self.load_table_data(table, table_name, fields)
+        return view
     
-    def get_record_count(self, table_name):
-        """Obtém contagem de registros"""
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
-            return cursor.fetchone()[0]
-        except sqlite3.Error:
-            return 0
+    def refresh_record_count(self, view):
+        """Atualiza o contador de registros da seção"""
+        count_label = view['count_label']
+        repository = self.services.table(view['table_name'])
+        self.db.submit(repository.count,
+                       callback=lambda count: count_label.config(text=f"{count} registro(s) encontrado(s)"),
+                       on_error=lambda e: count_label.config(text="0 registro(s) encontrado(s)"),
+                       group='section')
+    
+    def current_period(self, table_name):
+        """(coluna, início, fim) do período escolhido na seção, ou None"""
+        view = self.section_views.get(table_name)
+        if not view or 'period_var' not in view:
+            return None
+        choice = view['periods'].get(view['period_var'].get())
+        if choice is None:
+            return None
+        column, key = choice
+        return (column, *period_range(key))
     
     def on_selection_change(self, event):
-        """Atualiza label de seleção"""
-        if hasattr(self, 'selection_label') and hasattr(self, 'current_tree'):
-            selection = self.current_tree.selection()
-            if selection:
-                self.selection_label.config(text=f"1 item selecionado")
+        """Atualiza label de seleção (inclui itens selecionados fora da janela visível)"""
+        if hasattr(self, 'selection_label') and hasattr(self, 'current_table'):
+            count = len(self.current_table.selected_ids)
+            if count == 1:
+                self.selection_label.config(text="1 item selecionado")
+            elif count:
+                self.selection_label.config(text=f"{count} itens selecionados")
             else:
                 self.selection_label.config(text="Nenhum item selecionado")
     
+    def on_search_change(self, table_name, fields):
+        """Agenda a busca enquanto o usuário digita (debounce)"""
+        if self._search_job:
+            self.root.after_cancel(self._search_job)
+            self._search_job = None
+        
+        key = SearchCache.key(self.search_var.get())
+        if key and len(key) < SEARCH_MIN_CHARS:
+            return
+        self._search_job = self.root.after(SEARCH_DEBOUNCE_MS,
+                                           lambda: self.search_records(table_name, fields))
+    
     def search_records(self, table_name, fields):
-        """Busca registros (implementação básica)"""
-        search_term = self.search_var.get().strip()
-        if not search_term:
-            self.load_table_data(self.current_tree, table_name, fields)
+        """Busca textual (FTS5) em todas as colunas de texto, por relevância"""
+        if self._search_job:
+            self.root.after_cancel(self._search_job)
+            self._search_job = None
+        self.db.cancel('search')
+        
+        key = SearchCache.key(self.search_var.get())
+        if not key:
+            self.load_table_data(self.current_table, table_name, fields)
             return
         
-        try:
-            # Limpar tabela
-            for item in self.current_tree.get_children():
-                self.current_tree.delete(item)
-            
-            cursor = self.conn.cursor()
-            columns = [field[1] for field in fields]
-            
-            # Busca simples no primeiro campo de texto
-            text_fields = [field[1] for field in fields if field[2] == 'text']
-            if text_fields:
-                search_field = text_fields[0]  # Primeiro campo de texto
-                cursor.execute(f"SELECT id, {', '.join(columns)} FROM {table_name} WHERE {search_field} LIKE ?", 
-                              (f'%{search_term}%',))
-                
-                for row in cursor.fetchall():
-                    display_values = row[1:]
-                    self.current_tree.insert('', 'end', values=display_values, tags=(row[0],))
-                    
-        except sqlite3.Error as e:
-            messagebox.showerror("Erro", f"Erro na pesquisa: {e}")
+        repository = self.services.table(table_name)
+        columns = repository.columns
+        table = self.current_table
+        
+        # Ordenado ou filtrado por período: filtra pelo FTS e pagina pelo índice de ordenação
+        period = self.current_period(table_name)
+        if table.sort_order or period:
+            table.load(repository.search_source(key, order=table.order_keys(), period=period))
+            return
+        
+        # Termo recente: reaproveita a lista de ids
+        cached = self.search_cache.get(table_name, key)
+        if cached is None:
+            # Continuação de um termo em cache: estreita em memória
+            base = self.search_cache.find_narrowable(table_name, key)
+            if base is not None:
+                cached = base.narrow(key.split())
+                self.search_cache.put(table_name, key, cached)
+        if cached is not None:
+            table.load(IdListSource(table_name, columns, cached.ids))
+            return
+        
+        match = build_match_query(key)
+        
+        def on_matches(rows):
+            if len(rows) > SEARCH_CACHE_LIMIT:
+                table.load(repository.search_source(key))
+                return
+            result = SearchResult.from_matches(rows)
+            self.search_cache.put(table_name, key, result)
+            table.load(IdListSource(table_name, columns, result.ids))
+        
+        self.db.submit(lambda conn: repository.ranked_matches(conn, match, SEARCH_CACHE_LIMIT + 1),
+                       callback=on_matches, group='search')
     
-    def load_table_data(self, tree, table_name, fields):
-        """Carrega dados na tabela"""
-        try:
-            # Limpar tabela
-            for item in tree.get_children():
-                tree.delete(item)
-            
-            cursor = self.conn.cursor()
-            columns = [field[1] for field in fields]
-            cursor.execute(f"SELECT id, {', '.join(columns)} FROM {table_name}")
-            
-            # Cores alternadas para as linhas
-            for i, row in enumerate(cursor.fetchall()):
-                display_values = row[1:]
-                tags = (row[0], 'evenrow' if i % 2 == 0 else 'oddrow')
-                tree.insert('', 'end', values=display_values, tags=tags)
+    def load_table_data(self, table, table_name, fields):
+        """Carrega dados na tabela (apenas a página visível, por chave)"""
+        table.load(self.services.table(table_name).source(order=table.order_keys(),
+                                                          period=self.current_period(table_name)))
+    
+    def sort_records(self, table_name, fields):
+        """Recarrega a seção na ordem e no período escolhidos (mantém a busca)"""
+        if SearchCache.key(self.search_var.get()):
+            self.search_records(table_name, fields)
+        else:
+            self.load_table_data(self.current_table, table_name, fields)
+    
+    def import_records(self, table_name, fields):
+        """Importa um arquivo CSV/JSONL em lote, com progresso"""
+        path = filedialog.askopenfilename(
+            parent=self.root, title="Importar arquivo",
+            filetypes=[("CSV", "*.csv"), ("JSON Lines", "*.jsonl *.ndjson"), ("Todos", "*.*")])
+        if not path:
+            return
+        
+        cancel_event = threading.Event()
+        dialog, progress = self.open_progress_dialog(
+            f"📥 Importando {table_name}", cancel_event,
+            lambda result: (result.fraction,
+                            f"{result.imported} importado(s) • {result.rejected} rejeitado(s)"))
+        
+        def on_done(result):
+            dialog.destroy()
+            self.search_cache.invalidate(table_name)
+            view = self.section_views.get(table_name)
+            if view:
+                self.refresh_record_count(view)
+                self.load_table_data(view['table'], table_name, fields)
             
-            # Configurar cores das linhas
-            tree.tag_configure('evenrow', background='#f8f9fa')
-            tree.tag_configure('oddrow', background='white')
-                
-        except sqlite3.Error as e:
-            messagebox.showerror("Erro", f"Erro ao carregar dados: {e}")
+            message = f"{result.imported} registro(s) importado(s)! 🎉"
+            if result.cancelled:
+                message = f"Importação cancelada.\n{result.imported} registro(s) já importado(s)."
+            if result.rejected:
+                write_rejects(result, rejects_path(path))
+                message += (f"\n\n⚠️ {result.rejected} linha(s) rejeitada(s).\n"
+                            f"Detalhes em: {rejects_path(path)}")
+            messagebox.showinfo("Importação", message)
+        
+        def on_error(e):
+            dialog.destroy()
+            messagebox.showerror("Erro", f"Erro na importação: {e}")
+        
+        self.run_job(lambda conn: import_file(conn, path, table_name, fields,
+                                              progress=progress, cancel_event=cancel_event),
+                     cancel_event, callback=on_done, on_error=on_error)
+    
+    def export_records(self, table_name, fields):
+        """Exporta a tabela inteira ou o resultado da busca/período atual"""
+        view = self.section_views.get(table_name)
+        source = view['table'].source if view else None
+        if source is None:
+            return
+        
+        if SearchCache.key(view['search_var'].get()) or self.current_period(table_name):
+            choice = messagebox.askyesnocancel(
+                "Exportar", "Exportar apenas o resultado da busca/período atual?\n\n"
+                "Sim: resultado filtrado • Não: tabela inteira")
+            if choice is None:
+                return
+            if not choice:
+                source = self.services.table(table_name).source(order=view['table'].order_keys())
+        
+        path = filedialog.asksaveasfilename(
+            parent=self.root, title="Exportar", initialfile=f"{table_name}.csv",
+            defaultextension=".csv",
+            filetypes=[("CSV", "*.csv"), ("Excel", "*.xlsx"), ("JSON Lines", "*.jsonl")])
+        if not path:
+            return
+        
+        cancel_event = threading.Event()
+        dialog, progress = self.open_progress_dialog(
+            f"📤 Exportando {table_name}", cancel_event,
+            lambda result: (result.fraction, f"{result.exported} de {result.total} registro(s)"))
+        
+        def on_done(result):
+            dialog.destroy()
+            if result.cancelled:
+                messagebox.showinfo("Exportação", "Exportação cancelada.")
+            else:
+                messagebox.showinfo("Exportação",
+                                    f"{result.exported} registro(s) exportado(s)! 🎉\n\n{path}")
+        
+        def on_error(e):
+            dialog.destroy()
+            messagebox.showerror("Erro", f"Erro na exportação: {e}")
+        
+        self.run_job(lambda conn: export_source(conn, source, fields, path,
+                                                progress=progress, cancel_event=cancel_event),
+                     cancel_event, callback=on_done, on_error=on_error, read_only=True)
+    
+    def run_job(self, func, cancel_event, callback, on_error, read_only=False):
+        """Executa func(conn) numa thread com conexão própria (importação/exportação).
+        
+        Em WAL a leitura não espera as gravações, e a fila da thread de
+        banco da tela continua livre enquanto a tarefa roda; a conexão é
+        fechada ao terminar. read_only=True abre a conexão só para leitura.
+        """
+        def connect():
+            conn = self.services.storage.connect()
+            if read_only:
+                conn.execute("PRAGMA query_only = ON")
+            return conn
+        
+        job = DatabaseWorker(self.root, connect=connect)
+        self.jobs[job] = cancel_event
+        
+        def finish(handler):
+            def deliver(value):
+                self.jobs.pop(job, None)
+                job.close()
+                handler(value)
+            return deliver
+        
+        job.submit(func, callback=finish(callback), on_error=finish(on_error))
+    
+    def close_jobs(self):
+        """Cancela e encerra as tarefas longas ainda em andamento"""
+        for job, cancel_event in list(self.jobs.items()):
+            cancel_event.set()
+            job.close()
+        self.jobs.clear()
+    
+    @profiled("dialogo progresso")
+    def open_progress_dialog(self, title, cancel_event, describe):
+        """Janela de progresso para tarefas longas (ver run_job).
+        
+        Retorna (janela, progress); progress(resultado) pode ser chamado da
+        thread da tarefa: só guarda o último estado, que a tela lê a cada
+        100 ms usando describe(resultado) -> (fração, texto).
+        """
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Aguarde...")
+        dialog.geometry("400x170")
+        dialog.configure(bg='white')
+        dialog.resizable(False, False)
+        dialog.transient(self.root)
+        dialog.grab_set()
+        
+        tk.Label(dialog, text=title, 
+                font=('Arial', 12, 'bold'), fg='#FF6B9D', bg='white').pack(pady=(15, 5))
+        progress_bar = ttk.Progressbar(dialog, maximum=100, length=340)
+        progress_bar.pack(pady=5)
+        status_label = tk.Label(dialog, text="Iniciando... ⏳", 
+                               font=('Arial', 10), fg='#666', bg='white')
+        status_label.pack(pady=5)
+        
+        tk.Button(dialog, text="❌ Cancelar", bg='#FF6B9D', fg='white',
+                 font=('Arial', 10, 'bold'), relief='flat',
+                 command=cancel_event.set).pack(pady=5)
+        dialog.protocol("WM_DELETE_WINDOW", cancel_event.set)
+        
+        latest = {}
+        
+        def progress(result):
+            latest['status'] = describe(result)
+        
+        def poll():
+            if not dialog.winfo_exists():
+                return
+            if 'status' in latest:
+                fraction, text = latest['status']
+                progress_bar['value'] = fraction * 100
+                status_label.config(text=text)
+            dialog.after(100, poll)
+        
+        poll()
+        return dialog, progress
     
     def open_add_dialog(self, table_name, fields):
         """Abre diálogo para adicionar registro"""
         self.open_record_dialog(table_name, fields, "Adicionar", None)
     
+    @profiled("dialogo {3} {1}")
     def open_record_dialog(self, table_name, fields, mode, record_data=None):
         """Diálogo unificado para adicionar/editar registros"""
         dialog = tk.Toplevel(self.root)
@@ -680,7 +1014,7 @@ class CriancaEsperancaManager:
                 
                 # Placeholder para campos de data
                 if field_type == "date":
-                    placeholder = "DD/MM/AAAA"
+                    placeholder = PLACEHOLDER
                     if not record_data or not record_data.get(field_name):
                         entry.insert(0, placeholder)
                         entry.config(fg='gray')
@@ -701,7 +1035,8 @@ class CriancaEsperancaManager:
                 # Definir valor se editando
                 if record_data and field_name in record_data and record_data[field_name]:
                     entry.delete(0, tk.END)
-                    entry.insert(0, str(record_data[field_name]))
+                    value = record_data[field_name]
+                    entry.insert(0, format_date(value) if field_type == "date" else str(value))
                     entry.config(fg='black')
         
         # Rodapé com botões
@@ -746,7 +1081,7 @@ class CriancaEsperancaManager:
                 else:
                     value = widget.get().strip()
                     # Limpar placeholder
-                    if value == "DD/MM/AAAA":
+                    if value == PLACEHOLDER:
                         value = ""
                 
                 # Verificar campos obrigatórios (nome/titulo)
@@ -762,115 +1097,271 @@ class CriancaEsperancaManager:
                                      f"Os seguintes campos são obrigatórios:\n• {chr(10).join(required_fields)}")
                 return
             
-            cursor = self.conn.cursor()
+            # Converter para o tipo de cada campo (número, data, opção)
+            repository = self.services.table(table_name)
+            try:
+                values = repository.values(dict(zip(columns, values)))
+            except RowError as e:
+                messagebox.showwarning("Valor inválido", str(e), parent=dialog)
+                return
             
             if record_data:  # Editando
-                # UPDATE
-                set_clause = ', '.join([f"{col} = ?" for col in columns])
-                cursor.execute(f"UPDATE {table_name} SET {set_clause} WHERE id = ?", 
-                              values + [record_data['id']])
                 success_msg = "Registro atualizado com sucesso! ✅"
             else:  # Adicionando
-                # INSERT
-                placeholders = ', '.join(['?' for _ in values])
-                cursor.execute(f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES ({placeholders})", values)
                 success_msg = "Registro salvo com sucesso! 🎉"
             
-            self.conn.commit()
-            messagebox.showinfo("Sucesso", success_msg)
-            dialog.destroy()
+            def write(conn):
+                if record_data:
+                    # Só grava se ninguém alterou o registro desde que foi aberto
+                    repository.update(conn, record_data['id'], values, version=record_data.get('versao'))
+                else:
+                    repository.insert(conn, values)
             
-            # Recarregar seção atual
-            self.show_section(self.current_section)
+            def on_error(e):
+                if isinstance(e, ConflictError):
+                    self.on_save_conflict(e, dialog, table_name, fields, entries, record_data)
+                else:
+                    messagebox.showerror("Erro", f"Erro ao salvar: {e}")
+            
+            self.db.submit(write,
+                           callback=lambda _: self.on_record_saved(dialog, table_name, success_msg),
+                           on_error=on_error)
             
-        except sqlite3.Error as e:
-            messagebox.showerror("Erro", f"Erro ao salvar: {e}")
         except Exception as e:
             messagebox.showerror("Erro", f"Erro inesperado: {e}")
     
-    def edit_selected(self, tree, table_name, fields):
-        """Edita registro selecionado - FUNÇÃO IMPLEMENTADA"""
-        selection = tree.selection()
-        if not selection:
+    def on_save_conflict(self, conflict, dialog, table_name, fields, entries, record_data):
+        """Outra pessoa alterou ou excluiu o registro enquanto ele era editado"""
+        view = self.section_views.get(table_name)
+        self.search_cache.invalidate(table_name)
+        if conflict.current is None:
+            messagebox.showerror("Registro excluído",
+                                 f"{conflict}. Suas alterações não foram gravadas. 🗑️", parent=dialog)
+            dialog.destroy()
+            if view:
+                view['table'].remove_rows([conflict.record_id])
+                self.refresh_record_count(view)
+            return
+        
+        if view and not view['table'].sort_order and self.current_period(table_name) is None:
+            view['table'].update_row(conflict.current)
+        answer = messagebox.askyesnocancel(
+            "Registro alterado ⚠️",
+            f"{conflict} enquanto você editava.\n\n"
+            "Sim: gravar os seus dados por cima\n"
+            "Não: descartar suas alterações e abrir a versão atual\n"
+            "Cancelar: continuar editando",
+            parent=dialog)
+        if answer is None:
+            # Continua editando; o próximo salvamento compara com a versão atual
+            record_data['versao'] = conflict.version
+        elif answer:
+            record_data['versao'] = conflict.version
+            self.save_record(dialog, table_name, fields, entries, record_data)
+        else:
+            dialog.destroy()
+            current = {'id': conflict.current[0], 'versao': conflict.version}
+            current.update(zip([field[1] for field in fields], conflict.current[1:]))
+            self.open_record_dialog(table_name, fields, "Editar", current)
+    
+    def on_record_saved(self, dialog, table_name, success_msg):
+        """Conclui o salvamento após confirmação da thread do banco"""
+        self.search_cache.invalidate(table_name)
+        messagebox.showinfo("Sucesso", success_msg)
+        dialog.destroy()
+        
+        # Aplica só as alterações desde a última leitura (a deste salvamento
+        # e as de outras estações)
+        view = self.section_views.get(table_name)
+        if view:
+            self.refresh_changes(view)
+    
+    def edit_selected(self, table, table_name, fields):
+        """Edita o registro selecionado (vários selecionados: alteração em lote)"""
+        if not table.selected_ids:
             messagebox.showwarning("Aviso", "Selecione um item para editar!")
             return
+        if len(table.selected_ids) > 1:
+            self.open_batch_dialog(table, table_name, fields)
+            return
         
-        try:
-            # Obter ID do registro usando as tags
-            item_tags = tree.item(selection[0])['tags']
-            if not item_tags:
-                messagebox.showerror("Erro", "Não foi possível identificar o registro!")
-                return
-            
-            record_id = item_tags[0]
-            
-            # Buscar dados completos do registro
-            cursor = self.conn.cursor()
-            columns = [field[1] for field in fields]
-            cursor.execute(f"SELECT id, {', '.join(columns)} FROM {table_name} WHERE id = ?", (record_id,))
-            
-            row = cursor.fetchone()
+        record_id = next(iter(table.selected_ids))
+        
+        # Buscar dados completos do registro
+        repository = self.services.table(table_name)
+        columns = repository.columns
+        
+        def open_dialog(result):
+            row, version = result
             if not row:
                 messagebox.showerror("Erro", "Registro não encontrado!")
                 return
             
-            # Preparar dados para o diálogo
-            record_data = {'id': row[0]}
+            # Preparar dados para o diálogo (a versão vale para detectar conflitos)
+            record_data = {'id': row[0], 'versao': version}
             for i, field_name in enumerate(columns):
                 record_data[field_name] = row[i + 1]
             
             # Abrir diálogo de edição
             self.open_record_dialog(table_name, fields, "Editar", record_data)
-            
-        except sqlite3.Error as e:
-            messagebox.showerror("Erro", f"Erro ao carregar registro: {e}")
+        
+        self.db.submit(lambda conn: repository.fetch_versioned(conn, record_id),
+                       callback=open_dialog,
+                       on_error=lambda e: messagebox.showerror("Erro", f"Erro ao carregar registro: {e}"),
+                       group='section')
     
-    def delete_selected(self, tree, table_name):
-        """Exclui registro selecionado com confirmação melhorada"""
-        selection = tree.selection()
-        if not selection:
+    def delete_selected(self, table, table_name):
+        """Exclui os registros selecionados numa única transação"""
+        record_ids = sorted(table.selected_ids)
+        if not record_ids:
             messagebox.showwarning("Aviso", "Selecione um item para excluir!")
             return
         
         # Confirmação com mais detalhes
-        item_values = tree.item(selection[0])['values']
-        first_value = item_values[0] if item_values else "este registro"
+        if len(record_ids) == 1:
+            item_values = ()
+            if table.tree.exists(str(record_ids[0])):
+                item_values = table.tree.item(str(record_ids[0]))['values']
+            first_value = item_values[0] if item_values else "este registro"
+            question = f"⚠️ Tem certeza que deseja excluir '{first_value}'?"
+        else:
+            question = f"⚠️ Tem certeza que deseja excluir {len(record_ids)} registros?"
         
         result = messagebox.askyesnocancel(
             "Confirmar Exclusão", 
-            f"⚠️ Tem certeza que deseja excluir '{first_value}'?\n\n"
-            "Esta ação não pode ser desfeita!",
+            f"{question}\n\nEsta ação não pode ser desfeita!",
             icon='warning'
         )
+        if not result:
+            return
+        
+        def on_deleted(_):
+            self.search_cache.invalidate(table_name)
+            if len(record_ids) == 1:
+                messagebox.showinfo("Sucesso", "Registro excluído com sucesso! 🗑️")
+            else:
+                messagebox.showinfo("Sucesso", f"{len(record_ids)} registros excluídos com sucesso! 🗑️")
+            
+            # Retirar só as linhas excluídas
+            table.remove_rows(record_ids)
+            self.on_selection_change(None)
+            view = self.section_views.get(table_name)
+            if view:
+                self.refresh_record_count(view)
+        
+        repository = self.services.table(table_name)
+        self.db.submit(lambda conn: repository.delete(conn, record_ids),
+                       callback=on_deleted,
+                       on_error=lambda e: messagebox.showerror("Erro", f"Erro ao excluir: {e}"))
+    
+    @profiled("dialogo lote {2}")
+    def open_batch_dialog(self, table, table_name, fields):
+        """Atribui o mesmo valor a um campo de todos os registros selecionados"""
+        record_ids = sorted(table.selected_ids)
+        if not record_ids:
+            messagebox.showwarning("Aviso", "Selecione os itens para alterar!")
+            return
+        
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Alterar em lote")
+        dialog.geometry("400x260")
+        dialog.configure(bg='white')
+        dialog.resizable(False, False)
+        dialog.transient(self.root)
+        dialog.grab_set()
         
-        if result:
+        tk.Label(dialog, text=f"🔁 Alterar {len(record_ids)} registro(s)", 
+                font=('Arial', 14, 'bold'), fg='#FF6B9D', bg='white').pack(pady=(15, 10))
+        
+        form = tk.Frame(dialog, bg='white')
+        form.pack(fill='x', padx=20)
+        
+        tk.Label(form, text="Campo:", font=('Arial', 10, 'bold'),
+                bg='white', fg='#333').pack(anchor='w')
+        field_var = tk.StringVar()
+        field_combo = ttk.Combobox(form, textvariable=field_var, state='readonly',
+                                  values=[field[0] for field in fields])
+        field_combo.pack(fill='x', pady=(0, 10))
+        
+        tk.Label(form, text="Novo valor:", font=('Arial', 10, 'bold'),
+                bg='white', fg='#333').pack(anchor='w')
+        value_var = tk.StringVar()
+        value_combo = ttk.Combobox(form, textvariable=value_var)
+        value_combo.pack(fill='x')
+        
+        def selected_field():
+            return next(field for field in fields if field[0] == field_var.get())
+        
+        def on_field_change(event=None):
+            # Campos com opções (ex.: status) só aceitam valores da lista
+            field = selected_field()
+            value_var.set("")
+            if field[2] == 'combo':
+                value_combo.config(values=field[4], state='readonly')
+            else:
+                value_combo.config(values=[], state='normal')
+        
+        field_combo.bind('<<ComboboxSelected>>', on_field_change)
+        
+        # Status é a alteração em lote mais comum
+        status_fields = [field for field in fields if field[2] == 'combo']
+        field_var.set((status_fields or fields)[0][0])
+        on_field_change()
+        
+        repository = self.services.table(table_name)
+        
+        def apply():
+            field = selected_field()
             try:
-                # Obter ID do registro usando as tags
-                item_tags = tree.item(selection[0])['tags']
-                if item_tags:
-                    record_id = item_tags[0]
-                    
-                    cursor = self.conn.cursor()
-                    cursor.execute(f"DELETE FROM {table_name} WHERE id = ?", (record_id,))
-                    self.conn.commit()
-                    
-                    messagebox.showinfo("Sucesso", "Registro excluído com sucesso! 🗑️")
-                    self.show_section(self.current_section)
+                # Tipo e obrigatoriedade conferidos antes de ir ao banco
+                value = repository.coerce(field[1], value_var.get())
+            except RowError as e:
+                messagebox.showwarning("Valor inválido", str(e), parent=dialog)
+                return
+            
+            def on_updated(result):
+                updated = result[1]
+                dialog.destroy()
+                self.search_cache.invalidate(table_name)
+                period = self.current_period(table_name)
+                if field[1] in dict(table.sort_order) or (period and period[0] == field[1]):
+                    table.refresh()
                 else:
-                    messagebox.showerror("Erro", "Não foi possível identificar o registro!")
-                    
-            except sqlite3.Error as e:
-                messagebox.showerror("Erro", f"Erro ao excluir: {e}")
+                    table.set_column(record_ids, field[1], value)
+                view = self.section_views.get(table_name)
+                if view:
+                    self.refresh_record_count(view)
+                messagebox.showinfo("Sucesso", f"{updated} registro(s) atualizado(s)! ✅")
+            
+            self.db.submit(lambda conn: repository.update_field(conn, field[1], value, record_ids),
+                           callback=on_updated,
+                           on_error=lambda e: messagebox.showerror("Erro", f"Erro ao atualizar: {e}"))
+        
+        btn_frame = tk.Frame(dialog, bg='white')
+        btn_frame.pack(pady=20)
+        tk.Button(btn_frame, text="💾 Aplicar", bg='#6BCF7F', fg='white',
+                 font=('Arial', 11, 'bold'), padx=20, cursor='hand2',
+                 command=apply).pack(side='right', padx=5)
+        tk.Button(btn_frame, text="❌ Cancelar", bg='#FF6B9D', fg='white',
+                 font=('Arial', 11, 'bold'), padx=20, cursor='hand2',
+                 command=dialog.destroy).pack(side='right')
 
     def logout(self):
         """Sair do sistema com confirmação"""
         if messagebox.askyesno("Sair", "Tem certeza que deseja sair do sistema? 🚪"):
-            try:
-                self.conn.close()
-            except:
-                pass
+            if self.on_logout:
+                self.on_logout()
+                return
+            self.close_jobs()
+            self.db.close()
             self.root.destroy()
     
+    def destroy(self):
+        """Remove a interface do gerenciamento (a janela e a conexão continuam abertas)"""
+        self.cancel_pending()
+        self.close_jobs()
+        self.main_frame.destroy()
+    
     def run(self):
         """Executa o sistema de gerenciamento"""
         try:
@@ -890,11 +1381,9 @@ class CriancaEsperancaManager:
         except Exception as e:
             messagebox.showerror("Erro", f"Erro crítico: {e}")
         finally:
-            if hasattr(self, 'conn'):
-                try:
-                    self.conn.close()
-                except:
-                    pass
+            self.close_jobs()
+            if hasattr(self, 'db'):
+                self.db.close()
 
 # Função para integrar com o sistema de login
 def iniciar_gerenciamento(user_data):
@@ -908,6 +1397,11 @@ def iniciar_gerenciamento(user_data):
 
 # Exemplo de uso (para teste independente)
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gerenciamento Criança Esperança (teste independente)")
+    profiling.add_argument(parser)
+    args = parser.parse_args()
+    profiling.enable_from_args(args)
+    
     # Dados de exemplo do usuário
     user_data_exemplo = {
         'id': 1,
@@ -0,0 +1,326 @@
+import argparse
+import re
+
+import database
+
+import change_log
+import counters
+import reports
+import search_index
+from change_log import create_change_log, log_reload, prune
+from counters import create_counters
+from reports import MONTH, REPORTS, activities_by_month, create_rollups
+from search_index import create_search_indexes
+
+
+def create_base_tables(conn):
+    """Tabelas iniciais do sistema (acesso e gerenciamento)"""
+    cursor = conn.cursor()
+
+    # Tabela de usuários
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS usuarios (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            password TEXT NOT NULL,
+            nome_completo TEXT,
+            email TEXT,
+            data_criacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # Tabela de projetos
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS projetos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nome TEXT NOT NULL,
+            descricao TEXT,
+            data_inicio DATE,
+            data_fim DATE,
+            status TEXT DEFAULT 'Ativo',
+            responsavel TEXT,
+            orcamento REAL DEFAULT 0,
+            data_criacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # Tabela de voluntários
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS voluntarios (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nome TEXT NOT NULL,
+            email TEXT,
+            telefone TEXT,
+            area_interesse TEXT,
+            disponibilidade TEXT,
+            data_cadastro TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # Tabela de beneficiários
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS beneficiarios (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nome TEXT NOT NULL,
+            idade INTEGER,
+            responsavel TEXT,
+            telefone_responsavel TEXT,
+            endereco TEXT,
+            situacao TEXT,
+            data_cadastro TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # Tabela de atividades
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS atividades (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            titulo TEXT NOT NULL,
+            descricao TEXT,
+            projeto_id INTEGER,
+            data_atividade DATE,
+            local TEXT,
+            participantes INTEGER DEFAULT 0,
+            status TEXT DEFAULT 'Planejada',
+            data_criacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (projeto_id) REFERENCES projetos (id)
+        )
+    ''')
+
+
+# Índices secundários: (nome, tabela, colunas) — ver check_query_plans.py
+QUERY_INDEXES = [
+    ('idx_projetos_status', 'projetos', 'status'),
+    ('idx_projetos_nome', 'projetos', 'nome'),
+    ('idx_voluntarios_nome', 'voluntarios', 'nome'),
+    ('idx_beneficiarios_nome', 'beneficiarios', 'nome'),
+    ('idx_atividades_titulo', 'atividades', 'titulo'),
+    ('idx_atividades_projeto', 'atividades', 'projeto_id'),
+    ('idx_atividades_status', 'atividades', 'status'),
+    ('idx_atividades_data_criacao', 'atividades', 'data_criacao'),
+    ('idx_atividades_data', 'atividades', 'data_atividade'),
+]
+
+
+def create_query_indexes(conn):
+    """Índices para os filtros, ordenações e chaves estrangeiras usados pela aplicação"""
+    cursor = conn.cursor()
+    for index_name, table_name, columns in QUERY_INDEXES:
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON {table_name} ({columns})")
+
+
+# Índices de ordenação pelos cabeçalhos: (nome, tabela, expressão). A
+# expressão é a mesma de virtual_table.sort_key; textos longos (descrição,
+# endereço) ficam sem índice e são ordenados sem ele. As datas aqui ainda
+# são DD/MM/AAAA (passo 5); o passo 9 troca esses índices pelos de
+# ISO_DATE_SORT_INDEXES.
+SORT_INDEXES = [
+    ('idx_projetos_ord_nome', 'projetos', "IFNULL(nome, '')"),
+    ('idx_projetos_ord_data_inicio', 'projetos',
+     "IFNULL(substr(data_inicio, 7, 4) || substr(data_inicio, 4, 2) || substr(data_inicio, 1, 2), '')"),
+    ('idx_projetos_ord_data_fim', 'projetos',
+     "IFNULL(substr(data_fim, 7, 4) || substr(data_fim, 4, 2) || substr(data_fim, 1, 2), '')"),
+    ('idx_projetos_ord_status', 'projetos', "IFNULL(status, '')"),
+    ('idx_projetos_ord_responsavel', 'projetos', "IFNULL(responsavel, '')"),
+    ('idx_projetos_ord_orcamento', 'projetos', "IFNULL(orcamento, -9e307)"),
+    ('idx_voluntarios_ord_nome', 'voluntarios', "IFNULL(nome, '')"),
+    ('idx_voluntarios_ord_email', 'voluntarios', "IFNULL(email, '')"),
+    ('idx_voluntarios_ord_telefone', 'voluntarios', "IFNULL(telefone, '')"),
+    ('idx_voluntarios_ord_area_interesse', 'voluntarios', "IFNULL(area_interesse, '')"),
+    ('idx_voluntarios_ord_disponibilidade', 'voluntarios', "IFNULL(disponibilidade, '')"),
+    ('idx_beneficiarios_ord_nome', 'beneficiarios', "IFNULL(nome, '')"),
+    ('idx_beneficiarios_ord_idade', 'beneficiarios', "IFNULL(idade, -9e307)"),
+    ('idx_beneficiarios_ord_responsavel', 'beneficiarios', "IFNULL(responsavel, '')"),
+    ('idx_beneficiarios_ord_telefone_responsavel', 'beneficiarios', "IFNULL(telefone_responsavel, '')"),
+    ('idx_beneficiarios_ord_situacao', 'beneficiarios', "IFNULL(situacao, '')"),
+    ('idx_atividades_ord_titulo', 'atividades', "IFNULL(titulo, '')"),
+    ('idx_atividades_ord_data_atividade', 'atividades',
+     "IFNULL(substr(data_atividade, 7, 4) || substr(data_atividade, 4, 2) || substr(data_atividade, 1, 2), '')"),
+    ('idx_atividades_ord_local', 'atividades', "IFNULL(local, '')"),
+    ('idx_atividades_ord_participantes', 'atividades', "IFNULL(participantes, -9e307)"),
+    ('idx_atividades_ord_status', 'atividades', "IFNULL(status, '')"),
+]
+
+
+def create_sort_indexes(conn):
+    """Índices de expressão para ordenar e paginar pelos cabeçalhos da tabela"""
+    cursor = conn.cursor()
+    for index_name, table_name, expression in SORT_INDEXES:
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON {table_name} ({expression})")
+
+
+# Tabelas de cadastro com versão por registro (edição otimista, services.py)
+VERSIONED_TABLES = ('projetos', 'voluntarios', 'beneficiarios', 'atividades')
+
+
+def add_row_versions(conn):
+    """Coluna versao, incrementada a cada alteração do registro"""
+    cursor = conn.cursor()
+    for table_name in VERSIONED_TABLES:
+        cursor.execute(f"PRAGMA table_info({table_name})")
+        if 'versao' not in [row[1] for row in cursor.fetchall()]:
+            cursor.execute(f"ALTER TABLE {table_name} ADD COLUMN versao INTEGER NOT NULL DEFAULT 1")
+
+
+# Passo 8 como publicado: o mês dos resumos de atividades vinha de datas
+# DD/MM/AAAA. O passo 9 recria esses triggers com o catálogo atual.
+ROLLUPS_DDMMYYYY = dict(REPORTS, atividades_mes_status=activities_by_month(MONTH))
+
+
+def create_rollups_ddmmyyyy(conn):
+    """Tabela de resumos e triggers, com o mês de datas DD/MM/AAAA"""
+    create_rollups(conn, ROLLUPS_DDMMYYYY)
+
+
+# Colunas de data gravadas como DD/MM/AAAA até o passo 9
+DATE_COLUMNS = {
+    'projetos': ('data_inicio', 'data_fim'),
+    'atividades': ('data_atividade',),
+}
+
+# Índices de ordenação das datas em ISO: a própria coluna, como em
+# virtual_table.sort_key (substituem os de SORT_INDEXES no passo 9)
+ISO_DATE_SORT_INDEXES = [(f"idx_{table_name}_ord_{column}", table_name, f"IFNULL({column}, '')")
+                         for table_name, columns in DATE_COLUMNS.items() for column in columns]
+
+
+def store_iso_dates(conn):
+    """Datas DD/MM/AAAA passam a AAAA-MM-DD, com índices de ordenação na própria coluna.
+
+    Os triggers dos resumos de atividades agrupam por mês a partir da
+    data e são recriados com a expressão nova. As alterações da conversão
+    entram no registro como uma marca de recarga por tabela, não linha a
+    linha.
+    """
+    cursor = conn.cursor()
+    first_seq = cursor.execute("SELECT IFNULL(MAX(seq), 0) FROM alteracoes").fetchone()[0]
+    for suffix in ('ai', 'au', 'ad'):
+        cursor.execute(f"DROP TRIGGER IF EXISTS atividades_resumos_{suffix}")
+
+    for table_name, columns in DATE_COLUMNS.items():
+        for column in columns:
+            cursor.execute(f"DROP INDEX IF EXISTS idx_{table_name}_ord_{column}")
+            cursor.execute(f'''
+                UPDATE {table_name}
+                SET {column} = substr({column}, 7, 4) || '-' || substr({column}, 4, 2) || '-' || substr({column}, 1, 2)
+                WHERE {column} LIKE '__/__/____'
+            ''')
+    cursor.execute("DELETE FROM alteracoes WHERE seq > ?", (first_seq,))
+    for table_name in DATE_COLUMNS:
+        log_reload(conn, table_name)
+
+    for index_name, table_name, expression in ISO_DATE_SORT_INDEXES:
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON {table_name} ({expression})")
+    create_rollups(conn)
+
+
+# Tabela que desliga os triggers AFTER INSERT de uma tabela durante a
+# carga em lote (bulk_import.bulk_load)
+BULK_LOAD_TABLE = 'carga_em_lote'
+
+
+def insert_triggers(table_name):
+    """Triggers AFTER INSERT mantidos por linha: busca, contadores, alterações e resumos"""
+    return (search_index.insert_trigger(table_name), counters.insert_trigger(table_name),
+            change_log.insert_trigger(table_name), reports.insert_trigger(table_name))
+
+
+def gate_insert_triggers(conn):
+    """Triggers AFTER INSERT passam a conferir a tabela carga_em_lote.
+
+    Enquanto uma transação tiver a linha da tabela em carga_em_lote, as
+    inserções nela não disparam esses triggers (a carga em lote atualiza
+    índice, contadores e resumos de uma vez). A linha entra e sai na
+    mesma transação, então as outras conexões nunca a veem. Cada trigger
+    é recriado a partir do próprio SQL guardado, com a condição WHEN.
+    """
+    cursor = conn.cursor()
+    cursor.execute(f"CREATE TABLE IF NOT EXISTS {BULK_LOAD_TABLE} (tabela TEXT PRIMARY KEY) WITHOUT ROWID")
+    for table_name in VERSIONED_TABLES:
+        condition = f"WHEN NOT EXISTS (SELECT 1 FROM {BULK_LOAD_TABLE} WHERE tabela = '{table_name}') BEGIN"
+        for name in insert_triggers(table_name):
+            cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = ?", (name,))
+            row = cursor.fetchone()
+            if row is None or BULK_LOAD_TABLE in row[0]:
+                continue
+            cursor.execute(f"DROP TRIGGER {name}")
+            cursor.execute(re.sub(r"\bBEGIN\b", condition, row[0], count=1))
+
+
+# Passos em ordem: (versão, descrição, função). Nunca altere um passo já
+# publicado; mudanças de esquema entram como um novo passo no fim da lista.
+MIGRATIONS = [
+    (1, "tabelas iniciais", create_base_tables),
+    (2, "busca textual (FTS5)", create_search_indexes),
+    (3, "contadores por tabela e status", create_counters),
+    (4, "índices de consulta", create_query_indexes),
+    (5, "índices de ordenação", create_sort_indexes),
+    (6, "versão dos registros", add_row_versions),
+    (7, "registro de alterações", create_change_log),
+    (8, "resumos para relatórios", create_rollups_ddmmyyyy),
+    (9, "datas no formato ISO", store_iso_dates),
+    (10, "cargas em lote sem triggers por linha", gate_insert_triggers),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn):
+    cursor = conn.cursor()
+    cursor.execute("PRAGMA user_version")
+    return cursor.fetchone()[0]
+
+
+def migrate(conn):
+    """Aplica os passos pendentes; com o esquema em dia faz só uma leitura.
+
+    Cada passo roda na sua própria transação junto com a atualização de
+    PRAGMA user_version, então uma falha não deixa o esquema pela metade.
+    Bancos criados antes do controle de versão (user_version = 0) passam
+    por todos os passos, que toleram objetos já existentes.
+    """
+    version = get_schema_version(conn)
+    if version >= SCHEMA_VERSION:
+        return version
+
+    if conn.in_transaction:
+        conn.commit()
+
+    for number, description, step in MIGRATIONS:
+        if number <= version:
+            continue
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            # Outro processo pode ter aplicado o passo enquanto esperávamos
+            if get_schema_version(conn) >= number:
+                conn.commit()
+                continue
+            step(conn)
+            conn.execute(f"PRAGMA user_version = {number}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        print(f"✅ Migração {number} aplicada: {description}")
+        version = number
+
+    return version
+
+
+
+def prepare_database(conn):
+    """Tarefa de abertura das aplicações: esquema em dia e registro de
+    alterações aparado (change_log.prune), na conexão que escreve"""
+    version = migrate(conn)
+    prune(conn)
+    return version
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrações do banco Criança Esperança")
+    parser.add_argument("--db", default=database.DB_PATH, help="arquivo do banco")
+    args = parser.parse_args()
+
+    conn = database.connect(args.db)
+    print(f"Versão do esquema: {get_schema_version(conn)} (atual: {SCHEMA_VERSION})")
+    migrate(conn)
+    database.close(conn)
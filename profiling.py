@@ -0,0 +1,226 @@
+"""Modo de perfil (--perfil / --profile) da inicialização e da navegação.
+
+Cada fase marcada roda sob o cProfile e vira um arquivo .prof próprio na
+pasta de saída. As fases são as importações, init_database,
+create_main_interface, cada troca de seção e cada diálogo aberto. Ao
+sair, uma tabela com o tempo de cada fase é impressa e gravada em
+resumo.txt. Os arquivos abrem com "python -m pstats arquivo.prof" ou com
+visualizadores como o snakeviz.
+
+Fora do modo de perfil, uma função marcada custa só uma verificação.
+
+Para medir também as importações, o script chama start_if_requested()
+antes de importar o resto:
+
+    import profiling
+    profiling.start_if_requested()
+"""
+import atexit
+import cProfile
+import functools
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from datetime import datetime
+
+PROFILE_FLAGS = ('--perfil', '--profile')
+IMPORT_PHASE = "importacoes"
+
+session = None      # ProfileSession ativa (None fora do modo de perfil)
+
+
+def default_output_dir():
+    return f"perfil_{datetime.now():%Y%m%d_%H%M%S}"
+
+
+def _slug(name):
+    return re.sub(r'[^0-9A-Za-z_.-]+', '_', name).strip('_') or 'fase'
+
+
+class Phase:
+    """Uma fase medida: tempos, chamadas e onde o tempo foi gasto"""
+
+    def __init__(self, index, name, wall_ms, cpu_ms, profiler):
+        self.index = index
+        self.name = name
+        self.wall_ms = wall_ms
+        self.cpu_ms = cpu_ms
+        self.profiler = profiler
+        self.path = None
+
+        stats = pstats.Stats(profiler)
+        self.calls = stats.total_calls
+        # Função com mais tempo próprio (tottime): o ponto quente da fase
+        hottest = max(stats.stats.items(), key=lambda item: item[1][2], default=None)
+        if hottest is None:
+            self.hottest = ""
+        else:
+            (filename, line, function), (_, _, own, _, _) = hottest
+            where = os.path.basename(filename) if filename != '~' else ''
+            location = f"{where}:{line} " if where else ""
+            self.hottest = f"{location}{function} ({own * 1000:.1f} ms)"
+
+    def write(self, output_dir):
+        self.path = os.path.join(output_dir, f"{self.index:03d}_{_slug(self.name)}.prof")
+        self.profiler.dump_stats(self.path)
+        self.profiler = None    # Os dados já estão no arquivo
+
+
+class ProfileSession:
+    """Fases medidas neste processo e a pasta onde são gravadas.
+
+    As fases podem ser medidas antes de a pasta ser conhecida (as
+    importações acontecem antes de a linha de comando ser lida); elas
+    ficam em memória até enable() ou até a saída do processo.
+    """
+
+    def __init__(self, output_dir=None):
+        self.output_dir = output_dir
+        self.started = time.perf_counter()
+        self.boot_cpu_ms = time.process_time() * 1000   # CPU do interpretador até aqui
+        self.phases = []
+        self.milestones = []    # (nome, ms desde o início)
+        self._import_phase = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        atexit.register(self.finish)
+
+    def begin(self, name):
+        """Inicia uma fase na thread atual; None se já há uma em andamento.
+
+        O cProfile mede uma fase por vez em cada thread; uma fase aninhada
+        (um diálogo aberto durante uma troca de seção) entra na de fora.
+        """
+        if getattr(self._local, 'active', False):
+            return None
+        self._local.active = True
+        profiler = cProfile.Profile()
+        token = (name, profiler, time.perf_counter(), time.thread_time())
+        profiler.enable()
+        return token
+
+    def end(self, token):
+        if token is None:
+            return
+        name, profiler, wall, cpu = token
+        profiler.disable()
+        cpu_ms = (time.thread_time() - cpu) * 1000
+        wall_ms = (time.perf_counter() - wall) * 1000
+        self._local.active = False
+        with self._lock:
+            phase = Phase(len(self.phases) + 1, name, wall_ms, cpu_ms, profiler)
+            self.phases.append(phase)
+            if self.output_dir:
+                phase.write(self.output_dir)
+
+    def run(self, name, func, *args, **kwargs):
+        token = self.begin(name)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self.end(token)
+
+    def set_output_dir(self, output_dir):
+        os.makedirs(output_dir, exist_ok=True)
+        with self._lock:
+            self.output_dir = output_dir
+            for phase in self.phases:
+                if phase.path is None:
+                    phase.write(output_dir)
+
+    def mark(self, name):
+        self.milestones.append((name, (time.perf_counter() - self.started) * 1000))
+
+    def summary(self):
+        """Tabela de fases (texto) na ordem em que rodaram"""
+        width = max([len(phase.name) for phase in self.phases] + [32])
+        lines = [f"{'Fase':<{width}} {'Parede (ms)':>12} {'CPU (ms)':>10} {'Chamadas':>10}  Mais tempo próprio",
+                 '-' * (width + 60),
+                 f"{'interpretador (antes do perfil)':<{width}} {'-':>12} {self.boot_cpu_ms:>10.1f} {'-':>10}"]
+        for phase in self.phases:
+            lines.append(f"{phase.name:<{width}} {phase.wall_ms:>12.1f} {phase.cpu_ms:>10.1f} "
+                         f"{phase.calls:>10}  {phase.hottest}")
+        total = sum(phase.wall_ms for phase in self.phases)
+        lines.append('-' * (width + 60))
+        lines.append(f"{'total das fases':<{width}} {total:>12.1f}")
+        for name, ms in self.milestones:
+            lines.append(f"⏱️ {name}: {ms:.0f} ms desde o início do processo")
+        return '\n'.join(lines)
+
+    def finish(self):
+        """Grava as fases pendentes e o resumo (chamado na saída)"""
+        if self._import_phase is not None:
+            self.end(self._import_phase)
+            self._import_phase = None
+        if not self.phases:
+            return
+        if not self.output_dir:
+            self.set_output_dir(default_output_dir())
+        text = self.summary()
+        with open(os.path.join(self.output_dir, 'resumo.txt'), 'w', encoding='utf-8') as handle:
+            handle.write(text + '\n')
+        print(f"\n📊 Perfil por fase (arquivos em {os.path.abspath(self.output_dir)}):")
+        print(text)
+
+
+def requested(argv=None):
+    """A linha de comando pede o modo de perfil?"""
+    argv = sys.argv[1:] if argv is None else argv
+    return any(arg.split('=', 1)[0] in PROFILE_FLAGS for arg in argv)
+
+
+def start_if_requested(argv=None):
+    """Com --perfil na linha de comando, começa a medir as importações"""
+    global session
+    if session is None and requested(argv):
+        session = ProfileSession()
+        session._import_phase = session.begin(IMPORT_PHASE)
+
+
+def enable(output_dir):
+    """Liga o modo de perfil gravando em output_dir (encerra a fase de importações)"""
+    global session
+    if session is None:
+        session = ProfileSession()
+    if session._import_phase is not None:
+        session.end(session._import_phase)
+        session._import_phase = None
+    session.set_output_dir(output_dir)
+    print(f"📊 Modo de perfil: fases gravadas em {os.path.abspath(output_dir)}")
+
+
+def add_argument(parser):
+    """Opção --perfil [PASTA] (ou --profile) de uma linha de comando"""
+    parser.add_argument('--perfil', '--profile', nargs='?', const='', default=None, metavar='PASTA',
+                        help="mede cada fase com o cProfile e grava um .prof por fase "
+                             "(padrão: perfil_<data>_<hora>)")
+
+
+def enable_from_args(args):
+    if args.perfil is not None:
+        enable(args.perfil or default_output_dir())
+
+
+def profiled(name):
+    """Marca um método/função como fase do perfil.
+
+    O nome pode usar os argumentos da chamada por posição, como em
+    "show_section {1}" (0 é o self).
+    """
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if session is None:
+                return func(*args, **kwargs)
+            return session.run(name.format(*args), func, *args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def mark_ready(root, name):
+    """Registra quando a janela fica pronta (primeira volta ociosa do Tk)"""
+    if session is not None:
+        root.after_idle(lambda: session.mark(name))
@@ -0,0 +1,198 @@
+"""Cache de resultados de consultas, por conexão.
+
+As telas repetem as mesmas leituras a cada troca de seção: a primeira
+página da tabela, os números do painel, o registro aberto para edição.
+Com um QueryCache ligado à conexão (database.connect(..., cached=True)),
+essas leituras guardam o resultado sob (tabelas, instrução, parâmetros)
+e a repetição não vai ao banco.
+
+Antes de cada leitura o cache confere se o banco mudou: PRAGMA
+data_version muda quando outra conexão grava, e total_changes quando a
+própria conexão grava. Só então as entradas novas do registro de alterações
+(change_log.py) dizem quais tabelas mudaram, e apenas os resultados delas
+são descartados; com mudanças demais, ou com gravações (de qualquer
+conexão) que não passaram pelo registro, o cache inteiro é descartado.
+O tamanho é limitado em bytes (estimados); ao passar do limite saem os
+resultados usados há mais tempo.
+
+Sem cache ligado, as funções daqui simplesmente consultam o banco.
+"""
+import sqlite3
+import sys
+import weakref
+from collections import OrderedDict
+
+from change_log import MAX_DELTA, last_seq
+
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+
+_caches = weakref.WeakSet()     # Caches vivos (para o painel de diagnóstico)
+
+
+def estimate_size(value):
+    """Bytes aproximados de um resultado (linhas, dicts e valores simples)"""
+    size = sys.getsizeof(value)
+    if isinstance(value, (list, tuple)):
+        size += sum(estimate_size(item) for item in value)
+    elif isinstance(value, dict):
+        size += sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    return size
+
+
+class QueryCache:
+    """Resultados recentes de uma conexão, em ordem de uso (LRU)"""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()    # chave -> (resultado, bytes, tabelas)
+        self.by_table = {}              # tabela -> {chaves}
+        self.size = 0
+        self.state = None               # (data_version, total_changes) da última conferência
+        self.seq = None                 # Última alteração registrada já considerada
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        _caches.add(self)
+
+    def sync(self, conn):
+        """Descarta os resultados das tabelas alteradas desde a última conferência"""
+        state = (conn.execute("PRAGMA data_version").fetchone()[0], conn.total_changes)
+        if state == self.state:
+            return
+        try:
+            seq = last_seq(conn)
+            if self.seq is None or not self.entries or seq < self.seq:
+                # Sem referência, ou registro recriado/restaurado: nada garante o que mudou
+                self.clear()
+            elif seq == self.seq:
+                # Gravação (desta ou de outra conexão) que não passou pelo
+                # registro, ex.: reconstrução dos contadores ou dos resumos:
+                # não se sabe o que mudou
+                self.clear()
+            else:
+                # Só as entradas novas, pela chave (seq é o rowid)
+                rows = conn.execute("SELECT tabela FROM alteracoes WHERE seq > ? ORDER BY seq LIMIT ?",
+                                    (self.seq, MAX_DELTA + 1)).fetchall()
+                if len(rows) > MAX_DELTA:
+                    self.clear()
+                else:
+                    for table_name in {table_name for (table_name,) in rows}:
+                        self.invalidate(table_name)
+        except sqlite3.OperationalError:
+            # Banco ainda sem o registro de alterações (antes da migração)
+            seq = None
+            self.clear()
+        self.state = state
+        self.seq = seq
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key, tables, result):
+        size = estimate_size(result)
+        if size > self.max_bytes // 4:
+            return      # Resultado grande demais: não vale expulsar o resto
+        self.discard(key)
+        self.entries[key] = (result, size, tables)
+        self.size += size
+        for table_name in tables:
+            self.by_table.setdefault(table_name, set()).add(key)
+
+        while self.size > self.max_bytes and self.entries:
+            self.discard(next(iter(self.entries)))
+            self.evictions += 1
+
+    def discard(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+        _, size, tables = entry
+        self.size -= size
+        for table_name in tables:
+            keys = self.by_table.get(table_name)
+            if keys is not None:
+                keys.discard(key)
+
+    def invalidate(self, table_name):
+        """Descarta os resultados que dependem da tabela"""
+        keys = self.by_table.pop(table_name, None)
+        if keys:
+            self.invalidations += 1
+            for key in keys:
+                self.discard(key)
+
+    def clear(self):
+        if self.entries:
+            self.invalidations += 1
+        self.entries.clear()
+        self.by_table.clear()
+        self.size = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            'entries': len(self.entries),
+            'bytes': self.size,
+            'max_bytes': self.max_bytes,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+        }
+
+    def reset_stats(self):
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+
+
+def cached(conn, tables, key, compute):
+    """Resultado de compute() guardado sob key; tables são as tabelas lidas.
+
+    Listas voltam copiadas, pois quem chama pode alterá-las (a janela da
+    VirtualTable cresce e encolhe sobre a lista recebida).
+    """
+    cache = getattr(conn, 'query_cache', None)
+    if cache is None:
+        return compute()
+    cache.sync(conn)
+    tables = tuple(tables)
+    key = (tables, key)
+    entry = cache.get(key)
+    if entry is None:
+        result = compute()
+        cache.put(key, tables, list(result) if isinstance(result, list) else result)
+        return result
+    result = entry[0]
+    return list(result) if isinstance(result, list) else result
+
+
+def fetchall(conn, table_name, sql, params=()):
+    """conn.execute(sql, params).fetchall(), pelo cache quando há um"""
+    params = tuple(params)
+    return cached(conn, (table_name,), (sql, params),
+                  lambda: conn.execute(sql, params).fetchall())
+
+
+def snapshot():
+    """Estatísticas somadas de todos os caches vivos neste processo"""
+    totals = {'hits': 0, 'misses': 0, 'entries': 0, 'bytes': 0, 'max_bytes': 0,
+              'evictions': 0, 'invalidations': 0}
+    for cache in list(_caches):
+        for name, value in cache.stats().items():
+            if name in totals:
+                totals[name] += value
+    lookups = totals['hits'] + totals['misses']
+    totals['hit_rate'] = round(totals['hits'] / lookups, 3) if lookups else 0.0
+    return totals
+
+
+def reset_stats():
+    for cache in list(_caches):
+        cache.reset_stats()
@@ -0,0 +1,256 @@
+"""Relatórios pré-agregados para a coordenação.
+
+Cada relatório do catálogo (REPORTS) agrupa uma tabela por uma ou duas
+expressões e guarda, em 'resumos', a quantidade de registros e a soma de
+uma medida por grupo. Triggers mantêm os resumos a cada inclusão,
+alteração e exclusão, do mesmo jeito que os contadores (counters.py):
+ler um relatório custa o número de grupos, não o tamanho da tabela.
+
+Uso: python reports.py [--relatorio NOME] [--csv PASTA] [--reconstruir] [--db BANCO]
+"""
+import argparse
+import os
+
+import database
+import query_cache
+
+NOT_INFORMED = "(não informado)"
+
+# Faixas etárias dos beneficiários (o texto ordena na ordem das faixas)
+AGE_BAND = '''CASE
+    WHEN {row}.idade IS NULL THEN ''
+    WHEN {row}.idade < 6 THEN '00-05'
+    WHEN {row}.idade < 12 THEN '06-11'
+    WHEN {row}.idade < 18 THEN '12-17'
+    WHEN {row}.idade < 60 THEN '18-59'
+    ELSE '60+' END'''
+
+# Mês (AAAA-MM) de uma data DD/MM/AAAA (resumos da migração 8)
+MONTH = '''CASE WHEN {row}.data_atividade LIKE '__/__/____'
+    THEN substr({row}.data_atividade, 7, 4) || '-' || substr({row}.data_atividade, 4, 2)
+    ELSE '' END'''
+
+# Mês (AAAA-MM) de uma data ISO (datas em ISO desde a migração 9)
+ISO_MONTH = '''CASE WHEN {row}.data_atividade LIKE '____-__-__'
+    THEN substr({row}.data_atividade, 1, 7) ELSE '' END'''
+
+
+def month_label(value):
+    """AAAA-MM -> MM/AAAA"""
+    return f"{value[5:]}/{value[:4]}" if value else NOT_INFORMED
+
+
+class Report:
+    """Um relatório do catálogo.
+
+    groups: [(rótulo, expressão[, formatação])], com {row} no lugar da
+    linha (new/old nos triggers, a tabela na reconstrução). total: medida
+    somada (rótulo, expressão) ou None. lookup: (tabela, coluna) que dá o
+    nome do primeiro grupo quando ele é um id.
+    """
+
+    def __init__(self, title, table_name, columns, groups, total=None, lookup=None):
+        self.title = title
+        self.table_name = table_name
+        self.columns = columns          # Colunas lidas (UPDATE OF do trigger)
+        self.groups = groups
+        self.total = total
+        self.lookup = lookup
+
+    @property
+    def header(self):
+        header = [group[0] for group in self.groups] + ["Quantidade"]
+        if self.total:
+            header.append(self.total[0])
+        return header
+
+    def group_sql(self, row):
+        expressions = [f"COALESCE({group[1]}, '')".format(row=row) for group in self.groups]
+        return (expressions + ["''"])[:2]
+
+    def total_sql(self, row):
+        return f"IFNULL({self.total[1]}, 0)".format(row=row) if self.total else "0"
+
+
+def activities_by_month(month):
+    """Relatório de atividades por mês e status, com a expressão do mês"""
+    return Report(
+        "📅 Atividades por mês e status", 'atividades', ['data_atividade', 'status', 'participantes'],
+        [("Mês", month, month_label), ("Status", "{row}.status")],
+        total=("Participantes", "{row}.participantes"))
+
+
+REPORTS = {
+    'beneficiarios_faixa_situacao': Report(
+        "👶 Beneficiários por faixa etária e situação", 'beneficiarios', ['idade', 'situacao'],
+        [("Faixa etária", AGE_BAND), ("Situação", "{row}.situacao")]),
+    'atividades_mes_status': activities_by_month(ISO_MONTH),
+    'participantes_projeto': Report(
+        "🎯 Participantes por projeto", 'atividades', ['projeto_id', 'participantes'],
+        [("Projeto", "{row}.projeto_id")],
+        total=("Participantes", "{row}.participantes"), lookup=('projetos', 'nome')),
+    'orcamento_status': Report(
+        "💰 Orçamento por status do projeto", 'projetos', ['status', 'orcamento'],
+        [("Status", "{row}.status")],
+        total=("Orçamento", "{row}.orcamento")),
+}
+
+
+def reported_tables(catalog=None):
+    return sorted({report.table_name for report in (catalog or REPORTS).values()})
+
+
+def insert_trigger(table_name):
+    """Nome do trigger que soma cada linha inserida aos resumos"""
+    return f"{table_name}_resumos_ai"
+
+
+def _bump(name, report, row, sign):
+    group1, group2 = report.group_sql(row)
+    return (f"INSERT INTO resumos (relatorio, grupo1, grupo2, quantidade, soma) "
+            f"VALUES ('{name}', {group1}, {group2}, {sign}1, {sign}{report.total_sql(row)}) "
+            f"ON CONFLICT (relatorio, grupo1, grupo2) DO UPDATE SET "
+            f"quantidade = quantidade + excluded.quantidade, soma = soma + excluded.soma;")
+
+
+def create_rollups(conn, catalog=None):
+    """Cria a tabela de resumos e os triggers que a mantêm, já calculada.
+
+    catalog: relatórios a manter (padrão REPORTS; as migrações passam o
+    catálogo da época do passo).
+    """
+    catalog = catalog or REPORTS
+    cursor = conn.cursor()
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS resumos (
+            relatorio TEXT NOT NULL,
+            grupo1 NOT NULL,
+            grupo2 NOT NULL,
+            quantidade INTEGER NOT NULL DEFAULT 0,
+            soma REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (relatorio, grupo1, grupo2)
+        ) WITHOUT ROWID
+    ''')
+
+    for table_name in reported_tables(catalog):
+        reports = [(name, report) for name, report in catalog.items() if report.table_name == table_name]
+        columns = sorted({column for _, report in reports for column in report.columns})
+        on_insert = ' '.join(_bump(name, report, 'new', '+') for name, report in reports)
+        on_delete = ' '.join(_bump(name, report, 'old', '-') for name, report in reports)
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {insert_trigger(table_name)}
+            AFTER INSERT ON {table_name} BEGIN {on_insert} END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {table_name}_resumos_au
+            AFTER UPDATE OF {', '.join(columns)} ON {table_name} BEGIN {on_delete} {on_insert} END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {table_name}_resumos_ad
+            AFTER DELETE ON {table_name} BEGIN {on_delete} END
+        ''')
+
+    rebuild_rollups(conn, commit=False, catalog=catalog)
+
+
+def add_new_rows(conn, table_name, after_id, catalog=None):
+    """Soma aos resumos as linhas com id > after_id (importação em lote)"""
+    for name, report in (catalog or REPORTS).items():
+        if report.table_name != table_name:
+            continue
+        group1, group2 = report.group_sql(table_name)
+        conn.execute(f'''
+            INSERT INTO resumos (relatorio, grupo1, grupo2, quantidade, soma)
+            SELECT '{name}', {group1}, {group2}, COUNT(*), TOTAL({report.total_sql(table_name)})
+            FROM {table_name} WHERE id > ? GROUP BY 2, 3
+            ON CONFLICT (relatorio, grupo1, grupo2) DO UPDATE SET
+                quantidade = quantidade + excluded.quantidade, soma = soma + excluded.soma
+        ''', (after_id,))
+
+
+def rebuild_rollups(conn, commit=True, catalog=None):
+    """Recalcula todos os resumos a partir das tabelas (recuperação de divergências)"""
+    conn.execute("DELETE FROM resumos")
+    for table_name in reported_tables(catalog):
+        add_new_rows(conn, table_name, 0, catalog)
+    if commit:
+        conn.commit()
+
+
+def run_report(conn, name):
+    """(cabeçalho, linhas) do relatório, já com os rótulos dos grupos"""
+    report = REPORTS[name]
+    if report.lookup:
+        lookup_table, lookup_column = report.lookup
+        sql = f'''
+            SELECT COALESCE(l.{lookup_column}, r.grupo1), r.grupo2, r.quantidade, r.soma
+            FROM resumos r LEFT JOIN {lookup_table} l ON l.id = r.grupo1
+            WHERE r.relatorio = ? AND r.quantidade <> 0
+            ORDER BY r.grupo1, r.grupo2
+        '''
+        tables = (report.table_name, lookup_table)
+    else:
+        sql = '''
+            SELECT grupo1, grupo2, quantidade, soma FROM resumos
+            WHERE relatorio = ? AND quantidade <> 0
+            ORDER BY grupo1, grupo2
+        '''
+        tables = (report.table_name,)
+    rows = query_cache.cached(conn, tables, ('relatorio', name),
+                              lambda: conn.execute(sql, (name,)).fetchall())
+
+    result = []
+    for group1, group2, quantity, total in rows:
+        values = []
+        for group, value in zip(report.groups, (group1, group2)):
+            if len(group) > 2:
+                values.append(group[2](value))
+            else:
+                values.append(value if value != '' else NOT_INFORMED)
+        values.append(quantity)
+        if report.total:
+            total = round(total, 2)
+            values.append(int(total) if total.is_integer() else total)
+        result.append(tuple(values))
+    return report.header, result
+
+
+def export_csv(conn, name, path):
+    """Grava o relatório em CSV (';' e BOM, como a exportação das tabelas)"""
+    from bulk_export import CsvWriter
+    header, rows = run_report(conn, name)
+    writer = CsvWriter(path, header)
+    try:
+        for row in rows:
+            writer.write(row)
+    finally:
+        writer.close()
+    return len(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Relatórios do Criança Esperança")
+    parser.add_argument("--relatorio", choices=sorted(REPORTS), help="só este relatório")
+    parser.add_argument("--csv", metavar="PASTA", help="grava cada relatório em PASTA/<nome>.csv")
+    parser.add_argument("--reconstruir", action="store_true", help="recalcula os resumos antes")
+    parser.add_argument("--db", default=database.DB_PATH, help="arquivo do banco")
+    args = parser.parse_args()
+
+    conn = database.connect(args.db)
+    if args.reconstruir:
+        rebuild_rollups(conn)
+        print("🔄 Resumos recalculados a partir das tabelas")
+
+    for name in [args.relatorio] if args.relatorio else REPORTS:
+        if args.csv:
+            os.makedirs(args.csv, exist_ok=True)
+            path = os.path.join(args.csv, f"{name}.csv")
+            count = export_csv(conn, name, path)
+            print(f"💾 {REPORTS[name].title}: {count} linha(s) em {path}")
+            continue
+        header, rows = run_report(conn, name)
+        print(f"\n{REPORTS[name].title}")
+        print(' | '.join(header))
+        for row in rows:
+            print(' | '.join(str(value) for value in row))
+    database.close(conn)
@@ -0,0 +1,142 @@
+import unicodedata
+from collections import OrderedDict
+
+from search_index import search_words
+
+
+def normalize_text(text):
+    """Minúsculas e sem acentos, como o tokenizer unicode61 remove_diacritics"""
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+class SearchResult:
+    """Ids de um termo, em ordem de relevância.
+
+    Para resultados pequenos guarda também os tokens normalizados de cada
+    registro, o que permite estreitar a busca em memória quando o usuário
+    continua digitando o mesmo termo.
+    """
+
+    def __init__(self, ids, tokens=None):
+        self.ids = ids
+        self.tokens = tokens
+
+    @classmethod
+    def from_matches(cls, rows):
+        """Cria a partir de linhas (id, textos indexados...)"""
+        ids = [row[0] for row in rows]
+        tokens = {}
+        for row in rows:
+            text = ' '.join(value for value in row[1:] if value)
+            tokens[row[0]] = tuple(search_words(normalize_text(text)))
+        return cls(ids, tokens)
+
+    def narrow(self, words):
+        """Filtra para um termo mais longo (cada palavra é prefixo de algum token)"""
+        tokens = {}
+        ids = []
+        for record_id in self.ids:
+            record_tokens = self.tokens[record_id]
+            if all(any(t.startswith(w) for t in record_tokens) for w in words):
+                ids.append(record_id)
+                tokens[record_id] = record_tokens
+        return SearchResult(ids, tokens)
+
+
+class SearchCache:
+    """Cache LRU de buscas recentes: (tabela, termo) -> SearchResult"""
+
+    def __init__(self, max_entries=64, max_ids=200_000):
+        self.max_entries = max_entries
+        self.max_ids = max_ids
+        self.entries = OrderedDict()
+        self.total_ids = 0
+
+    @staticmethod
+    def key(term):
+        """Termo normalizado; '' quando não há o que pesquisar"""
+        return ' '.join(search_words(normalize_text(term)))
+
+    def get(self, table_name, key):
+        entry = self.entries.get((table_name, key))
+        if entry is not None:
+            self.entries.move_to_end((table_name, key))
+        return entry
+
+    def put(self, table_name, key, result):
+        old = self.entries.pop((table_name, key), None)
+        if old is not None:
+            self.total_ids -= len(old.ids)
+        self.entries[(table_name, key)] = result
+        self.total_ids += len(result.ids)
+
+        while self.entries and (len(self.entries) > self.max_entries
+                                or self.total_ids > self.max_ids):
+            _, evicted = self.entries.popitem(last=False)
+            self.total_ids -= len(evicted.ids)
+
+    def find_narrowable(self, table_name, key):
+        """Resultado do maior termo em cache do qual 'key' é continuação"""
+        best_key = None
+        for (table, cached_key), result in self.entries.items():
+            if (table == table_name and result.tokens is not None
+                    and key.startswith(cached_key)
+                    and (best_key is None or len(cached_key) > len(best_key))):
+                best_key = cached_key
+        if best_key is None:
+            return None
+        return self.get(table_name, best_key)
+
+    def invalidate(self, table_name):
+        """Descarta as buscas da tabela (após qualquer escrita)"""
+        for cache_key in [k for k in self.entries if k[0] == table_name]:
+            self.total_ids -= len(self.entries.pop(cache_key).ids)
+
+
+class IdListSource:
+    """Fonte paginada sobre uma lista de ids já ordenada (resultado em cache).
+
+    Cada linha é (id, valores..., posição); a chave é a posição na lista.
+    """
+
+    def __init__(self, table_name, columns, ids):
+        self.table_name = table_name
+        self.columns = list(columns)
+        self.ids = ids
+
+    def _rows(self, conn, start, stop):
+        chunk = self.ids[start:stop]
+        if not chunk:
+            return []
+        placeholders = ', '.join('?' for _ in chunk)
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT id, {', '.join(self.columns)} FROM {self.table_name} "
+                       f"WHERE id IN ({placeholders})", chunk)
+        by_id = {row[0]: row for row in cursor.fetchall()}
+        return [by_id[record_id] + (index,)
+                for index, record_id in enumerate(chunk, start)
+                if record_id in by_id]
+
+    def count(self, conn):
+        return len(self.ids)
+
+    def fetch_first(self, conn, limit):
+        return self._rows(conn, 0, limit)
+
+    def fetch_after(self, conn, row, limit):
+        start = row[-1] + 1
+        return self._rows(conn, start, start + limit)
+
+    def fetch_before(self, conn, row, limit):
+        stop = row[-1]
+        return self._rows(conn, max(0, stop - limit), stop)
+
+    def iter_rows(self, conn, batch_size=500):
+        """Todas as linhas na ordem da lista, em lotes de ids"""
+        for start in range(0, len(self.ids), batch_size):
+            yield from self._rows(conn, start, start + batch_size)
+
+    def fetch_from_offset(self, conn, offset, limit, from_end=False):
+        start = len(self.ids) - 1 - offset if from_end else offset
+        return self._rows(conn, max(0, start), max(0, start) + limit)
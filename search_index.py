@@ -0,0 +1,167 @@
+import re
+
+# Colunas de texto indexadas por tabela
+SEARCH_COLUMNS = {
+    'projetos': ['nome', 'descricao', 'status', 'responsavel'],
+    'voluntarios': ['nome', 'email', 'telefone', 'area_interesse', 'disponibilidade'],
+    'beneficiarios': ['nome', 'responsavel', 'telefone_responsavel', 'endereco', 'situacao'],
+    'atividades': ['titulo', 'descricao', 'local', 'status'],
+}
+
+TOKENIZER = "unicode61 remove_diacritics 2"
+
+
+def fts_table(table_name):
+    return f"{table_name}_fts"
+
+
+def insert_trigger(table_name):
+    """Nome do trigger que indexa cada linha inserida"""
+    return f"{fts_table(table_name)}_ai"
+
+
+def create_search_indexes(conn):
+    """Cria os índices FTS5 (conteúdo externo) e os triggers de sincronização.
+
+    Tabelas que já existiam antes do índice são indexadas uma única vez
+    com o comando 'rebuild'.
+    """
+    cursor = conn.cursor()
+    for table_name, columns in SEARCH_COLUMNS.items():
+        fts = fts_table(table_name)
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (fts,))
+        if cursor.fetchone():
+            continue
+
+        cols = ', '.join(columns)
+        new_values = ', '.join(f"new.{c}" for c in columns)
+        old_values = ', '.join(f"old.{c}" for c in columns)
+
+        cursor.execute(f'''
+            CREATE VIRTUAL TABLE {fts} USING fts5(
+                {cols},
+                content='{table_name}', content_rowid='id',
+                tokenize='{TOKENIZER}', prefix='2 3'
+            )
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER {insert_trigger(table_name)} AFTER INSERT ON {table_name} BEGIN
+                INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_values});
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER {fts}_ad AFTER DELETE ON {table_name} BEGIN
+                INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_values});
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER {fts}_au AFTER UPDATE OF {cols} ON {table_name} BEGIN
+                INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_values});
+                INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_values});
+            END
+        ''')
+        cursor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def index_new_rows(conn, table_name, after_id):
+    """Indexa numa só instrução as linhas com id > after_id.
+
+    Usado pela importação em lote no lugar do trigger por linha, que é
+    bem mais lento para dezenas de milhares de inserções.
+    """
+    cols = ', '.join(SEARCH_COLUMNS[table_name])
+    conn.execute(f'''
+        INSERT INTO {fts_table(table_name)}(rowid, {cols})
+        SELECT id, {cols} FROM {table_name} WHERE id > ?
+    ''', (after_id,))
+
+
+def search_words(term):
+    """Palavras pesquisáveis do texto digitado"""
+    return re.findall(r"\w+", term, re.UNICODE)
+
+
+def build_match_query(term):
+    """Converte o texto digitado numa expressão MATCH com prefixo por palavra.
+
+    'joão sil' -> '"joão"* "sil"*' (todas as palavras, em qualquer coluna).
+    Retorna None se não sobrar nenhuma palavra pesquisável.
+    """
+    words = search_words(term)
+    if not words:
+        return None
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def fetch_ranked_matches(conn, table_name, match, limit):
+    """Até 'limit' resultados (id, textos indexados...) ordenados por bm25"""
+    fts = fts_table(table_name)
+    cols = ', '.join(SEARCH_COLUMNS[table_name])
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT rowid, {cols} FROM {fts} WHERE {fts} MATCH ? ORDER BY rank LIMIT ?",
+                   (match, limit))
+    return cursor.fetchall()
+
+
+class FtsSource:
+    """Resultado de busca ordenado por relevância (bm25), paginado por chave.
+
+    Cada linha é (id, valores..., rank); a chave de paginação é (rank, id).
+    """
+
+    def __init__(self, table_name, columns, match):
+        self.table_name = table_name
+        self.columns = list(columns)
+        self.match = match
+        self.fts = fts_table(table_name)
+
+    def _query(self, conn, condition, condition_params, descending, limit, offset=0):
+        cols = ', '.join(f"t.{c}" for c in self.columns)
+        order = "DESC" if descending else "ASC"
+        sql = (f"SELECT t.id, {cols}, f.rank FROM {self.fts} f "
+               f"JOIN {self.table_name} t ON t.id = f.rowid "
+               f"WHERE {self.fts} MATCH ?")
+        if condition:
+            sql += f" AND ({condition})"
+        sql += f" ORDER BY f.rank {order}, f.rowid {order} LIMIT ? OFFSET ?"
+
+        cursor = conn.cursor()
+        cursor.execute(sql, (self.match,) + tuple(condition_params) + (limit, offset))
+        return cursor.fetchall()
+
+    def count(self, conn):
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT COUNT(*) FROM {self.fts} WHERE {self.fts} MATCH ?", (self.match,))
+        return cursor.fetchone()[0]
+
+    def fetch_first(self, conn, limit):
+        return self._query(conn, None, (), False, limit)
+
+    def fetch_after(self, conn, row, limit):
+        rank, row_id = row[-1], row[0]
+        return self._query(conn, "f.rank > ? OR (f.rank = ? AND f.rowid > ?)",
+                           (rank, rank, row_id), False, limit)
+
+    def fetch_before(self, conn, row, limit):
+        rank, row_id = row[-1], row[0]
+        rows = self._query(conn, "f.rank < ? OR (f.rank = ? AND f.rowid < ?)",
+                           (rank, rank, row_id), True, limit)
+        rows.reverse()
+        return rows
+
+    def iter_rows(self, conn):
+        """Todo o resultado em ordem de relevância, lido do cursor sob demanda"""
+        cols = ', '.join(f"t.{c}" for c in self.columns)
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT t.id, {cols} FROM {self.fts} f "
+                       f"JOIN {self.table_name} t ON t.id = f.rowid "
+                       f"WHERE {self.fts} MATCH ? ORDER BY f.rank, f.rowid", (self.match,))
+        yield from cursor
+
+    def fetch_from_offset(self, conn, offset, limit, from_end=False):
+        boundary = self._query(conn, None, (), from_end, 1, offset)
+        if not boundary:
+            return []
+        rank, row_id = boundary[0][-1], boundary[0][0]
+        return self._query(conn, "f.rank > ? OR (f.rank = ? AND f.rowid >= ?)",
+                           (rank, rank, row_id), False, limit)
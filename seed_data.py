@@ -0,0 +1,294 @@
+"""Gerador de dados sintéticos para medições.
+
+Preenche as cinco tabelas com nomes, datas e situações plausíveis. A
+mesma semente e escala sempre produzem o mesmo banco, então medições de
+máquinas ou versões diferentes são comparáveis. Cada tabela é gravada
+como carga em lote (bulk_load), como na importação: um commit por lote,
+com índice de busca, contadores e resumos atualizados de uma vez por lote.
+
+Uso: python seed_data.py --escala 100k [--semente 42] [--db BANCO] [--novo]
+"""
+import argparse
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+import database
+
+from bulk_import import CHUNK_SIZE, bulk_load
+from migrations import migrate
+from services import TABLE_FIELDS, UserRepository
+
+SCALES = {'10k': 10_000, '100k': 100_000, '1m': 1_000_000}
+DEFAULT_SEED = 42
+
+# Senha de todos os usuários gerados (usuário 'admin' incluso)
+SEED_PASSWORD = "senha123"
+
+FIRST_NAMES = [
+    "Ana", "Maria", "Francisca", "Antônia", "Adriana", "Juliana", "Márcia", "Fernanda",
+    "Patrícia", "Aline", "Sandra", "Camila", "Letícia", "Beatriz", "Larissa", "Gabriela",
+    "José", "João", "Antônio", "Francisco", "Carlos", "Paulo", "Pedro", "Lucas", "Luiz",
+    "Marcos", "Luís", "Gabriel", "Rafael", "Daniel", "Marcelo", "Bruno", "Eduardo",
+    "Felipe", "Raimundo", "Rodrigo", "Thiago", "Matheus", "Heitor", "Enzo", "Davi",
+    "Helena", "Alice", "Laura", "Manuela", "Valentina", "Sophia", "Isabella", "Heloísa",
+]
+LAST_NAMES = [
+    "Silva", "Santos", "Oliveira", "Souza", "Rodrigues", "Ferreira", "Alves", "Pereira",
+    "Lima", "Gomes", "Costa", "Ribeiro", "Martins", "Carvalho", "Almeida", "Lopes",
+    "Soares", "Fernandes", "Vieira", "Barbosa", "Rocha", "Dias", "Nascimento", "Andrade",
+    "Moreira", "Nunes", "Marques", "Machado", "Mendes", "Freitas", "Cardoso", "Ramos",
+    "Gonçalves", "Santana", "Teixeira", "Araújo", "Conceição", "Monteiro", "Moura",
+]
+STREETS = [
+    "Rua das Flores", "Rua São João", "Avenida Brasil", "Rua Sete de Setembro",
+    "Rua XV de Novembro", "Travessa da Paz", "Rua Dom Pedro II", "Avenida Getúlio Vargas",
+    "Rua Tiradentes", "Rua Santa Luzia", "Rua da Esperança", "Avenida das Palmeiras",
+]
+NEIGHBORHOODS = [
+    "Centro", "Vila Nova", "Jardim América", "Boa Vista", "São José", "Santa Cruz",
+    "Liberdade", "Bela Vista", "Primavera", "Nova Esperança", "Morro Alto", "Cidade Nova",
+]
+INTEREST_AREAS = [
+    "Educação", "Esportes", "Saúde", "Música", "Artes", "Reforço escolar",
+    "Alimentação", "Informática", "Leitura", "Meio ambiente", "Eventos", "Administração",
+]
+AVAILABILITY = [
+    "Manhãs", "Tardes", "Noites", "Fins de semana", "Segunda a sexta",
+    "Sábados", "Domingos", "Terças e quintas", "Flexível",
+]
+SITUATIONS = ["Ativo", "Ativo", "Ativo", "Em acompanhamento", "Aguardando vaga", "Inativo"]
+PROJECT_THEMES = [
+    "Horta Comunitária", "Reforço Escolar", "Futebol Cidadão", "Coral Infantil",
+    "Leitura em Família", "Inclusão Digital", "Capoeira", "Teatro Jovem", "Natal Solidário",
+    "Cozinha Escola", "Robótica", "Dança", "Xadrez na Escola", "Pequenos Cientistas",
+]
+ACTIVITY_TYPES = [
+    "Oficina de", "Aula de", "Encontro de", "Mutirão de", "Apresentação de",
+    "Roda de conversa sobre", "Passeio de", "Campeonato de", "Feira de",
+]
+ACTIVITY_SUBJECTS = [
+    "pintura", "leitura", "música", "futebol", "culinária", "reciclagem", "informática",
+    "matemática", "teatro", "jardinagem", "xadrez", "dança", "ciências", "artesanato",
+]
+PLACES = [
+    "Sede", "Quadra do bairro", "Escola Municipal", "Praça Central", "Biblioteca",
+    "Salão paroquial", "Centro comunitário", "Parque Municipal", "Ginásio",
+]
+
+FIRST_DAY = datetime(2018, 1, 1)
+DAYS = (datetime(2025, 12, 31) - FIRST_DAY).days
+
+
+def table_sizes(rows):
+    """Linhas por tabela para uma escala (as cadastrais recebem a escala inteira)"""
+    return {
+        'usuarios': max(5, rows // 1000),
+        'projetos': max(20, rows // 100),
+        'voluntarios': rows,
+        'beneficiarios': rows,
+        'atividades': rows,
+    }
+
+
+def parse_scale(text):
+    """'100k', '1m' ou um número de linhas"""
+    key = text.strip().lower()
+    if key in SCALES:
+        return SCALES[key]
+    return int(key.replace('_', ''))
+
+
+def _person(rng):
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+
+def _phone(rng):
+    return f"({rng.randint(11, 99)}) 9{rng.randint(1000, 9999)}-{rng.randint(0, 9999):04d}"
+
+
+def _date(rng):
+    return (FIRST_DAY + timedelta(days=rng.randrange(DAYS))).strftime('%Y-%m-%d')
+
+
+def _created(number, total):
+    """Data de criação crescente com o id, espalhada pelo período"""
+    moment = FIRST_DAY + timedelta(seconds=number * (DAYS * 86400 // max(total, 1)))
+    return moment.strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _options(table_name, column):
+    field = next(field for field in TABLE_FIELDS[table_name] if field[1] == column)
+    return field[4]
+
+
+def generate_usuarios(rng, total):
+    password = UserRepository.hash_password(SEED_PASSWORD)
+    yield ("admin", password, "Administrador", "admin@criancaesperanca.org")
+    for number in range(1, total):
+        name = _person(rng)
+        username = f"usuario{number:05d}"
+        yield (username, password, name, f"{username}@criancaesperanca.org")
+
+
+def generate_projetos(rng, total):
+    statuses = _options('projetos', 'status')
+    for number in range(total):
+        start = FIRST_DAY + timedelta(days=rng.randrange(DAYS))
+        end = start + timedelta(days=rng.randint(30, 720))
+        yield (
+            f"{rng.choice(PROJECT_THEMES)} {rng.choice(NEIGHBORHOODS)} {number + 1}",
+            f"Projeto social voltado a {rng.choice(INTEREST_AREAS).lower()} "
+            f"para crianças do bairro {rng.choice(NEIGHBORHOODS)}.",
+            start.strftime('%Y-%m-%d'),
+            end.strftime('%Y-%m-%d') if rng.random() < 0.8 else None,
+            rng.choices(statuses, weights=(6, 1, 3))[0],
+            _person(rng),
+            round(rng.uniform(500, 250_000), 2),
+            _created(number, total),
+        )
+
+
+def generate_voluntarios(rng, total):
+    for number in range(total):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        yield (
+            f"{first} {rng.choice(LAST_NAMES)} {last}",
+            f"{first.lower()}.{last.lower()}{number}@exemplo.com.br" if rng.random() < 0.9 else None,
+            _phone(rng),
+            rng.choice(INTEREST_AREAS),
+            rng.choice(AVAILABILITY),
+            _created(number, total),
+        )
+
+
+def generate_beneficiarios(rng, total):
+    for number in range(total):
+        yield (
+            f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {rng.choice(LAST_NAMES)}",
+            rng.randint(0, 17),
+            _person(rng),
+            _phone(rng),
+            f"{rng.choice(STREETS)}, {rng.randint(1, 2000)} - {rng.choice(NEIGHBORHOODS)}",
+            rng.choice(SITUATIONS),
+            _created(number, total),
+        )
+
+
+def generate_atividades(rng, total, projects):
+    statuses = _options('atividades', 'status')
+    for number in range(total):
+        subject = rng.choice(ACTIVITY_SUBJECTS)
+        yield (
+            f"{rng.choice(ACTIVITY_TYPES)} {subject}",
+            f"Atividade de {subject} com as crianças atendidas." if rng.random() < 0.7 else None,
+            rng.randint(1, projects),
+            _date(rng),
+            rng.choice(PLACES),
+            rng.randint(0, 120),
+            rng.choices(statuses, weights=(2, 1, 6, 1))[0],
+            _created(number, total),
+        )
+
+
+# Colunas gravadas por tabela (inclui as de data de criação, que as telas não editam)
+SEED_COLUMNS = {
+    'usuarios': ['username', 'password', 'nome_completo', 'email'],
+    'projetos': [f[1] for f in TABLE_FIELDS['projetos']] + ['data_criacao'],
+    'voluntarios': [f[1] for f in TABLE_FIELDS['voluntarios']] + ['data_cadastro'],
+    'beneficiarios': [f[1] for f in TABLE_FIELDS['beneficiarios']] + ['data_cadastro'],
+    'atividades': ['titulo', 'descricao', 'projeto_id', 'data_atividade', 'local',
+                   'participantes', 'status', 'data_criacao'],
+}
+
+
+def _write_table(conn, table_name, rows, chunk_size, progress):
+    columns = SEED_COLUMNS[table_name]
+    written = 0
+    batch = []
+    with bulk_load(conn, table_name, columns) as insert:
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= chunk_size:
+                insert(batch)
+                written += len(batch)
+                batch = []
+                if progress:
+                    progress(table_name, written)
+        if batch:
+            insert(batch)
+            written += len(batch)
+    if progress:
+        progress(table_name, written)
+    return written
+
+
+def seed(conn, rows, seed_value=DEFAULT_SEED, chunk_size=CHUNK_SIZE, progress=None):
+    """Preenche as tabelas (vazias) para a escala indicada.
+
+    Cada tabela usa o seu próprio gerador derivado da semente, então o
+    conteúdo de uma não depende do tamanho das outras.
+    """
+    migrate(conn)
+    if conn.in_transaction:
+        conn.commit()
+
+    sizes = table_sizes(rows)
+    for table_name in sizes:
+        if conn.execute(f"SELECT 1 FROM {table_name} LIMIT 1").fetchone():
+            raise ValueError(f"A tabela {table_name} já tem dados (use um banco novo)")
+
+    generators = {
+        'usuarios': generate_usuarios,
+        'projetos': generate_projetos,
+        'voluntarios': generate_voluntarios,
+        'beneficiarios': generate_beneficiarios,
+    }
+    written = {}
+    for table_name, generate in generators.items():
+        rng = random.Random(f"{seed_value}:{table_name}")
+        written[table_name] = _write_table(conn, table_name, generate(rng, sizes[table_name]),
+                                           chunk_size, progress)
+
+    rng = random.Random(f"{seed_value}:atividades")
+    written['atividades'] = _write_table(
+        conn, 'atividades', generate_atividades(rng, sizes['atividades'], sizes['projetos']),
+        chunk_size, progress)
+
+    conn.execute("ANALYZE")
+    conn.commit()
+    return written
+
+
+def remove_database(path):
+    """Apaga o arquivo do banco e os arquivos auxiliares do WAL"""
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Dados sintéticos do Criança Esperança")
+    parser.add_argument("--escala", default="10k", help="10k, 100k, 1m ou número de linhas")
+    parser.add_argument("--semente", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--db", default=database.DB_PATH, help="arquivo do banco")
+    parser.add_argument("--novo", action="store_true", help="apaga o banco antes de gerar")
+    args = parser.parse_args()
+
+    if args.novo:
+        remove_database(args.db)
+
+    def show_progress(table_name, written):
+        print(f"\r⏳ {table_name:15} {written:>10,}", end='', flush=True)
+
+    conn = database.connect(args.db, profile='benchmark')
+    started = time.perf_counter()
+    written = seed(conn, parse_scale(args.escala), args.semente, progress=show_progress)
+    elapsed = time.perf_counter() - started
+    database.close(conn)
+
+    print()
+    for table_name, total in written.items():
+        print(f"✅ {table_name:15} {total:>10,} linha(s)")
+    print(f"🌱 Banco {args.db} gerado em {elapsed:.1f}s (semente {args.semente})")
@@ -0,0 +1,412 @@
+"""Camada de dados sem interface gráfica.
+
+Toda a SQL de cadastro, busca, contagem e acesso fica aqui. As telas Tk,
+as ferramentas de linha de comando e as medições usam as mesmas
+operações. Cada operação recebe a conexão (conn) e roda na thread dona
+dela; nas telas, é a thread do DatabaseWorker.
+
+    services = Services(MemoryStorage())
+    conn = services.connect()
+    projetos = services.table('projetos')
+    record_id = projetos.insert(conn, {'nome': 'Horta', 'orcamento': '1.500,00'})
+"""
+import hashlib
+import itertools
+
+import database
+import query_cache
+
+from database import immediate, retry_on_busy
+
+from bulk_import import CHUNK_SIZE, REQUIRED_COLUMNS, RowError, coerce_value, insert_chunk
+from counters import COUNTED_TABLES, TOTAL_KEY, read_counters, status_count, table_count
+from migrations import prepare_database
+from search_index import FtsSource, build_match_query, fetch_ranked_matches, fts_table
+from virtual_table import KeysetSource, sort_key
+
+# Campos de cada tabela: (rótulo, coluna, tipo, largura[, opções])
+TABLE_FIELDS = {
+    'projetos': [
+        ("Nome", "nome", "text", 150),
+        ("Descrição", "descricao", "text", 200),
+        ("Data Início", "data_inicio", "date", 100),
+        ("Data Fim", "data_fim", "date", 100),
+        ("Status", "status", "combo", 80, ["Ativo", "Pausado", "Concluído"]),
+        ("Responsável", "responsavel", "text", 120),
+        ("Orçamento", "orcamento", "number", 100)
+    ],
+    'voluntarios': [
+        ("Nome", "nome", "text", 150),
+        ("Email", "email", "text", 200),
+        ("Telefone", "telefone", "text", 120),
+        ("Área de Interesse", "area_interesse", "text", 150),
+        ("Disponibilidade", "disponibilidade", "text", 150)
+    ],
+    'beneficiarios': [
+        ("Nome", "nome", "text", 150),
+        ("Idade", "idade", "number", 80),
+        ("Responsável", "responsavel", "text", 150),
+        ("Telefone Responsável", "telefone_responsavel", "text", 140),
+        ("Endereço", "endereco", "text", 200),
+        ("Situação", "situacao", "text", 120)
+    ],
+    'atividades': [
+        ("Título", "titulo", "text", 150),
+        ("Descrição", "descricao", "text", 200),
+        ("Data da Atividade", "data_atividade", "date", 120),
+        ("Local", "local", "text", 150),
+        ("Participantes", "participantes", "number", 100),
+        ("Status", "status", "combo", 120, ["Planejada", "Em Andamento", "Realizada", "Cancelada"])
+    ],
+}
+
+MIN_PASSWORD_LENGTH = 4
+
+
+class ConflictError(Exception):
+    """O registro mudou (ou foi excluído) desde que foi lido para edição.
+
+    current traz a linha como está agora (id, valores...) e version a sua
+    versão; ambos são None se o registro foi excluído.
+    """
+
+    def __init__(self, table_name, record_id, current, version):
+        if current is None:
+            message = f"O registro {record_id} de {table_name} foi excluído por outra pessoa"
+        else:
+            message = f"O registro {record_id} de {table_name} foi alterado por outra pessoa"
+        super().__init__(message)
+        self.table_name = table_name
+        self.record_id = record_id
+        self.current = current
+        self.version = version
+
+
+class TableRepository:
+    """Cadastro, contagem e busca de uma tabela.
+
+    A SQL é montada uma única vez por tabela e conjunto de campos; como o
+    texto das instruções nunca muda, o cache de instruções da conexão
+    (cached_statements) reaproveita as já compiladas. Os valores são
+    convertidos para o tipo de cada campo antes de gravar.
+
+    Toda alteração incrementa a coluna versao do registro. Quem edita a
+    partir de uma leitura (fetch_versioned) passa a versão lida para
+    update(), que só grava se ninguém alterou o registro nesse meio tempo.
+    As escritas reservam o banco no início (BEGIN IMMEDIATE) e são
+    repetidas se ele continuar ocupado por outro processo.
+    """
+
+    def __init__(self, table_name, fields):
+        self.table_name = table_name
+        self.fields = list(fields)
+        self.columns = [field[1] for field in self.fields]
+        self.by_column = {field[1]: field for field in self.fields}
+
+        columns = ', '.join(self.columns)
+        placeholders = ', '.join('?' for _ in self.columns)
+        assignments = ', '.join(f'{c} = ?' for c in self.columns)
+        self.sql_fetch = f"SELECT id, {columns} FROM {table_name} WHERE id = ?"
+        self.sql_fetch_versioned = f"SELECT id, {columns}, versao FROM {table_name} WHERE id = ?"
+        self.sql_insert = f"INSERT INTO {table_name} ({columns}) VALUES ({placeholders})"
+        self.sql_update = f"UPDATE {table_name} SET {assignments}, versao = versao + 1 WHERE id = ?"
+        self.sql_update_checked = (f"UPDATE {table_name} SET {assignments}, versao = versao + 1 "
+                                   f"WHERE id = ? AND versao = ?")
+        self.sql_delete = f"DELETE FROM {table_name} WHERE id = ?"
+        self.sql_update_field = {column: f"UPDATE {table_name} SET {column} = ?, versao = versao + 1 "
+                                         f"WHERE id = ?"
+                                 for column in self.columns}
+        self.sql_count = f"SELECT COUNT(*) FROM {table_name}"
+
+    def coerce(self, column, value):
+        """Valor de um campo convertido para o seu tipo (RowError se inválido)"""
+        field = self.by_column[column]
+        value = coerce_value(field, value)
+        if value is None and column in REQUIRED_COLUMNS:
+            raise RowError(f"{field[0]}: campo obrigatório vazio")
+        return value
+
+    def values(self, record):
+        """Tupla de valores na ordem dos campos a partir de um dict ou sequência"""
+        if isinstance(record, dict):
+            unknown = set(record) - set(self.columns)
+            if unknown:
+                raise RowError(f"Campos desconhecidos em {self.table_name}: {', '.join(sorted(unknown))}")
+            record = [record.get(column) for column in self.columns]
+        if len(record) != len(self.columns):
+            raise RowError(f"{self.table_name}: esperados {len(self.columns)} valores, "
+                           f"recebidos {len(record)}")
+        return tuple(self.coerce(column, value) for column, value in zip(self.columns, record))
+
+    def fetch(self, conn, record_id):
+        """Registro (id, valores...) ou None"""
+        rows = query_cache.fetchall(conn, self.table_name, self.sql_fetch, (record_id,))
+        return rows[0] if rows else None
+
+    def fetch_many(self, conn, record_ids):
+        """Registros (id, valores...) dos ids informados, em ordem de id"""
+        if not record_ids:
+            return []
+        placeholders = ', '.join('?' for _ in record_ids)
+        return conn.execute(f"SELECT id, {', '.join(self.columns)} FROM {self.table_name} "
+                            f"WHERE id IN ({placeholders}) ORDER BY id", tuple(record_ids)).fetchall()
+
+    def fetch_versioned(self, conn, record_id):
+        """(registro, versão) lidos juntos para edição; (None, None) se não existe"""
+        rows = query_cache.fetchall(conn, self.table_name, self.sql_fetch_versioned, (record_id,))
+        if not rows:
+            return None, None
+        return rows[0][:-1], rows[0][-1]
+
+    @retry_on_busy
+    def insert(self, conn, record):
+        """Insere um registro e retorna o id"""
+        values = self.values(record)
+        with immediate(conn):
+            cursor = conn.execute(self.sql_insert, values)
+        return cursor.lastrowid
+
+    def insert_many(self, conn, records):
+        """Insere vários registros numa única transação.
+
+        Até CHUNK_SIZE registros a gravação é linha a linha, com os
+        triggers, e as telas abertas recebem só a diferença; acima disso
+        vira uma carga em lote (bulk_import.insert_chunk), que relê as telas.
+        Registros inválidos ficam de fora; retorna (inseridos, [(posição, motivo)]).
+        """
+        rows = []
+        rejects = []
+        for index, record in enumerate(records):
+            try:
+                rows.append(self.values(record))
+            except RowError as e:
+                rejects.append((index, str(e)))
+        if rows:
+            self._insert_rows(conn, rows)
+        return len(rows), rejects
+
+    @retry_on_busy
+    def _insert_rows(self, conn, rows):
+        if len(rows) >= CHUNK_SIZE:
+            insert_chunk(conn, self.table_name, self.columns, rows)
+            return
+        with immediate(conn):
+            conn.executemany(self.sql_insert, rows)
+
+    @retry_on_busy
+    def update(self, conn, record_id, record, version=None):
+        """Grava o registro inteiro.
+
+        Com version (a versão lida para edição) a gravação só acontece se o
+        registro ainda estiver nessa versão; senão levanta ConflictError
+        com o registro atual. Retorna a nova versão quando version é dada.
+        """
+        values = self.values(record)
+        with immediate(conn):
+            if version is None:
+                conn.execute(self.sql_update, values + (record_id,))
+                return None
+            cursor = conn.execute(self.sql_update_checked, values + (record_id, version))
+            if cursor.rowcount == 0:
+                current, current_version = self.fetch_versioned(conn, record_id)
+                raise ConflictError(self.table_name, record_id, current, current_version)
+        return version + 1
+
+    @retry_on_busy
+    def delete(self, conn, record_ids):
+        """Exclui vários registros numa única transação; retorna quantos existiam"""
+        with immediate(conn):
+            cursor = conn.executemany(self.sql_delete, [(record_id,) for record_id in record_ids])
+        return cursor.rowcount
+
+    @retry_on_busy
+    def update_field(self, conn, column, value, record_ids):
+        """Mesmo valor numa coluna de vários registros, numa única transação;
+        retorna (valor convertido, quantos registros existiam)"""
+        value = self.coerce(column, value)
+        with immediate(conn):
+            cursor = conn.executemany(self.sql_update_field[column],
+                                      [(value, record_id) for record_id in record_ids])
+        return value, cursor.rowcount
+
+    def count(self, conn):
+        """Total de registros (O(1) pelos contadores)"""
+        if self.table_name in COUNTED_TABLES:
+            return table_count(conn, self.table_name)
+        return query_cache.fetchall(conn, self.table_name, self.sql_count)[0][0]
+
+    def order(self, columns):
+        """Ordenação [(expressão, decrescente)] a partir de nomes de coluna ('-' = decrescente)"""
+        order = []
+        for column in columns:
+            descending = column.startswith('-')
+            column = column.lstrip('-')
+            if column not in self.by_column:
+                raise RowError(f"Coluna desconhecida em {self.table_name}: {column}")
+            order.append((sort_key(self.by_column[column]), descending))
+        return order
+
+    def period_filter(self, period):
+        """Condição (sql, parâmetros) de um período (coluna, início, fim) em ISO.
+
+        Usa a mesma expressão do índice de ordenação da coluna, então o
+        filtro é uma faixa do índice e não uma varredura da tabela.
+        """
+        column, start, end = period
+        field = self.by_column.get(column)
+        if field is None or field[2] != 'date':
+            raise RowError(f"Coluna de data desconhecida em {self.table_name}: {column}")
+        return f"{sort_key(field)} BETWEEN ? AND ?", (start, end)
+
+    def source(self, order=None, period=None):
+        """Fonte paginada por chave da tabela inteira ou só do período.
+
+        Com período e sem ordenação, a lista vem na ordem da data filtrada.
+        """
+        if period is None:
+            return KeysetSource(self.table_name, self.columns, order=order)
+        where, params = self.period_filter(period)
+        return KeysetSource(self.table_name, self.columns, where=where, params=params,
+                            order=order or self.order([period[0]]))
+
+    def search_source(self, term, order=None, period=None):
+        """Fonte com o resultado da busca textual; None se não há o que buscar.
+
+        Sem ordenação nem período o resultado vem por relevância; com eles,
+        na ordem das colunas escolhidas (ou da data filtrada).
+        """
+        match = build_match_query(term)
+        if match is None:
+            return None
+        if not order and period is None:
+            return FtsSource(self.table_name, self.columns, match)
+        fts = fts_table(self.table_name)
+        where = f"id IN (SELECT rowid FROM {fts} WHERE {fts} MATCH ?)"
+        params = (match,)
+        if period is not None:
+            period_where, period_params = self.period_filter(period)
+            where = f"{where} AND {period_where}"
+            params += period_params
+            order = order or self.order([period[0]])
+        return KeysetSource(self.table_name, self.columns, where=where, params=params, order=order)
+
+    def ranked_matches(self, conn, match, limit):
+        """Até 'limit' resultados (id, textos indexados...) por relevância"""
+        return fetch_ranked_matches(conn, self.table_name, match, limit)
+
+
+class UserRepository:
+    """Cadastro e autenticação de usuários"""
+
+    SQL_FIND = "SELECT id, username, nome_completo FROM usuarios WHERE username = ? AND password = ?"
+    SQL_CREATE = "INSERT INTO usuarios (username, password, nome_completo, email) VALUES (?, ?, ?, ?)"
+
+    @staticmethod
+    def hash_password(password):
+        return hashlib.sha256(password.encode()).hexdigest()
+
+    def authenticate(self, conn, username, password):
+        """Dados do usuário {'id', 'username', 'nome'} ou None se as credenciais não conferem"""
+        row = conn.execute(self.SQL_FIND, (username, self.hash_password(password))).fetchone()
+        if row is None:
+            return None
+        user_id, username_db, nome_completo = row
+        return {'id': user_id, 'username': username_db, 'nome': nome_completo or username_db}
+
+    @retry_on_busy
+    def create(self, conn, username, password, nome_completo, email=None):
+        """Cadastra um usuário (sqlite3.IntegrityError se o nome já existe)"""
+        if len(password) < MIN_PASSWORD_LENGTH:
+            raise ValueError(f"Senha deve ter pelo menos {MIN_PASSWORD_LENGTH} caracteres")
+        with immediate(conn):
+            cursor = conn.execute(self.SQL_CREATE, (username, self.hash_password(password),
+                                                    nome_completo, email))
+        return cursor.lastrowid
+
+
+def dashboard_stats(conn):
+    """Números dos cards do painel, numa única leitura dos contadores"""
+    return query_cache.cached(conn, COUNTED_TABLES, 'dashboard_stats',
+                              lambda: _dashboard_stats(read_counters(conn)))
+
+
+def _dashboard_stats(counters):
+    return {
+        'projetos': status_count(counters, 'projetos', 'Ativo'),
+        'voluntarios': counters.get(('voluntarios', TOTAL_KEY), 0),
+        'beneficiarios': counters.get(('beneficiarios', TOTAL_KEY), 0),
+        'atividades': counters.get(('atividades', TOTAL_KEY), 0)
+    }
+
+
+def recent_activities(conn, limit=5):
+    """Últimas atividades cadastradas: (titulo, data_atividade, status)"""
+    return query_cache.fetchall(conn, 'atividades', '''
+        SELECT titulo, data_atividade, status
+        FROM atividades
+        ORDER BY data_criacao DESC
+        LIMIT ?
+    ''', (limit,))
+
+
+class FileStorage:
+    """Banco num arquivo (o da aplicação, por padrão)"""
+
+    def __init__(self, path=None, profile=None, traced=False, cached=False):
+        self.path = path or database.DB_PATH
+        self.profile = profile
+        self.traced = traced
+        self.cached = cached
+
+    def connect(self):
+        return database.connect(self.path, self.profile, traced=self.traced, cached=self.cached)
+
+    def close(self):
+        pass
+
+
+class MemoryStorage:
+    """Banco em memória, compartilhado pelas conexões deste processo.
+
+    Útil para medições e ferramentas que não devem tocar no arquivo. O
+    banco existe enquanto a conexão âncora estiver aberta (até close()).
+    """
+
+    _names = itertools.count(1)
+
+    def __init__(self, name=None, profile='benchmark', traced=False):
+        name = name or f"crianca_mem_{next(self._names)}"
+        self.uri = f"file:{name}?mode=memory&cache=shared"
+        self.profile = profile
+        self.traced = traced
+        self._anchor = self.connect()
+
+    def connect(self):
+        return database.connect(self.uri, self.profile, traced=self.traced, uri=True)
+
+    def close(self):
+        if self._anchor is not None:
+            self._anchor.close()
+            self._anchor = None
+
+
+class Services:
+    """Ponto de entrada da camada de dados: repositórios sobre um armazenamento"""
+
+    def __init__(self, storage=None):
+        self.storage = storage or FileStorage()
+        self.tables = {name: TableRepository(name, fields) for name, fields in TABLE_FIELDS.items()}
+        self.users = UserRepository()
+
+    def connect(self, migrate_schema=True):
+        """Nova conexão com o armazenamento, com o esquema em dia"""
+        conn = self.storage.connect()
+        if migrate_schema:
+            prepare_database(conn)
+        return conn
+
+    def table(self, table_name):
+        return self.tables[table_name]
+
+    def close(self):
+        self.storage.close()
@@ -0,0 +1,304 @@
+"""Instrumentação das consultas SQL.
+
+Conexões abertas com factory=TracedConnection (database.connect(...,
+traced=True)) registram cada instrução: texto normalizado, tempo gasto
+dentro do SQLite (execução e leitura das linhas) e linhas retornadas ou
+afetadas. Para cada instrução normalizada é mantido um histograma de
+latência. Instruções acima do limite vão para um log rotativo de
+consultas lentas.
+
+O limite e o arquivo podem ser trocados pelas variáveis de ambiente
+CRIANCA_SLOW_MS e CRIANCA_SLOW_LOG.
+"""
+import bisect
+import json
+import logging
+import logging.handlers
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+SLOW_QUERY_MS = float(os.environ.get('CRIANCA_SLOW_MS', 100))
+SLOW_LOG_PATH = os.environ.get('CRIANCA_SLOW_LOG', 'consultas_lentas.log')
+SLOW_LOG_BYTES = 1024 * 1024
+SLOW_LOG_BACKUPS = 5
+
+# Limites superiores das faixas do histograma (ms); a última é aberta
+BUCKETS_MS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?:e[+-]?\d+)?\b", re.I)
+_PARAM_LIST = re.compile(r"\bIN \(\?(?:, ?\?)+\)", re.I)
+_SPACES = re.compile(r"\s+")
+
+
+def normalize(sql):
+    """Texto da instrução sem literais nem espaços extras.
+
+    Listas de parâmetros de tamanho variável (id IN (?, ?, ?)) viram
+    'IN (?, ...)' para que todas caiam na mesma instrução.
+    """
+    text = _SPACES.sub(' ', sql).strip()
+    text = _STRING.sub('?', text)
+    text = _NUMBER.sub('?', text)
+    return _PARAM_LIST.sub('IN (?, ...)', text)
+
+
+class Histogram:
+    """Contagem de execuções por faixa de latência"""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+
+    def add(self, ms):
+        self.counts[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+
+    def percentile(self, fraction):
+        """Limite superior da faixa onde cai o percentil (estimativa)"""
+        total = sum(self.counts)
+        if not total:
+            return 0.0
+        target = fraction * total
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return BUCKETS_MS[index] if index < len(BUCKETS_MS) else float('inf')
+        return float('inf')
+
+    def labels(self):
+        """{'<=0.05': n, ..., '>5000': n} só com as faixas usadas"""
+        result = {}
+        for index, count in enumerate(self.counts):
+            if count:
+                label = f"<={BUCKETS_MS[index]}" if index < len(BUCKETS_MS) else f">{BUCKETS_MS[-1]}"
+                result[label] = count
+        return result
+
+
+class StatementStats:
+    """Totais de uma instrução normalizada"""
+
+    def __init__(self, statement):
+        self.statement = statement
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.slow = 0
+        self.histogram = Histogram()
+
+    def add(self, ms, rows, slow):
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        self.rows += rows
+        self.slow += slow
+        self.histogram.add(ms)
+
+    def percentile(self, fraction):
+        # A faixa dá só o limite superior; o máximo observado é um teto melhor
+        return min(self.histogram.percentile(fraction), round(self.max_ms, 3))
+
+    def as_dict(self):
+        return {
+            'statement': self.statement,
+            'count': self.count,
+            'total_ms': round(self.total_ms, 3),
+            'mean_ms': round(self.total_ms / self.count, 3) if self.count else 0.0,
+            'p50_ms': self.percentile(0.50),
+            'p95_ms': self.percentile(0.95),
+            'p99_ms': self.percentile(0.99),
+            'max_ms': round(self.max_ms, 3),
+            'rows': self.rows,
+            'slow': self.slow,
+            'histogram': self.histogram.labels(),
+        }
+
+
+class QueryRegistry:
+    """Estatísticas de todas as instruções do processo.
+
+    Gravado pela thread do banco e lido pela thread do Tk (painel de
+    diagnóstico), por isso protegido por um lock.
+    """
+
+    def __init__(self, slow_ms=SLOW_QUERY_MS, slow_log_path=SLOW_LOG_PATH):
+        self.slow_ms = slow_ms
+        self.slow_log_path = slow_log_path
+        self.started = datetime.now()
+        self.statements = {}
+        self._normalized = {}       # Texto original -> normalizado (os textos se repetem)
+        self._lock = threading.Lock()
+        self._slow_log = None
+
+    def _key(self, sql):
+        key = self._normalized.get(sql)
+        if key is None:
+            key = normalize(sql)
+            if len(self._normalized) < 10_000:
+                self._normalized[sql] = key
+        return key
+
+    def record(self, sql, seconds, rows):
+        ms = seconds * 1000
+        slow = ms >= self.slow_ms
+        with self._lock:
+            key = self._key(sql)
+            stats = self.statements.get(key)
+            if stats is None:
+                stats = self.statements[key] = StatementStats(key)
+            stats.add(ms, rows, slow)
+        if slow:
+            self.log_slow(key, ms, rows)
+
+    def log_slow(self, statement, ms, rows):
+        logger = self._slow_logger()
+        logger.warning("%.1f ms | %d linha(s) | %s", ms, rows, statement)
+
+    def _slow_logger(self):
+        if self._slow_log is None:
+            logger = logging.getLogger('crianca_esperanca.consultas_lentas')
+            logger.propagate = False
+            if not logger.handlers:
+                handler = logging.handlers.RotatingFileHandler(
+                    self.slow_log_path, maxBytes=SLOW_LOG_BYTES, backupCount=SLOW_LOG_BACKUPS,
+                    encoding='utf-8', delay=True)
+                handler.setFormatter(logging.Formatter("%(asctime)s %(threadName)s %(message)s"))
+                logger.addHandler(handler)
+            self._slow_log = logger
+        return self._slow_log
+
+    def snapshot(self):
+        """Estatísticas por instrução, da maior para a menor soma de tempo"""
+        with self._lock:
+            stats = [s.as_dict() for s in self.statements.values()]
+        stats.sort(key=lambda s: s['total_ms'], reverse=True)
+        return stats
+
+    def reset(self):
+        with self._lock:
+            self.statements.clear()
+            self.started = datetime.now()
+
+    def to_json(self):
+        return {
+            'since': self.started.isoformat(timespec='seconds'),
+            'generated': datetime.now().isoformat(timespec='seconds'),
+            'slow_ms': self.slow_ms,
+            'slow_log': os.path.abspath(self.slow_log_path),
+            'buckets_ms': list(BUCKETS_MS),
+            'statements': self.snapshot(),
+        }
+
+    def dump(self, path):
+        with open(path, 'w', encoding='utf-8') as handle:
+            json.dump(self.to_json(), handle, ensure_ascii=False, indent=2)
+
+
+registry = QueryRegistry()
+
+
+class TracedCursor(sqlite3.Cursor):
+    """Cursor que mede cada instrução até a última linha lida.
+
+    O tempo soma a execução e as leituras (fetch*/iteração), mas não o
+    intervalo entre elas; a instrução é registrada quando as linhas
+    acabam, quando o cursor executa outra coisa ou é descartado.
+    """
+
+    _pending = None     # [sql, segundos, linhas]
+
+    def _finish(self):
+        pending, self._pending = self._pending, None
+        if pending is not None:
+            registry.record(*pending)
+
+    def _start(self, sql, seconds):
+        if self.description is None:
+            # Escrita/DDL: não há linhas a ler, registra já com as afetadas
+            registry.record(sql, seconds, max(self.rowcount, 0))
+        else:
+            self._pending = [sql, seconds, 0]
+
+    def execute(self, sql, parameters=()):
+        self._finish()
+        started = time.perf_counter()
+        try:
+            super().execute(sql, parameters)
+        except Exception:
+            registry.record(sql, time.perf_counter() - started, 0)
+            raise
+        self._start(sql, time.perf_counter() - started)
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        self._finish()
+        started = time.perf_counter()
+        try:
+            super().executemany(sql, seq_of_parameters)
+        except Exception:
+            registry.record(sql, time.perf_counter() - started, 0)
+            raise
+        self._start(sql, time.perf_counter() - started)
+        return self
+
+    def _read(self, started, count, exhausted):
+        pending = self._pending
+        if pending is not None:
+            pending[1] += time.perf_counter() - started
+            pending[2] += count
+            if exhausted:
+                self._finish()
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._read(started, row is not None, row is None)
+        return row
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        size = self.arraysize if size is None else size
+        rows = super().fetchmany(size)
+        self._read(started, len(rows), len(rows) < size)
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self._read(started, len(rows), True)
+        return rows
+
+    def __next__(self):
+        started = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._read(started, 0, True)
+            raise
+        self._read(started, 1, False)
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        self._finish()
+
+
+class TracedConnection(sqlite3.Connection):
+    """Conexão cujos cursores (inclusive os de conn.execute) são medidos"""
+
+    def cursor(self, factory=TracedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
@@ -0,0 +1,228 @@
+"""Vigia de travamentos da interface (mainloop do Tk).
+
+Um callback de batimento, agendado com root.after, marca a hora de cada
+volta do mainloop. Uma thread vigia confere essa marca; se o mainloop
+ficar parado além do limite, ela captura a pilha Python da thread
+principal e o callback que estava rodando. Ao terminar o travamento, o
+evento vai para um log rotativo.
+
+Todos os callbacks do Tk (eventos, botões, after) passam a ser medidos,
+com um histograma de duração por função.
+
+O limite e o arquivo podem ser trocados pelas variáveis de ambiente
+CRIANCA_STALL_MS e CRIANCA_STALL_LOG.
+"""
+import logging
+import logging.handlers
+import os
+import sys
+import threading
+import time
+import tkinter
+import traceback
+from collections import deque
+from datetime import datetime, timedelta
+
+from sql_trace import BUCKETS_MS, Histogram
+
+STALL_MS = float(os.environ.get('CRIANCA_STALL_MS', 250))
+STALL_LOG_PATH = os.environ.get('CRIANCA_STALL_LOG', 'travamentos_ui.log')
+HEARTBEAT_MS = 50
+MAX_STACK_FRAMES = 30
+MAX_STALLS = 100            # Travamentos recentes mantidos em memória
+
+
+class HandlerStats:
+    """Duração das chamadas de um callback"""
+
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.histogram = Histogram()
+
+    def add(self, ms):
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        self.histogram.add(ms)
+
+    def as_dict(self):
+        return {
+            'handler': self.name,
+            'count': self.count,
+            'total_ms': round(self.total_ms, 3),
+            'mean_ms': round(self.total_ms / self.count, 3) if self.count else 0.0,
+            'p95_ms': min(self.histogram.percentile(0.95), round(self.max_ms, 3)),
+            'max_ms': round(self.max_ms, 3),
+            'histogram': self.histogram.labels(),
+        }
+
+
+# Estatísticas por callback; só a thread do Tk escreve
+handler_stats = {}
+current_handler = None      # Callback em execução (lido pela thread vigia)
+_original_call_wrapper = tkinter.CallWrapper
+_untimed = set()            # Funções fora das estatísticas (o próprio batimento)
+
+
+def handler_name(func):
+    """Nome legível do callback: Classe.método, função ou lambda com o local"""
+    # after() embrulha a função num 'callit'; o que interessa é a original
+    code = getattr(func, '__code__', None)
+    if code is not None and code.co_name == 'callit' and 'func' in code.co_freevars:
+        func = func.__closure__[code.co_freevars.index('func')].cell_contents
+
+    owner = getattr(func, '__self__', None)
+    name = getattr(func, '__qualname__', None) or type(func).__name__
+    if owner is not None and not isinstance(owner, type) and '.' not in name:
+        name = f"{type(owner).__name__}.{name}"
+    return name, getattr(func, '__func__', func)
+
+
+class TimedCallWrapper(_original_call_wrapper):
+    """CallWrapper do tkinter que mede cada chamada do callback"""
+
+    def __init__(self, func, subst, widget):
+        super().__init__(func, subst, widget)
+        self.name, target = handler_name(func)
+        self.timed = target not in _untimed
+
+    def __call__(self, *args):
+        global current_handler
+        if not self.timed:
+            return super().__call__(*args)
+
+        previous, current_handler = current_handler, self.name
+        started = time.perf_counter()
+        try:
+            return super().__call__(*args)
+        finally:
+            ms = (time.perf_counter() - started) * 1000
+            current_handler = previous
+            stats = handler_stats.get(self.name)
+            if stats is None:
+                stats = handler_stats[self.name] = HandlerStats(self.name)
+            stats.add(ms)
+
+
+def install_callback_timing():
+    """Passa a medir os callbacks registrados daqui em diante"""
+    tkinter.CallWrapper = TimedCallWrapper
+
+
+def handler_snapshot():
+    stats = [s.as_dict() for s in handler_stats.values()]
+    stats.sort(key=lambda s: s['total_ms'], reverse=True)
+    return stats
+
+
+class StallEvent:
+    """Um travamento: quando começou, quanto durou, onde estava"""
+
+    def __init__(self, started, handler, stack):
+        self.started = started
+        self.handler = handler
+        self.stack = stack
+        self.duration_ms = None     # Preenchido quando o mainloop volta
+
+    def as_dict(self):
+        return {
+            'started': self.started.isoformat(timespec='milliseconds'),
+            'duration_ms': round(self.duration_ms, 1) if self.duration_ms is not None else None,
+            'handler': self.handler,
+            'stack': self.stack,
+        }
+
+
+class StallWatchdog:
+    """Detecta travamentos do mainloop e guarda a pilha do momento"""
+
+    def __init__(self, root, threshold_ms=STALL_MS, interval_ms=HEARTBEAT_MS,
+                 log_path=STALL_LOG_PATH):
+        self.root = root
+        self.threshold_ms = threshold_ms
+        self.interval_ms = interval_ms
+        self.log_path = log_path
+        self.stalls = deque(maxlen=MAX_STALLS)
+        self.last_beat = time.perf_counter()
+        self._current = None        # Travamento em andamento
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._beat_job = None
+        self._main_thread = threading.main_thread().ident
+        self._thread = threading.Thread(target=self._watch, name="ui-watchdog", daemon=True)
+        self._logger = None
+
+    def start(self):
+        install_callback_timing()
+        self.last_beat = time.perf_counter()
+        self._beat_job = self.root.after(self.interval_ms, self._beat)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._beat_job is not None:
+            try:
+                self.root.after_cancel(self._beat_job)
+            except tkinter.TclError:
+                pass
+            self._beat_job = None
+
+    def _beat(self):
+        """Batimento na thread do Tk; encerra o travamento em andamento, se houver"""
+        now = time.perf_counter()
+        lag_ms = (now - self.last_beat) * 1000 - self.interval_ms
+        with self._lock:
+            self.last_beat = now
+            stall, self._current = self._current, None
+        if stall is not None:
+            stall.duration_ms = lag_ms
+            self._log(stall)
+        if not self._stop.is_set():
+            self._beat_job = self.root.after(self.interval_ms, self._beat)
+
+    def _watch(self):
+        """Thread vigia: percebe o mainloop parado e captura onde ele está"""
+        period = self.interval_ms / 2000
+        while not self._stop.wait(period):
+            with self._lock:
+                lag_ms = (time.perf_counter() - self.last_beat) * 1000 - self.interval_ms
+                if lag_ms < self.threshold_ms or self._current is not None:
+                    continue
+                frame = sys._current_frames().get(self._main_thread)
+                stack = traceback.format_stack(frame, limit=MAX_STACK_FRAMES) if frame else []
+                started = datetime.now() - timedelta(milliseconds=lag_ms)
+                stall = StallEvent(started, current_handler, ''.join(stack))
+                self._current = stall
+                self.stalls.append(stall)
+
+    def _log(self, stall):
+        if self._logger is None:
+            logger = logging.getLogger('crianca_esperanca.travamentos_ui')
+            logger.propagate = False
+            if not logger.handlers:
+                handler = logging.handlers.RotatingFileHandler(
+                    self.log_path, maxBytes=1024 * 1024, backupCount=5,
+                    encoding='utf-8', delay=True)
+                handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+                logger.addHandler(handler)
+            self._logger = logger
+        self._logger.warning("travamento de %.0f ms em %s\n%s",
+                             stall.duration_ms, stall.handler or "(fora de callback)", stall.stack)
+
+    def recent_stalls(self):
+        with self._lock:
+            return [stall.as_dict() for stall in reversed(self.stalls)]
+
+    def to_json(self):
+        return {
+            'threshold_ms': self.threshold_ms,
+            'buckets_ms': list(BUCKETS_MS),
+            'handlers': handler_snapshot(),
+            'stalls': self.recent_stalls(),
+        }
+
+
+_untimed.add(StallWatchdog._beat)
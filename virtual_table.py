@@ -0,0 +1,589 @@
+import tkinter as tk
+from tkinter import ttk
+
+import query_cache
+
+from counters import COUNTED_TABLES, table_count
+from dates import format_date
+
+
+def sort_key(field):
+    """Expressão de ordenação da coluna, sem NULL e comparável por valor.
+
+    Deve ser idêntica à expressão dos índices de ordenação (migrations.py)
+    para que o ORDER BY e a paginação por chave usem o índice. Datas são
+    texto ISO e ordenam como texto.
+    """
+    column, field_type = field[1], field[2]
+    if field_type == 'number':
+        return f"IFNULL({column}, -9e307)"
+    return f"IFNULL({column}, '')"
+
+
+class KeysetSource:
+    """Consulta paginada por chave sobre uma tabela do sistema.
+
+    Sem ordenação a chave é o id. Com order=[(expressão, decrescente)] a
+    chave passa a ser (expressões..., id) e os valores das expressões são
+    anexados ao fim de cada linha: (id, valores..., chaves...).
+    """
+
+    def __init__(self, table_name, columns, where=None, params=(), order=None):
+        self.table_name = table_name
+        self.columns = list(columns)
+        self.where = where
+        self.params = tuple(params)
+        self.order = list(order or [])
+
+        # O id desempata na mesma direção da última coluna, como no índice
+        self.keys = [expression for expression, _ in self.order] + ['id']
+        self.descending = [descending for _, descending in self.order]
+        self.descending.append(self.descending[-1] if self.descending else False)
+
+    def _select(self, columns):
+        sql = f"SELECT {columns} FROM {self.table_name}"
+        if self.where:
+            sql += f" WHERE ({self.where})"
+        return sql
+
+    def _order_by(self, reverse):
+        terms = [f"{key} {'DESC' if descending != reverse else 'ASC'}"
+                 for key, descending in zip(self.keys, self.descending)]
+        return " ORDER BY " + ", ".join(terms)
+
+    def _row_key(self, row):
+        return tuple(row[1 + len(self.columns):]) + (row[0],)
+
+    def _seek(self, key, forward, inclusive=False):
+        """Condição para as linhas depois (forward) ou antes da chave"""
+        def operator(descending, equal=False):
+            op = '>' if forward != descending else '<'
+            return op + '=' if equal else op
+
+        if len(self.keys) == 1:
+            return f"id {operator(self.descending[0], inclusive)} ?", (key[0],)
+
+        # k1 >= v1 AND (k1 > v1 OR (k1 = v1 AND k2 > v2) OR ...): o primeiro
+        # termo deixa o SQLite posicionar o índice direto na chave
+        clauses = []
+        params = []
+        for i, descending in enumerate(self.descending):
+            last = i == len(self.keys) - 1
+            terms = [f"{self.keys[j]} = ?" for j in range(i)]
+            terms.append(f"{self.keys[i]} {operator(descending, inclusive and last)} ?")
+            clauses.append("(" + " AND ".join(terms) + ")")
+            params.extend(key[:i + 1])
+        condition = (f"{self.keys[0]} {operator(self.descending[0], True)} ? AND "
+                     f"({' OR '.join(clauses)})")
+        return condition, (key[0],) + tuple(params)
+
+    def _query(self, conn, condition, condition_params, reverse, limit):
+        extra = ''.join(f", {key}" for key in self.keys[:-1])
+        sql = self._select(f"id, {', '.join(self.columns)}{extra}")
+        if condition:
+            sql += (" AND " if self.where else " WHERE ") + f"({condition})"
+        sql += self._order_by(reverse) + " LIMIT ?"
+        return query_cache.fetchall(conn, self.table_name, sql,
+                                    self.params + tuple(condition_params) + (limit,))
+
+    def count(self, conn):
+        """Total de linhas que satisfazem o filtro"""
+        if not self.where and self.table_name in COUNTED_TABLES:
+            return table_count(conn, self.table_name)
+        return query_cache.fetchall(conn, self.table_name, self._select("COUNT(*)"), self.params)[0][0]
+
+    def fetch_first(self, conn, limit):
+        return self._query(conn, None, (), False, limit)
+
+    def fetch_after(self, conn, row, limit):
+        """Linhas seguintes à linha informada"""
+        condition, params = self._seek(self._row_key(row), forward=True)
+        return self._query(conn, condition, params, False, limit)
+
+    def fetch_before(self, conn, row, limit):
+        """Linhas anteriores à linha informada (na ordem da fonte)"""
+        condition, params = self._seek(self._row_key(row), forward=False)
+        rows = self._query(conn, condition, params, True, limit)
+        rows.reverse()
+        return rows
+
+    def iter_rows(self, conn):
+        """Todas as linhas em ordem, lidas do cursor sob demanda (exportação)"""
+        cursor = conn.cursor()
+        cursor.execute(self._select(f"id, {', '.join(self.columns)}") + self._order_by(False),
+                       self.params)
+        yield from cursor
+
+    def fetch_from_offset(self, conn, offset, limit, from_end=False):
+        """Posiciona a janela numa posição absoluta (usado ao arrastar a barra).
+
+        Apenas a chave é localizada via OFFSET (pelo índice, sem ler as
+        linhas); as linhas em si são lidas por chave. Com from_end=True o
+        deslocamento é contado a partir do fim, o que evita percorrer a
+        tabela inteira perto do final.
+        """
+        keys = query_cache.fetchall(conn, self.table_name,
+                                    self._select(', '.join(self.keys)) + self._order_by(from_end) +
+                                    " LIMIT 1 OFFSET ?", self.params + (offset,))
+        if not keys:
+            return []
+        key = keys[0]
+        condition, params = self._seek(key, forward=True, inclusive=True)
+        return self._query(conn, condition, params, False, limit)
+
+
+class VirtualTable:
+    """Treeview virtualizada: mantém só a janela visível + margem de pré-carga"""
+
+    def __init__(self, parent, fields, worker, group=None, on_error=None,
+                 prefetch=100, style="Custom.Treeview", on_sort=None, change_mark=None):
+        self.worker = worker
+        self.group = group
+        self.on_error = on_error
+        self.on_sort = on_sort
+        self.prefetch = prefetch
+        self.source = None
+        # change_mark(conn): marca d'água das alterações, lida junto com as linhas
+        self.change_mark = change_mark
+        self.change_seq = None
+
+        # Estado da janela
+        self.rows = []          # Linhas em memória: (id, valores...)
+        self.first_pos = 0      # Posição absoluta de rows[0]
+        self.top = 0            # Índice em rows da primeira linha visível
+        self.total = 0
+        self.visible_rows = 12
+        self.at_start = True
+        self.at_end = True
+        self.selected_ids = set()
+        self._seek_job = None
+        self._generation = 0      # Invalida respostas de cargas anteriores
+        self._loading = False     # Busca incremental em andamento
+        self._pending_delta = 0   # Rolagem aguardando linhas do banco
+        self.sort_order = []      # [(coluna, decrescente)] na ordem de prioridade
+
+        self.frame = tk.Frame(parent, bg='white')
+
+        columns = [field[1] for field in fields]
+        self.fields = {field[1]: field for field in fields}
+        self.labels = {field[1]: field[0] for field in fields}
+        self.columns = columns
+        self.column_count = len(columns)  # Fontes podem anexar chaves de ordenação
+        # Datas chegam em ISO e são mostradas como DD/MM/AAAA
+        self.date_indexes = [i for i, field in enumerate(fields) if field[2] == 'date']
+        self.tree = ttk.Treeview(self.frame, columns=columns, show='headings',
+                                 height=self.visible_rows, style=style)
+
+        # Configurar colunas com larguras específicas
+        for field in fields:
+            field_name = field[1]
+            field_label = field[0]
+            field_width = field[3] if len(field) > 3 else 120
+
+            self.tree.heading(field_name, text=field_label)
+            self.tree.column(field_name, width=field_width, minwidth=80)
+
+        # A barra vertical reflete a posição na tabela inteira, não no Treeview
+        self.scrollbar_v = ttk.Scrollbar(self.frame, orient='vertical', command=self.on_scrollbar)
+        scrollbar_h = ttk.Scrollbar(self.frame, orient='horizontal', command=self.tree.xview)
+        self.tree.configure(xscrollcommand=scrollbar_h.set)
+
+        self.tree.grid(row=0, column=0, sticky='nsew')
+        self.scrollbar_v.grid(row=0, column=1, sticky='ns')
+        scrollbar_h.grid(row=1, column=0, sticky='ew')
+
+        self.frame.grid_rowconfigure(0, weight=1)
+        self.frame.grid_columnconfigure(0, weight=1)
+
+        # Cores alternadas para as linhas
+        self.tree.tag_configure('evenrow', background='#f8f9fa')
+        self.tree.tag_configure('oddrow', background='white')
+
+        self.row_height = int(ttk.Style().lookup(style, 'rowheight') or 20)
+
+        # Eventos
+        self.tree.bind('<Configure>', self.on_resize)
+        self.tree.bind('<MouseWheel>', self.on_mousewheel)
+        self.tree.bind('<Button-4>', lambda e: self.scroll(-3) or 'break')
+        self.tree.bind('<Button-5>', lambda e: self.scroll(3) or 'break')
+        self.tree.bind('<Down>', lambda e: self.on_arrow(1))
+        self.tree.bind('<Up>', lambda e: self.on_arrow(-1))
+        self.tree.bind('<Next>', lambda e: self.scroll(self.visible_rows) or 'break')
+        self.tree.bind('<Prior>', lambda e: self.scroll(-self.visible_rows) or 'break')
+        self.tree.bind('<Home>', lambda e: self.seek(0) or 'break')
+        self.tree.bind('<End>', lambda e: self.seek(self.total) or 'break')
+        self.tree.bind('<ButtonPress-1>', self.on_click, add='+')
+        self.tree.bind('<ButtonRelease-1>', self.on_heading_click, add='+')
+        self.tree.bind('<<TreeviewSelect>>', self.on_select, add='+')
+
+    @property
+    def position(self):
+        return self.first_pos + self.top
+
+    def _submit(self, func, callback):
+        """Envia consulta ao worker; respostas de cargas antigas são ignoradas"""
+        generation = self._generation
+
+        def deliver(result):
+            if generation == self._generation:
+                callback(result)
+
+        self.worker.submit(func, deliver, on_error=self._on_query_error, group=self.group)
+
+    def _on_query_error(self, error):
+        self._loading = False
+        if self.on_error:
+            self.on_error(error)
+        else:
+            print(f"❌ Erro ao carregar dados: {error}")
+
+    def load(self, source, on_loaded=None):
+        """Troca a fonte de dados e volta ao início"""
+        self.source = source
+        self.selected_ids.clear()
+        self.seek(0, recount=True, on_loaded=on_loaded)
+
+    def refresh(self, on_loaded=None):
+        """Recarrega a janela atual mantendo a posição"""
+        self.seek(self.position, recount=True, on_loaded=on_loaded)
+
+    def seek(self, position, recount=False, on_loaded=None):
+        """Posiciona a janela numa posição absoluta da tabela"""
+        if self.source is None:
+            return
+
+        self._generation += 1
+        self._loading = False
+        self._pending_delta = 0
+
+        source = self.source
+        known_total = self.total
+        visible = self.visible_rows
+        limit = visible + self.prefetch
+        change_mark = self.change_mark if recount else None
+
+        def query(conn):
+            # Lida antes das linhas: mudanças no meio entram na próxima diferença
+            mark = change_mark(conn) if change_mark else None
+            total = source.count(conn) if recount else known_total
+            start = max(0, min(position, total - visible))
+            if start == 0:
+                rows = source.fetch_first(conn, limit)
+            elif start > total // 2:
+                rows = source.fetch_from_offset(conn, max(0, total - 1 - start), limit, from_end=True)
+            else:
+                rows = source.fetch_from_offset(conn, start, limit)
+            return mark, total, start, rows
+
+        def apply(result):
+            mark, self.total, self.first_pos, self.rows = result
+            if mark is not None:
+                self.change_seq = mark
+            self.top = 0
+            self.at_start = self.first_pos == 0
+            self.at_end = len(self.rows) < limit
+            self.render()
+            if on_loaded:
+                on_loaded(self)
+
+        self._submit(query, apply)
+
+    def update_row(self, row):
+        """Substitui uma linha já carregada (após edição) sem recarregar a janela"""
+        row_id = row[0]
+        for i, current in enumerate(self.rows):
+            if current[0] == row_id:
+                # Mantém as chaves de ordenação anexadas pela fonte
+                self.rows[i] = tuple(row[:1 + self.column_count]) + tuple(current[1 + self.column_count:])
+                if self.tree.exists(str(row_id)):
+                    self.tree.item(str(row_id), values=self.display_values(row))
+                return True
+        return False
+
+    def apply_changes(self, seq, rows, deleted_ids, total):
+        """Aplica alterações lidas do registro (fonte ordenada por id, sem busca).
+
+        rows traz a versão atual dos registros incluídos ou alterados; os
+        que estão na janela são trocados e os novos entram no fim, se o fim
+        está carregado. As exclusões saem da janela. Aplicar a mesma
+        diferença duas vezes não muda o resultado.
+        """
+        self.change_seq = seq
+        deleted = set(deleted_ids)
+        self.selected_ids -= deleted
+        removed_above = sum(1 for row in self.rows[:self.top] if row[0] in deleted)
+        self.rows = [row for row in self.rows if row[0] not in deleted]
+        self.top = max(0, self.top - removed_above)
+
+        loaded = {row[0]: i for i, row in enumerate(self.rows)}
+        for row in rows:
+            i = loaded.get(row[0])
+            if i is not None:
+                self.rows[i] = tuple(row)
+            elif self.at_end and (not self.rows or row[0] > self.rows[-1][0]):
+                # Ids são AUTOINCREMENT: um registro novo vai sempre para o fim
+                self.rows.append(tuple(row))
+
+        self.total = total
+        if not self.rows and total:
+            self.seek(self.position, recount=True)
+            return
+        if self.at_start:
+            self.first_pos = 0
+        elif self.at_end:
+            self.first_pos = max(0, total - len(self.rows))
+        else:
+            self.first_pos = max(0, min(self.first_pos, total - len(self.rows)))
+        self.top = max(0, min(self.top, len(self.rows) - self.visible_rows))
+        self.render()
+        self._prefetch()
+
+    def set_column(self, row_ids, column, value):
+        """Atribui o mesmo valor a uma coluna das linhas carregadas (edição em lote)"""
+        row_ids = set(row_ids)
+        index = 1 + self.columns.index(column)
+        shown = format_date(value) if index - 1 in self.date_indexes else value
+        for i, row in enumerate(self.rows):
+            if row[0] in row_ids:
+                self.rows[i] = row[:index] + (value,) + row[index + 1:]
+                if self.tree.exists(str(row[0])):
+                    self.tree.set(str(row[0]), column, shown)
+
+    def remove_rows(self, row_ids):
+        """Retira linhas excluídas da janela e do total"""
+        row_ids = set(row_ids)
+        self.selected_ids -= row_ids
+        self.total = max(0, self.total - len(row_ids))
+        removed_above = sum(1 for row in self.rows[:self.top] if row[0] in row_ids)
+        self.rows = [row for row in self.rows if row[0] not in row_ids]
+        self.top = max(0, min(self.top - removed_above, len(self.rows) - self.visible_rows))
+        self.render()
+        self._prefetch()
+
+    def scroll(self, delta):
+        """Rola a janela delta linhas (positivo = para baixo)"""
+        if not self.rows:
+            return
+
+        new_top = self.top + delta
+        clamped = max(0, min(new_top, len(self.rows) - self.visible_rows))
+        leftover = new_top - clamped
+
+        # A sobra é aplicada quando as próximas linhas chegarem do banco
+        if (leftover > 0 and not self.at_end) or (leftover < 0 and not self.at_start):
+            self._pending_delta += leftover
+
+        self.top = clamped
+        self._trim()
+        self.render()
+        self._prefetch()
+
+    def _prefetch(self):
+        """Busca em segundo plano quando a janela se aproxima da borda do buffer"""
+        if self._loading or not self.rows or self.source is None:
+            return
+
+        source = self.source
+        margin = self.prefetch // 2
+        remaining = len(self.rows) - (self.top + self.visible_rows)
+
+        if not self.at_end and (remaining < margin or self._pending_delta > 0):
+            limit = self.prefetch + max(0, self._pending_delta)
+            boundary = self.rows[-1]
+            self._loading = True
+            self._submit(lambda conn: source.fetch_after(conn, boundary, limit),
+                         lambda rows: self._apply_after(rows, limit))
+        elif not self.at_start and (self.top < margin or self._pending_delta < 0):
+            limit = self.prefetch + max(0, -self._pending_delta)
+            boundary = self.rows[0]
+            self._loading = True
+            self._submit(lambda conn: source.fetch_before(conn, boundary, limit),
+                         lambda rows: self._apply_before(rows, limit))
+
+    def _apply_after(self, fetched, limit):
+        self._loading = False
+        self.rows.extend(fetched)
+        if len(fetched) < limit:
+            self.at_end = True
+            # Ressincronizar posição absoluta com o total
+            self.first_pos = max(0, self.total - len(self.rows))
+        self._flush_pending()
+
+    def _apply_before(self, fetched, limit):
+        self._loading = False
+        self.rows[0:0] = fetched
+        self.top += len(fetched)
+        self.first_pos -= len(fetched)
+        if len(fetched) < limit:
+            self.at_start = True
+            self.first_pos = 0
+        self._flush_pending()
+
+    def _flush_pending(self):
+        delta, self._pending_delta = self._pending_delta, 0
+        if delta:
+            self.scroll(delta)
+        else:
+            self.render()
+            self._prefetch()
+
+    def _trim(self):
+        """Descarta linhas distantes da janela visível"""
+        if self._loading:
+            return
+
+        if self.top > 2 * self.prefetch:
+            dropped = self.top - self.prefetch
+            del self.rows[:dropped]
+            self.top -= dropped
+            self.first_pos += dropped
+            self.at_start = False
+
+        keep = self.top + self.visible_rows + self.prefetch
+        if len(self.rows) > keep + self.prefetch:
+            del self.rows[keep:]
+            self.at_end = False
+
+    def render(self):
+        """Redesenha apenas as linhas visíveis"""
+        children = self.tree.get_children()
+        if children:
+            self.tree.delete(*children)
+
+        visible = self.rows[self.top:self.top + self.visible_rows]
+        start = self.position
+        for i, row in enumerate(visible):
+            tags = (row[0], 'evenrow' if (start + i) % 2 == 0 else 'oddrow')
+            self.tree.insert('', 'end', iid=str(row[0]), values=self.display_values(row), tags=tags)
+
+        selected = [str(row[0]) for row in visible if row[0] in self.selected_ids]
+        if selected:
+            self.tree.selection_set(selected)
+
+        self.update_scrollbar(len(visible))
+
+    def display_values(self, row):
+        """Valores da linha como aparecem na tela"""
+        values = list(row[1:1 + self.column_count])
+        for i in self.date_indexes:
+            values[i] = format_date(values[i])
+        return values
+
+    def update_scrollbar(self, shown):
+        if self.total <= 0:
+            self.scrollbar_v.set(0, 1)
+            return
+        first = min(1.0, self.position / self.total)
+        last = min(1.0, (self.position + shown) / self.total)
+        self.scrollbar_v.set(first, last)
+
+    def on_scrollbar(self, *args):
+        """Comando da barra vertical: 'moveto' ou 'scroll'"""
+        if args[0] == 'moveto':
+            # Arrastar gera muitos eventos; só consulta quando estabiliza
+            position = int(float(args[1]) * self.total)
+            if self._seek_job:
+                self.tree.after_cancel(self._seek_job)
+            self._seek_job = self.tree.after(30, lambda: self._run_seek(position))
+        elif args[0] == 'scroll':
+            amount = int(args[1])
+            if args[2] == 'pages':
+                amount *= self.visible_rows
+            self.scroll(amount)
+
+    def _run_seek(self, position):
+        self._seek_job = None
+        self.seek(position)
+
+    def on_mousewheel(self, event):
+        if abs(event.delta) >= 120:
+            self.scroll(-3 * (event.delta // 120))
+        else:
+            self.scroll(-event.delta)
+        return 'break'
+
+    def on_arrow(self, direction):
+        """Setas no limite da janela rolam a tabela em vez de parar"""
+        children = self.tree.get_children()
+        if not children:
+            return 'break'
+        edge = children[-1] if direction > 0 else children[0]
+        if self.tree.focus() != edge:
+            return None
+
+        self.scroll(direction)
+        children = self.tree.get_children()
+        if children:
+            target = children[-1] if direction > 0 else children[0]
+            self.selected_ids = {int(target)}
+            self.tree.selection_set(target)
+            self.tree.focus(target)
+        return 'break'
+
+    def on_resize(self, event):
+        rows = max(1, (event.height - self.row_height) // self.row_height)
+        if rows != self.visible_rows:
+            self.visible_rows = rows
+            self.render()
+            self._prefetch()
+
+    def order_keys(self):
+        """Ordenação atual no formato de KeysetSource: [(expressão, decrescente)]"""
+        return [(sort_key(self.fields[column]), descending)
+                for column, descending in self.sort_order]
+
+    def toggle_sort(self, column, multiple=False):
+        """Crescente -> decrescente -> sem ordenação para a coluna clicada.
+
+        Com multiple=True (Shift) a coluna é somada às já ordenadas em vez
+        de substituí-las.
+        """
+        if multiple:
+            order = list(self.sort_order)
+        else:
+            order = [(c, d) for c, d in self.sort_order if c == column]
+
+        columns = [c for c, _ in order]
+        if column not in columns:
+            order.append((column, False))
+        else:
+            i = columns.index(column)
+            if order[i][1]:
+                del order[i]
+            else:
+                order[i] = (column, True)
+
+        self.sort_order = order
+        self.update_headings()
+        if self.on_sort:
+            self.on_sort(self)
+
+    def update_headings(self):
+        """Mostra ▲/▼ (e a prioridade, se houver várias) nos cabeçalhos"""
+        for column in self.columns:
+            self.tree.heading(column, text=self.labels[column])
+        for number, (column, descending) in enumerate(self.sort_order, 1):
+            arrow = '▼' if descending else '▲'
+            if len(self.sort_order) > 1:
+                arrow += str(number)
+            self.tree.heading(column, text=f"{self.labels[column]} {arrow}")
+
+    def on_heading_click(self, event):
+        if self.tree.identify_region(event.x, event.y) != 'heading':
+            return
+        column_id = self.tree.identify_column(event.x)
+        if not column_id:
+            return
+        index = int(column_id.lstrip('#')) - 1
+        if 0 <= index < len(self.columns):
+            self.toggle_sort(self.columns[index], multiple=bool(event.state & 0x0001))
+
+    def on_click(self, event):
+        # Clique simples (sem Ctrl/Shift) descarta a seleção fora da janela
+        if not event.state & 0x0005:
+            self.selected_ids.clear()
+
+    def on_select(self, event=None):
+        visible_ids = {int(iid) for iid in self.tree.get_children()}
+        selected = {int(iid) for iid in self.tree.selection()}
+        self.selected_ids = (self.selected_ids - visible_ids) | selected